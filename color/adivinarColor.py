@@ -3,9 +3,15 @@ import numpy as np
 import random
 import time
 import os
-from gtts import gTTS
+import sys
 import pygame
 
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+from comun import intenciones, recursos
+from comun.voz import hablar
+
 # opcional: reconocimiento por voz; si no está instalado, se usa input()
 try:
     import speech_recognition as sr
@@ -13,47 +19,27 @@ try:
 except Exception:
     SR_AVAILABLE = False
 
-# --- Voz ---
-def hablar(texto):
-    print("Robot:", texto)
+def reconocer_audio(timeout=4, phrase_time_limit=4, mic=None, esperado=None):
+    """
+    Lista n-best de ``(texto, confianza)`` de la respuesta; vacía si no hubo respuesta.
+    ``mic`` permite usar otra fuente (p. ej. ``comun.corpus.FuenteGrabada``);
+    ``esperado`` se guarda con la grabación si se está grabando el corpus.
+    """
+    if not SR_AVAILABLE:
+        texto = input("¿Qué color escucho? (escribe aquí): ").strip().lower()
+        return [(texto, None)] if texto else []
     try:
-        fname = "tts_adivinar.mp3"
-        tts = gTTS(text=str(texto), lang="es", slow=False)
-        tts.save(fname)
-        pygame.mixer.init()
-        pygame.mixer.music.load(fname)
-        pygame.mixer.music.play()
-        while pygame.mixer.music.get_busy():
-            pygame.time.Clock().tick(10)
-        pygame.mixer.quit()
-        try:
-            os.remove(fname)
-        except Exception:
-            pass
+        mic = mic or recursos.obtener("microfono")
+        contexto = {"juego": "colores", "vocabulario": "colores", "esperado": esperado}
+        audio = mic.escuchar(timeout=timeout, limite=phrase_time_limit, corto=True, contexto=contexto)
+        mic.reconocer_vocabulario(audio, "colores")
+        return mic.ultima_escucha["hipotesis"]
     except Exception as e:
-        print("No te escuché bien:", e)
-
-def reconocer_audio(timeout=4, phrase_time_limit=4):
-    if not SR_AVAILABLE:
-        return input("¿Qué color escucho? (escribe aquí): ").strip().lower()
-    r = sr.Recognizer()
-    with sr.Microphone() as source:
-        r.adjust_for_ambient_noise(source, duration=0.6)
-        try:
-            audio = r.listen(source, timeout=timeout, phrase_time_limit=phrase_time_limit)
-            texto = r.recognize_google(audio, language="es-ES")
-            return texto.strip().lower()
-        except Exception as e:
-            print("Speech error:", e)
-            return ""
+        print("Speech error:", e)
+        return []
 
 def normalize_name(s):
-    if not s:
-        return ""
-    s = s.lower().strip()
-    for a,b in [("á","a"),("é","e"),("í","i"),("ó","o"),("ú","u")]:
-        s = s.replace(a,b)
-    return s
+    return intenciones.plegar(s)
 
 # lista de colores disponibles (BGR para mostrar)
 COLORS = {
@@ -71,6 +57,10 @@ def mostrar_rectangulo_color(bgr, ventana_name="Color"):
 
 def jugar_adivinar(rounds=4, listen_timeout=4):
     pygame.init()
+    if SR_AVAILABLE:
+        # abrir el micrófono mientras el robot saluda: así ya está calibrado y
+        # guardando audio (pre-roll) cuando llegue la primera pregunta
+        recursos.precalentar(["microfono"], en_segundo_plano=True)
     hablar("Vamos a jugar a adivinar colores. Te mostraré un color y tú debes decir cuál es.")
     time.sleep(0.6)
     ventana = "Color"
@@ -88,11 +78,12 @@ def jugar_adivinar(rounds=4, listen_timeout=4):
                 cv2.destroyAllWindows()
                 return
             # intentar reconocer una respuesta (una sola vez por ronda para simplificar)
-            texto = reconocer_audio(timeout=listen_timeout, phrase_time_limit=listen_timeout)
-            texto = normalize_name(texto)
-            if texto:
+            hipotesis = reconocer_audio(timeout=listen_timeout, phrase_time_limit=listen_timeout,
+                                        esperado=target)
+            if hipotesis:
                 answered = True
-                if texto == normalize_name(target):
+                texto = intenciones.COLORES.mejor(hipotesis) or hipotesis[0][0].lower()
+                if texto == target:
                     hablar("¡Muy bien! Esa es la respuesta correcta. ¡Excelente!")
                 else:
                     hablar(f"No es correcto. Tú dijiste {texto}. Era {target}. ¡Lo harás mejor la próxima vez!")
@@ -107,8 +98,4 @@ if __name__ == "__main__":
     try:
         jugar_adivinar(rounds=4)
     finally:
-        try:
-            if pygame.mixer.get_init():
-                pygame.mixer.quit()
-        except Exception:
-            pass
\ No newline at end of file
+        recursos.cerrar_todo()
@@ -1,6 +1,13 @@
 import cv2
 import numpy as np
 import time
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+from comun import recursos
 
 def clasificar_color(r, g, b):
     """
@@ -80,12 +87,18 @@ def clasificar_color(r, g, b):
 
 
 def main():
-    cap = cv2.VideoCapture(0)
-
-    if not cap.isOpened():
+    try:
+        cap = recursos.adquirir("camara")
+    except RuntimeError:
         print("Error: No se pudo abrir la cámara. Asegúrate de que no esté en uso y de que los drivers estén instalados.")
         return
+    try:
+        _detectar(cap)
+    finally:
+        recursos.soltar("camara")
+        cv2.destroyAllWindows()
 
+def _detectar(cap):
     # --- Intentar DESACTIVAR el auto-exposición de la cámara ---
     # Esto puede no funcionar en todas las cámaras o sistemas operativos.
     # Consulta la documentación de OpenCV o prueba estos CAP_PROP.
@@ -151,8 +164,8 @@ def main():
         if cv2.waitKey(1) & 0xFF == ord('q'):
             break
 
-    cap.release()
-    cv2.destroyAllWindows()
-
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    try:
+        main()
+    finally:
+        recursos.cerrar_todo()
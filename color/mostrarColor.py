@@ -3,36 +3,19 @@ import numpy as np
 import time
 import random
 import os
-from gtts import gTTS
-import pygame
+import sys
 
-# --- Voz ---
-def hablar(texto):
-    print("Robot:", texto)
-    try:
-        fname = "tts_mostrar.mp3"
-        tts = gTTS(text=str(texto), lang="es", slow=False)
-        tts.save(fname)
-        pygame.mixer.init()
-        pygame.mixer.music.load(fname)
-        pygame.mixer.music.play()
-        while pygame.mixer.music.get_busy():
-            pygame.time.Clock().tick(10)
-        pygame.mixer.quit()
-        try:
-            os.remove(fname)
-        except Exception:
-            pass
-    except Exception as e:
-        print("Audio error:", e)
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+from comun import intenciones, recursos
+from comun.voz import hablar, decir, callar, preparar
+from comun.decision import Decisor
+from comun.planificador import Planificador
+from comun.plantillas import Plantilla
 
 def normalize_name(s):
-    if not s:
-        return ""
-    s = s.lower().strip()
-    for a,b in [("á","a"),("é","e"),("í","i"),("ó","o"),("ú","u")]:
-        s = s.replace(a,b)
-    return s
+    return intenciones.plegar(s)
 
 # Colores y sus rangos HSV (valores probables; ajustar en tu entorno)
 COLOR_RANGES = {
@@ -46,6 +29,11 @@ COLOR_RANGES = {
 # lista de colores a usar (sólo los que tenemos rangos)
 AVAILABLE = list(COLOR_RANGES.keys())
 
+# frases con plantilla: los trozos se sintetizan una vez y se componen al decirlas
+RONDA = Plantilla("Ronda {n}. Por favor, muestra {objetivo}. Tienes {segundos} segundos.",
+                  n=range(1, 11), objetivo=AVAILABLE, segundos=(10, 15, 20))
+CASI = Plantilla("Casi. Yo vi {color}. ¡Animo, inténtalo otra vez!", color=AVAILABLE)
+
 def detectar_color_principal(frame):
     hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
     best_color = None
@@ -68,70 +56,79 @@ def detectar_color_principal(frame):
     return best_color, best_area, masks
 
 def jugar_mostrar(rounds=4, timeout=15, hold_time=1.0):
-    cap = cv2.VideoCapture(0)
-    if not cap.isOpened():
+    try:
+        cap = recursos.adquirir("camara")
+    except RuntimeError:
         hablar("No pude abrir la cámara.")
         return
+    try:
+        _jugar_mostrar(cap, rounds, timeout, hold_time)
+    finally:
+        recursos.soltar("camara")
+        cv2.destroyAllWindows()
+
+def _jugar_mostrar(cap, rounds, timeout, hold_time):
+    preparar(RONDA, CASI)
     hablar("Vamos a jugar a mostrar colores. Yo pediré un color y tú lo mostrarás a la cámara.")
     time.sleep(0.6)
     ventana = "MostrarColor"
     cv2.namedWindow(ventana, cv2.WINDOW_NORMAL)
+    plan = Planificador(hz_deteccion=10, hz_candidato=20)
+    # el color tiene que dominar los votos durante hold_time; un frame perdido no lo reinicia
+    decisor = Decisor.perfil(espera=hold_time)
     for r in range(rounds):
         objetivo = random.choice(AVAILABLE)
-        hablar(f"Ronda {r+1}. Por favor, muestra {objetivo}. Tienes {timeout} segundos.")
-        start = time.time()
-        hold_start = None
+        aviso = decir(RONDA(n=r+1, objetivo=objetivo, segundos=timeout))
+        # el tiempo de la ronda corre desde que el robot termina de pedirlo, pero los
+        # frames se procesan desde ya: si el niño se adelanta se le corta la pregunta
+        start = None
         success = False
-        best_seen = None
-        while time.time() - start < timeout:
-            ret, frame = cap.read()
+        decisor.reiniciar()
+        mask_vis_bgr, estado = None, None
+        while start is None or time.time() - start < timeout:
+            if start is None and aviso.done():
+                start = time.time()
+            # espejo leído directamente del frame de la cámara (sin copiarlo antes)
+            ret, frame = cap.leer_transformado(lambda f: cv2.flip(f, 1))
             if not ret:
                 continue
-            frame = cv2.flip(frame, 1)
-            color, area, masks = detectar_color_principal(frame)
-            best_seen = color
-            # dibujar máscara del color principal para debug
-            mask_vis = None
-            if color:
-                mask_vis = masks[color][0]
-                mask_vis_bgr = cv2.cvtColor(mask_vis, cv2.COLOR_GRAY2BGR)
+            # la imagen se redibuja a hz_pantalla; la detección, sólo cuando toca
+            if plan.debe_detectar():
+                with plan.medir():
+                    color, area, masks = detectar_color_principal(frame)
+                # criterio: area suficientemente grande (umbral a ajustar según cámara/objetos)
+                estado = decisor.actualizar(color if area > 20000 else None)
+                if estado.aceptada == objetivo:
+                    success = True
+                    decir("¡Perfecto! Muy bien mostrado.", interrumpir=True)
+                    break
+                # mientras corre el hold se detecta más a menudo para confirmarlo antes
+                plan.candidato(estado.candidata is not None)
+                # máscara del color principal para debug (la de la última detección)
+                mask_vis_bgr = cv2.cvtColor(masks[color][0], cv2.COLOR_GRAY2BGR) if color else None
+            if mask_vis_bgr is not None:
                 debug = np.hstack((cv2.resize(frame, (320,240)), cv2.resize(mask_vis_bgr, (320,240))))
             else:
                 debug = cv2.resize(frame, (640,240))
+            if estado is not None and estado.candidata == objetivo:
+                cv2.putText(debug, f"Holding: {estado.progreso * hold_time:.1f}/{hold_time}s", (10,50), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,200,0), 2)
             cv2.imshow(ventana, debug)
-            # criterio: area suficientemente grande y corresponde al objetivo
-            if color == objetivo and area > 20000:  # umbral a ajustar según cámara/objetos
-                if hold_start is None:
-                    hold_start = time.time()
-                elapsed = time.time() - hold_start
-                cv2.putText(debug, f"Holding: {elapsed:.1f}/{hold_time}s", (10,50), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,200,0), 2)
-                if elapsed >= hold_time:
-                    success = True
-                    hablar("¡Perfecto! Muy bien mostrado.")
-                    break
-            else:
-                hold_start = None
-            if cv2.waitKey(50) & 0xFF == ord('q'):
+            if plan.esperar_tecla() == ord('q'):
+                callar()
                 hablar("Saliendo del juego.")
-                cap.release()
-                cv2.destroyAllWindows()
                 return
         if not success:
+            best_seen, _ = decisor.lider()
             if best_seen:
-                hablar(f"Casi. Yo vi {best_seen}. ¡Animo, inténtalo otra vez!")
+                decir(CASI(color=best_seen))
             else:
-                hablar("No detecté el color. Mejora la iluminación o acércalo a la cámara.")
+                decir("No detecté el color. Mejora la iluminación o acércalo a la cámara.")
         time.sleep(0.8)
+    print(decisor.resumen())
     hablar("Hemos terminado las rondas de mostrar color. ¡Buen trabajo!")
-    cap.release()
-    cv2.destroyAllWindows()
 
 if __name__ == "__main__":
     try:
         jugar_mostrar(rounds=4)
     finally:
-        try:
-            if pygame.mixer.get_init():
-                pygame.mixer.quit()
-        except Exception:
-            pass
\ No newline at end of file
+        recursos.cerrar_todo()
@@ -0,0 +1 @@
+"""Código compartido por los juegos del Robot Educativo."""
@@ -0,0 +1,215 @@
+"""Motor de audio único para todo el proceso.
+
+Antes cada ``hablar()`` inicializaba el mezclador, cargaba un mp3 desde
+disco, esperaba consultando ``get_busy()`` cada 100 ms y cerraba el
+mezclador. ``MotorAudio`` mantiene el mezclador abierto (recurso
+"mezclador"), guarda los sonidos ya decodificados en memoria
+(``pygame.mixer.Sound``) y avisa del final de cada reproducción con un
+``Future``: un temporizador se dispara cuando debería terminar el sonido,
+sin bucles de espera activa. El Future da True si el sonido terminó y
+False si se cortó con ``detener``/``detener_todo``; para cortar el audio
+hay que usar éstos y no ``pygame.mixer.stop()``, que el motor no ve.
+
+Se obtiene del registro de recursos::
+
+    motor = recursos.obtener("audio")
+    motor.reproducir("frase.mp3").esperar()
+"""
+import io
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+from comun import recursos
+
+
+def esperar_futuro(futuro, timeout=None):
+    """Espera un Future en tramos cortos para que Ctrl+C siga funcionando (también en Windows).
+
+    Devuelve su resultado, o None si se agota ``timeout``.
+    """
+    restante = timeout
+    while not futuro.done():
+        tramo = 0.2 if restante is None else min(0.2, restante)
+        try:
+            return futuro.result(tramo)
+        except FutureTimeoutError:
+            if restante is not None:
+                restante -= tramo
+                if restante <= 0:
+                    return None
+    return futuro.result()
+
+
+class Reproduccion(Future):
+    """Future de una reproducción: ``result()`` es True si terminó y False si se detuvo."""
+
+    def __init__(self, canal, sonido):
+        super().__init__()
+        self.set_running_or_notify_cancel()
+        self.canal = canal
+        self.sonido = sonido
+        self.duracion = sonido.get_length()
+
+    def _terminar(self, completa):
+        if not self.done():
+            try:
+                self.set_result(completa)
+            except Exception:
+                pass  # otro hilo la terminó a la vez
+
+    def detener(self):
+        """Corta el sonido si todavía es el que suena en su canal."""
+        if not self.done():
+            if self.canal.get_sound() is self.sonido:
+                self.canal.stop()
+            self._terminar(False)
+
+    def esperar(self, timeout=None):
+        return esperar_futuro(self, timeout)
+
+
+class MotorAudio:
+    def __init__(self, max_sonidos=64):
+        self.mixer = recursos.adquirir("mezclador")
+        self.max_sonidos = max_sonidos
+        self._sonidos = OrderedDict()
+        self._lock = threading.Lock()
+        self._reproducciones = set()
+        self._cadenas = set()  # (parada, canal) de cada encadenar() en curso
+
+    def cargar(self, origen, clave=None):
+        """Decodifica ``origen`` (ruta, bytes o ``Sound``) y lo guarda en memoria.
+
+        Las rutas se cachean por (ruta, fecha de modificación); los bytes sólo
+        si se da una ``clave``.
+        """
+        import pygame
+        if isinstance(origen, pygame.mixer.Sound):
+            return origen
+        if clave is None and isinstance(origen, (str, os.PathLike)):
+            clave = (os.fspath(origen), os.path.getmtime(origen))
+        if clave is not None:
+            with self._lock:
+                sonido = self._sonidos.get(clave)
+                if sonido is not None:
+                    self._sonidos.move_to_end(clave)
+                    return sonido
+        if isinstance(origen, (bytes, bytearray, memoryview)):
+            sonido = pygame.mixer.Sound(file=io.BytesIO(bytes(origen)))
+        else:
+            sonido = pygame.mixer.Sound(os.fspath(origen))
+        if clave is not None:
+            with self._lock:
+                self._sonidos[clave] = sonido
+                while len(self._sonidos) > self.max_sonidos:
+                    self._sonidos.popitem(last=False)
+        return sonido
+
+    def reproducir(self, origen, clave=None):
+        """Empieza a reproducir y devuelve una ``Reproduccion`` (Future) sin bloquear."""
+        sonido = self.cargar(origen, clave)
+        canal = sonido.play()
+        if canal is None:
+            raise RuntimeError("No hay canales de audio libres.")
+        rep = Reproduccion(canal, sonido)
+        with self._lock:
+            self._reproducciones.add(rep)
+        rep.add_done_callback(self._olvidar)
+        self._vigilar(rep, rep.duracion)
+        return rep
+
+    def encadenar(self, origenes, al_empezar=None):
+        """Reproduce ``origenes`` uno tras otro en el mismo canal, sin huecos.
+
+        ``origenes`` puede ser un generador que aún está produciendo sonidos:
+        cada uno se deja en la cola del canal mientras suena el anterior.
+        Bloquea hasta que termina el último (o hasta ``detener_todo``) y
+        devuelve ``(sonidos, huecos)``, donde ``huecos`` cuenta las veces que
+        el siguiente sonido llegó tarde.
+
+        Como en ``reproducir``, las esperas salen de la duración de cada
+        sonido: se duerme hasta que empieza el que está en la cola (el canal
+        sólo guarda uno) y, al final, hasta que termina el último.
+        """
+        import pygame
+        canal = pygame.mixer.find_channel(True)
+        canal.stop()
+        parada = threading.Event()
+        cadena = (parada, canal)
+        with self._lock:
+            self._cadenas.add(cadena)
+        sonidos = huecos = 0
+        inicio_ultimo = fin = time.monotonic()  # inicio y final del último sonido encolado
+        try:
+            for origen in origenes:
+                sonido = self.cargar(origen)
+                self._esperar_hasta(inicio_ultimo, parada, lambda: canal.get_queue() is None)
+                if parada.is_set():
+                    break
+                if sonidos and not canal.get_busy():
+                    huecos += 1
+                # si el canal está libre, queue() empieza a sonar en el acto
+                canal.queue(sonido)
+                inicio_ultimo = max(time.monotonic(), fin)
+                fin = inicio_ultimo + sonido.get_length()
+                if sonidos == 0 and al_empezar is not None:
+                    al_empezar()
+                sonidos += 1
+            self._esperar_hasta(fin, parada, lambda: not canal.get_busy())
+        except BaseException:
+            canal.stop()
+            raise
+        finally:
+            with self._lock:
+                self._cadenas.discard(cadena)
+        return sonidos, huecos
+
+    @staticmethod
+    def _esperar_hasta(instante, parada, listo):
+        """Duerme hasta ``instante`` y hasta que ``listo()``, salvo que se active ``parada``."""
+        while not parada.is_set():
+            restante = instante - time.monotonic()
+            if restante <= 0:
+                if listo():
+                    return
+                restante = 0.02  # el canal va un poco por detrás del reloj, como en _comprobar
+            # en tramos cortos para que Ctrl+C siga funcionando (también en Windows)
+            parada.wait(min(restante, 0.2))
+
+    def _olvidar(self, rep):
+        with self._lock:
+            self._reproducciones.discard(rep)
+
+    def _vigilar(self, rep, espera):
+        temporizador = threading.Timer(espera, self._comprobar, args=(rep,))
+        temporizador.daemon = True
+        temporizador.start()
+
+    def _comprobar(self, rep):
+        if rep.done():
+            return
+        if rep.canal.get_busy() and rep.canal.get_sound() is rep.sonido:
+            # el canal tardó un poco en arrancar: queda una cola muy corta
+            self._vigilar(rep, 0.02)
+        else:
+            rep._terminar(True)
+
+    def detener_todo(self):
+        """Corta todas las reproducciones (su Future da False) y las cadenas en curso."""
+        with self._lock:
+            reproducciones = list(self._reproducciones)
+            cadenas = list(self._cadenas)
+        for rep in reproducciones:
+            rep.detener()
+        for parada, canal in cadenas:
+            parada.set()
+            canal.stop()
+
+    def cerrar(self):
+        self.detener_todo()
+        with self._lock:
+            self._sonidos.clear()
+        recursos.soltar("mezclador")
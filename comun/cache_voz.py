@@ -0,0 +1,180 @@
+"""Caché en disco de frases sintetizadas (TTS).
+
+Cada frase se guarda una sola vez, con nombre igual al hash de
+``(texto, idioma, lento, formato, voz)``, así que las frases repetidas ("¡Bien hecho!
+Correcto.", "Hemos terminado las rondas...") se reproducen al instante y
+sin conexión una vez cacheadas. El tamaño total está acotado: al pasarse
+de ``max_bytes`` se borran las entradas usadas hace más tiempo (LRU, usando
+la fecha de modificación que se actualiza en cada acierto). Las escrituras
+son atómicas (archivo temporal + ``os.replace``), por lo que varios
+procesos pueden compartir el mismo directorio.
+
+Uso desde la línea de comandos::
+
+    python -m comun.cache_voz            # estadísticas
+    python -m comun.cache_voz --vaciar   # borrar la caché
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DIRECTORIO_POR_DEFECTO = os.environ.get("ROBOT_CACHE_VOZ", os.path.join(RAIZ, "cache_voz"))
+MAX_BYTES_POR_DEFECTO = 200 * 1024 * 1024
+
+
+def clave(texto, lang="es", slow=False, extension="mp3", voz="gtts"):
+    """Clave de contenido de una frase: no depende de qué juego la pidió."""
+    datos = json.dumps([str(texto), lang, bool(slow), extension, voz], ensure_ascii=False)
+    return hashlib.sha256(datos.encode("utf-8")).hexdigest()
+
+
+class CacheVoz:
+    def __init__(self, directorio=DIRECTORIO_POR_DEFECTO, max_bytes=MAX_BYTES_POR_DEFECTO):
+        self.directorio = directorio
+        self.max_bytes = max_bytes
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self._lock = threading.Lock()
+        self._indice = None  # clave -> (bytes, mtime)
+
+    def _ruta(self, k, extension):
+        return os.path.join(self.directorio, f"{k}.{extension}")
+
+    def _cargar_indice(self):
+        if self._indice is not None:
+            return
+        self._indice = {}
+        if not os.path.isdir(self.directorio):
+            return
+        for nombre in os.listdir(self.directorio):
+            if nombre.endswith(".tmp"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directorio, nombre))
+            except OSError:
+                continue
+            self._indice[nombre] = (st.st_size, st.st_mtime)
+
+    def buscar(self, texto, lang="es", slow=False, extension="mp3", voz="gtts", contar=True):
+        """
+        Devuelve la ruta del audio cacheado o None. Cuenta acierto/fallo salvo
+        con ``contar=False`` (quien consulta varias voces cuenta con ``contar``).
+        """
+        ruta = self._ruta(clave(texto, lang, slow, extension, voz), extension)
+        with self._lock:
+            if os.path.isfile(ruta):
+                if contar:
+                    self.aciertos += 1
+                try:
+                    os.utime(ruta)  # marcar como usado recientemente
+                except OSError:
+                    pass
+                if self._indice is not None:
+                    self._indice[os.path.basename(ruta)] = (os.path.getsize(ruta), os.path.getmtime(ruta))
+                return ruta
+            if contar:
+                self.fallos += 1
+            return None
+
+    def contar(self, acierto):
+        """Anota un acierto o un fallo de una consulta hecha con ``buscar(..., contar=False)``."""
+        with self._lock:
+            if acierto:
+                self.aciertos += 1
+            else:
+                self.fallos += 1
+
+    def guardar(self, texto, datos, lang="es", slow=False, extension="mp3", voz="gtts"):
+        """Guarda ``datos`` (bytes) de forma atómica y devuelve la ruta final."""
+        os.makedirs(self.directorio, exist_ok=True)
+        ruta = self._ruta(clave(texto, lang, slow, extension, voz), extension)
+        fd, tmp = tempfile.mkstemp(dir=self.directorio, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(datos)
+            os.replace(tmp, ruta)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+        with self._lock:
+            self._cargar_indice()
+            self._indice[os.path.basename(ruta)] = (len(datos), os.path.getmtime(ruta))
+            self._desalojar(conservar=os.path.basename(ruta))
+        return ruta
+
+    def obtener(self, texto, sintetizar, lang="es", slow=False, extension="mp3", voz="gtts"):
+        """Devuelve la ruta del audio, llamando a ``sintetizar(texto, lang, slow) -> bytes`` si falta."""
+        ruta = self.buscar(texto, lang, slow, extension, voz)
+        if ruta is not None:
+            return ruta
+        return self.guardar(texto, sintetizar(texto, lang, slow), lang, slow, extension, voz)
+
+    def _desalojar(self, conservar=None):
+        total = sum(tam for tam, _ in self._indice.values())
+        if total <= self.max_bytes:
+            return
+        for nombre, (tam, _) in sorted(self._indice.items(), key=lambda kv: kv[1][1]):
+            if total <= self.max_bytes:
+                break
+            if nombre == conservar:
+                continue
+            try:
+                os.remove(os.path.join(self.directorio, nombre))
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue  # p. ej. se está reproduciendo en Windows
+            del self._indice[nombre]
+            total -= tam
+            self.desalojos += 1
+
+    def vaciar(self):
+        with self._lock:
+            self._cargar_indice()
+            for nombre in list(self._indice):
+                try:
+                    os.remove(os.path.join(self.directorio, nombre))
+                except OSError:
+                    continue
+                del self._indice[nombre]
+
+    def estadisticas(self):
+        with self._lock:
+            self._cargar_indice()
+            consultas = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._indice),
+                "bytes": sum(tam for tam, _ in self._indice.values()),
+                "max_bytes": self.max_bytes,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": self.aciertos / consultas if consultas else 0.0,
+                "desalojos": self.desalojos,
+            }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Caché de frases del robot")
+    parser.add_argument("--directorio", default=DIRECTORIO_POR_DEFECTO)
+    parser.add_argument("--vaciar", action="store_true", help="borra todas las frases cacheadas")
+    args = parser.parse_args(argv)
+    cache = CacheVoz(args.directorio)
+    if args.vaciar:
+        cache.vaciar()
+        print("Caché vaciada.")
+    est = cache.estadisticas()
+    print(f"{est['entradas']} frases, {est['bytes'] / 1024:.0f} KiB de {est['max_bytes'] / 1024 / 1024:.0f} MiB "
+          f"en {args.directorio}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,284 @@
+"""Llena la caché de frases antes de empezar la clase.
+
+Recorre los juegos (``color/``, ``numeros/``, ``figurasGeometricas/`` y
+``direccion/``) sin importarlos, con ``ast``, y reúne:
+
+- los literales de ``hablar("...")`` y ``decir("...")``;
+- las f-strings, expandidas sobre los valores conocidos de cada
+  expresión (dígitos 0-9, colores de ``COLOR_RANGES``/``COLORS``, las
+  cuatro figuras, números de ronda...);
+- los trozos de cada ``Plantilla`` declarada en el módulo.
+
+Después sintetiza lo que falte con un número acotado de hilos y muestra
+la cobertura, los fallos y el tiempo total::
+
+    python -m comun.calentar_voz                # sintetizar lo que falte
+    python -m comun.calentar_voz --listar       # sólo mostrar las frases
+    python -m comun.calentar_voz --hilos 8 --backends local
+"""
+import argparse
+import ast
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+from comun.plantillas import Plantilla
+
+CARPETAS = ("color", "numeros", "figurasGeometricas", "direccion")
+FUNCIONES_VOZ = {"hablar", "decir"}
+# más combinaciones que esto en una sola f-string se considera no expandible
+MAX_EXPANSIONES = 200
+
+DIGITOS = [str(d) for d in range(10)]
+RONDAS = [str(n) for n in range(1, 11)]
+SEGUNDOS = ["10", "15", "20"]
+LADOS = ["derecha", "izquierda"]
+
+# dominio de cada expresión que aparece dentro de las f-strings, por carpeta;
+# "colores" y "figuras" se leen de los propios juegos
+EXPRESIONES = {
+    "color": {"objetivo": "colores", "target": "colores", "best_seen": "colores",
+              "r + 1": RONDAS, "timeout": SEGUNDOS},
+    "numeros": {"objetivo": DIGITOS, "numero_a_mostrar": DIGITOS, "intento_usuario": DIGITOS,
+                "best_pred": DIGITOS, "i + 1": RONDAS, "r + 1": RONDAS, "rondas": RONDAS,
+                "puntuacion": [str(n) for n in range(11)], "timeout_sec": SEGUNDOS},
+    "figurasGeometricas": {"objetivo": "figuras", "detectado": "figuras"},
+    "direccion": {"objetivo.lower()": LADOS, "direction.lower()": LADOS,
+                  "r + 1": RONDAS, "timeout": SEGUNDOS},
+}
+
+
+class NoEvaluable(Exception):
+    pass
+
+
+def _evaluar(nodo, entorno):
+    """Evalúa expresiones sencillas de nivel de módulo (listas, range, claves de dict)."""
+    if isinstance(nodo, ast.Name):
+        if nodo.id not in entorno:
+            raise NoEvaluable(nodo.id)
+        return _evaluar(entorno[nodo.id], entorno)
+    if isinstance(nodo, ast.Call) and isinstance(nodo.func, ast.Name):
+        args = [_evaluar(a, entorno) for a in nodo.args]
+        if nodo.func.id == "range" and not nodo.keywords:
+            return list(range(*args))
+        if nodo.func.id in ("list", "tuple", "sorted") and len(args) == 1:
+            return list(args[0])
+    if isinstance(nodo, ast.Call) and isinstance(nodo.func, ast.Attribute) \
+            and nodo.func.attr == "keys" and not nodo.args:
+        return list(_evaluar(nodo.func.value, entorno))
+    if isinstance(nodo, ast.Dict):
+        return {_evaluar(k, entorno): None for k in nodo.keys}
+    try:
+        return ast.literal_eval(nodo)
+    except ValueError:
+        raise NoEvaluable(ast.unparse(nodo)) from None
+
+
+def _entorno(arbol):
+    """Nombre -> expresión de las asignaciones simples de nivel de módulo."""
+    entorno = {}
+    for nodo in arbol.body:
+        if isinstance(nodo, ast.Assign) and len(nodo.targets) == 1 and isinstance(nodo.targets[0], ast.Name):
+            entorno[nodo.targets[0].id] = nodo.value
+    return entorno
+
+
+def _nombre_funcion(llamada):
+    f = llamada.func
+    if isinstance(f, ast.Name):
+        return f.id
+    if isinstance(f, ast.Attribute):
+        return f.attr
+    return None
+
+
+class Recolector:
+    """Reúne frases, trozos de plantillas y f-strings que no se pudieron expandir."""
+
+    def __init__(self, raiz=RAIZ, carpetas=CARPETAS):
+        self.raiz = raiz
+        self.carpetas = carpetas
+        self.frases = {}          # texto -> primer "archivo:línea" donde aparece
+        self.no_expandidas = []   # (lugar, código, motivo)
+        self._arboles = {}
+
+    def _archivos(self, carpeta):
+        directorio = os.path.join(self.raiz, carpeta)
+        if not os.path.isdir(directorio):
+            return []
+        return sorted(os.path.join(directorio, n) for n in os.listdir(directorio) if n.endswith(".py"))
+
+    def _arbol(self, ruta):
+        if ruta not in self._arboles:
+            with open(ruta, encoding="utf-8") as f:
+                self._arboles[ruta] = ast.parse(f.read(), filename=ruta)
+        return self._arboles[ruta]
+
+    def _dominio_comun(self, carpeta, nombres):
+        """Une los valores de las constantes ``nombres`` definidas en ``carpeta``."""
+        valores = []
+        for ruta in self._archivos(carpeta):
+            entorno = _entorno(self._arbol(ruta))
+            for nombre in nombres:
+                if nombre in entorno:
+                    try:
+                        valores.extend(str(v) for v in _evaluar(entorno[nombre], entorno))
+                    except NoEvaluable:
+                        pass
+        return list(dict.fromkeys(valores))
+
+    def dominios(self):
+        return {
+            "colores": self._dominio_comun("color", ("COLOR_RANGES", "COLORS")),
+            "figuras": self._dominio_comun("figurasGeometricas", ("FIGURAS",)),
+        }
+
+    def _agregar(self, texto, lugar):
+        texto = texto.strip()
+        if texto:
+            self.frases.setdefault(texto, lugar)
+
+    def _expandir(self, fstring, expresiones, dominios):
+        """Devuelve las frases de una f-string o lanza NoEvaluable con el motivo."""
+        partes = []
+        for valor in fstring.values:
+            if isinstance(valor, ast.Constant):
+                partes.append([str(valor.value)])
+                continue
+            codigo = ast.unparse(valor.value)
+            if valor.format_spec is not None or valor.conversion != -1:
+                raise NoEvaluable(f"formato no admitido en {{{codigo}}}")
+            dominio = expresiones.get(codigo)
+            if isinstance(dominio, str):
+                dominio = dominios.get(dominio)
+            if not dominio:
+                raise NoEvaluable(f"valores desconocidos para {{{codigo}}}")
+            partes.append(dominio)
+        total = 1
+        for p in partes:
+            total *= len(p)
+        if total > MAX_EXPANSIONES:
+            raise NoEvaluable(f"{total} combinaciones")
+        return ["".join(c) for c in itertools.product(*partes)]
+
+    def recorrer(self):
+        dominios = self.dominios()
+        for carpeta in self.carpetas:
+            expresiones = EXPRESIONES.get(carpeta, {})
+            for ruta in self._archivos(carpeta):
+                arbol = self._arbol(ruta)
+                entorno = _entorno(arbol)
+                relativa = os.path.relpath(ruta, self.raiz)
+                for nodo in ast.walk(arbol):
+                    if not isinstance(nodo, ast.Call):
+                        continue
+                    lugar = f"{relativa}:{nodo.lineno}"
+                    nombre = _nombre_funcion(nodo)
+                    if nombre == "Plantilla":
+                        self._plantilla(nodo, entorno, lugar)
+                    elif nombre in FUNCIONES_VOZ and nodo.args:
+                        self._frase(nodo.args[0], entorno, expresiones, dominios, lugar)
+        return self
+
+    def _plantilla(self, nodo, entorno, lugar):
+        try:
+            formato = _evaluar(nodo.args[0], entorno)
+            valores = {k.arg: _evaluar(k.value, entorno) for k in nodo.keywords}
+            plantilla = Plantilla(formato, **valores)
+        except (NoEvaluable, ValueError, IndexError) as e:
+            self.no_expandidas.append((lugar, ast.unparse(nodo)[:60], f"plantilla: {e}"))
+            return
+        for trozo in plantilla.trozos():
+            self._agregar(trozo, lugar)
+
+    def _frase(self, arg, entorno, expresiones, dominios, lugar):
+        if isinstance(arg, ast.Constant) and isinstance(arg.value, str):
+            self._agregar(arg.value, lugar)
+        elif isinstance(arg, ast.JoinedStr):
+            try:
+                for texto in self._expandir(arg, expresiones, dominios):
+                    self._agregar(texto, lugar)
+            except NoEvaluable as e:
+                self.no_expandidas.append((lugar, ast.unparse(arg), str(e)))
+        elif isinstance(arg, ast.IfExp):
+            # decir(A(...) if cond else B(...)): las dos ramas
+            self._frase(arg.body, entorno, expresiones, dominios, lugar)
+            self._frase(arg.orelse, entorno, expresiones, dominios, lugar)
+        elif isinstance(arg, ast.Call) and isinstance(arg.func, ast.Name) \
+                and isinstance(entorno.get(arg.func.id), ast.Call) \
+                and _nombre_funcion(entorno[arg.func.id]) == "Plantilla":
+            pass  # frase con plantilla: sus trozos se recogen en la declaración
+        else:
+            self.no_expandidas.append((lugar, ast.unparse(arg), "no es un texto fijo"))
+
+
+def calentar(frases, sintesis, hilos=4, progreso=print):
+    """Sintetiza las frases que falten; devuelve (ya_estaban, sintetizadas, {frase: error})."""
+    pendientes = [t for t in frases if sintesis.en_cache(t) is None]
+    ya_estaban = len(frases) - len(pendientes)
+    fallos = {}
+    hechas = 0
+    with ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="calentar-voz") as pool:
+        futuros = {pool.submit(sintesis.obtener, t): t for t in pendientes}
+        for i, futuro in enumerate(as_completed(futuros), 1):
+            texto = futuros[futuro]
+            try:
+                futuro.result()
+                hechas += 1
+            except Exception as e:
+                fallos[texto] = e
+            if progreso and (i % 20 == 0 or i == len(pendientes)):
+                progreso(f"  {i}/{len(pendientes)} sintetizadas...")
+    return ya_estaban, hechas, fallos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precalienta la caché de frases de los juegos")
+    parser.add_argument("--hilos", type=int, default=4, help="síntesis simultáneas (por defecto 4)")
+    parser.add_argument("--backends", help="orden de backends de voz (por defecto ROBOT_VOZ o gtts,local)")
+    parser.add_argument("--listar", action="store_true", help="sólo mostrar las frases encontradas")
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    recolector = Recolector().recorrer()
+    frases = list(recolector.frases)
+    print(f"{len(frases)} frases encontradas en {', '.join(CARPETAS)}.")
+    if recolector.no_expandidas:
+        print(f"{len(recolector.no_expandidas)} frases no se pueden preparar de antemano:")
+        for lugar, codigo, motivo in recolector.no_expandidas:
+            print(f"  {lugar}: {codigo}  ({motivo})")
+    if args.listar:
+        for texto in frases:
+            print(f"  {recolector.frases[texto]}: {texto}")
+        return 0
+
+    from comun.cache_voz import CacheVoz
+    from comun.sintesis import Sintesis
+    sintesis = Sintesis(CacheVoz(), args.backends)
+    ya_estaban, hechas, fallos = calentar(frases, sintesis, max(1, args.hilos))
+    total = time.perf_counter() - inicio
+
+    listas = ya_estaban + hechas
+    print(f"Cobertura: {listas}/{len(frases)} frases en caché ({100 * listas / max(1, len(frases)):.0f}%), "
+          f"{ya_estaban} ya estaban, {hechas} sintetizadas, {len(fallos)} fallos.")
+    for texto, error in list(fallos.items())[:10]:
+        print(f"  fallo: {texto!r}: {error}")
+    if len(fallos) > 10:
+        print(f"  ... y {len(fallos) - 10} fallos más.")
+    for nombre, m in sintesis.estadisticas().items():
+        if m["llamadas"]:
+            print(f"  {nombre}: {m['llamadas']} llamadas, {m['fallos']} fallos, "
+                  f"{1000 * m['latencia_media']:.0f} ms de media")
+    print(f"Tiempo total: {total:.1f} s")
+    return 1 if fallos else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,303 @@
+"""Cámara compartida entre procesos mediante memoria compartida.
+
+Un proceso servidor (lanzado por ``main.py --camara-compartida``) es el
+único que abre la cámara. Publica cada frame en un anillo de ranuras dentro
+de un bloque ``multiprocessing.shared_memory``, cada una con su número de
+secuencia y su marca de tiempo. Los juegos lanzados desde el menú leen la
+variable de entorno ``ROBOT_CAMARA_SHM`` y se conectan al anillo como
+lectores: "abrir la cámara" pasa a ser mapear memoria, y varios juegos
+pueden leer los mismos frames a la vez.
+
+Distribución del bloque compartido::
+
+    cabecera   int64[8]      MAGICO, alto, ancho, canales, ranuras, última secuencia, activo, -
+    secuencias int64[ranuras]   secuencia del frame guardado en cada ranura (-1 mientras se escribe)
+    tiempos    float64[ranuras] time.time() de captura de cada ranura
+    frames     uint8[ranuras, alto, ancho, canales]
+"""
+import multiprocessing
+import os
+import queue
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+VARIABLE_ENTORNO = "ROBOT_CAMARA_SHM"
+
+MAGICO = 0x524F424F  # "ROBO"
+_CAB_MAGICO, _CAB_ALTO, _CAB_ANCHO, _CAB_CANALES, _CAB_RANURAS, _CAB_SEQ, _CAB_ACTIVO = range(7)
+_TAM_CABECERA = 8 * 8
+
+# mismos valores que cv2.CAP_PROP_FRAME_WIDTH / HEIGHT, para no importar cv2 aquí
+_PROP_ANCHO = 3
+_PROP_ALTO = 4
+
+# bloques servidos por un hijo de este proceso (comparten su resource_tracker)
+_servidos_aqui = set()
+
+
+def _alinear(n, a=64):
+    return (n + a - 1) // a * a
+
+
+def _adjuntar_shm(nombre):
+    """Se conecta a un bloque existente sin que este proceso lo borre al salir."""
+    try:
+        return shared_memory.SharedMemory(name=nombre, track=False)  # Python 3.13+
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=nombre)
+        if os.name == "posix" and nombre not in _servidos_aqui:
+            # el resource_tracker de versiones anteriores borraría el bloque del servidor
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+class AnilloFrames:
+    """Anillo de frames con números de secuencia sobre un bloque de memoria compartida."""
+
+    def __init__(self, shm, propietario=False):
+        self.shm = shm
+        self.propietario = propietario
+        cab = np.ndarray((8,), dtype=np.int64, buffer=shm.buf)
+        if cab[_CAB_MAGICO] != MAGICO:
+            raise ValueError(f"El bloque '{shm.name}' no es un anillo de cámara.")
+        self.forma = (int(cab[_CAB_ALTO]), int(cab[_CAB_ANCHO]), int(cab[_CAB_CANALES]))
+        self.ranuras = int(cab[_CAB_RANURAS])
+        self._cab = cab
+        self._seqs = np.ndarray((self.ranuras,), dtype=np.int64, buffer=shm.buf, offset=_TAM_CABECERA)
+        self._tiempos = np.ndarray((self.ranuras,), dtype=np.float64, buffer=shm.buf,
+                                   offset=_TAM_CABECERA + 8 * self.ranuras)
+        self._frames = np.ndarray((self.ranuras,) + self.forma, dtype=np.uint8, buffer=shm.buf,
+                                  offset=_alinear(_TAM_CABECERA + 16 * self.ranuras))
+
+    @classmethod
+    def crear(cls, nombre, forma, ranuras=4):
+        if len(forma) == 2:
+            forma = (forma[0], forma[1], 1)
+        inicio_frames = _alinear(_TAM_CABECERA + 16 * ranuras)
+        tam = inicio_frames + ranuras * int(np.prod(forma))
+        shm = shared_memory.SharedMemory(name=nombre, create=True, size=tam)
+        cab = np.ndarray((8,), dtype=np.int64, buffer=shm.buf)
+        cab[:] = 0
+        cab[_CAB_ALTO], cab[_CAB_ANCHO], cab[_CAB_CANALES] = forma
+        cab[_CAB_RANURAS] = ranuras
+        cab[_CAB_ACTIVO] = 1
+        cab[_CAB_MAGICO] = MAGICO
+        return cls(shm, propietario=True)
+
+    @classmethod
+    def adjuntar(cls, nombre):
+        return cls(_adjuntar_shm(nombre))
+
+    @property
+    def activo(self):
+        return bool(self._cab[_CAB_ACTIVO])
+
+    def ultima_secuencia(self):
+        return int(self._cab[_CAB_SEQ])
+
+    def escribir(self, frame, marca=None):
+        """Publica un frame en la siguiente ranura y devuelve su número de secuencia."""
+        seq = int(self._cab[_CAB_SEQ]) + 1
+        i = seq % self.ranuras
+        self._seqs[i] = -1  # los lectores descartan la ranura mientras se sobrescribe
+        self._frames[i] = frame.reshape(self.forma)
+        self._tiempos[i] = time.time() if marca is None else marca
+        self._seqs[i] = seq
+        self._cab[_CAB_SEQ] = seq
+        return seq
+
+    def vigente(self, seq):
+        """True si la ranura del frame ``seq`` todavía lo contiene (no se ha empezado a sobrescribir)."""
+        return int(self._seqs[seq % self.ranuras]) == seq
+
+    def leer(self, seq=None, copiar=True):
+        """Devuelve ``(seq, marca, frame)`` del frame ``seq`` (o del último), o None.
+
+        Con ``copiar=False`` el frame es una vista directa de la memoria
+        compartida: no hay copia, pero sólo es válido hasta que el servidor
+        dé la vuelta al anillo (``ranuras - 1`` frames).
+        """
+        for _ in range(3):
+            s = self.ultima_secuencia() if seq is None else seq
+            if s <= 0:
+                return None
+            i = s % self.ranuras
+            if self._seqs[i] != s:
+                if seq is not None:
+                    return None  # ya se sobrescribió
+                continue
+            frame = self._frames[i].copy() if copiar else self._frames[i]
+            marca = float(self._tiempos[i])
+            if self._seqs[i] == s:
+                if self.forma[2] == 1:
+                    frame = frame[:, :, 0]
+                return s, marca, frame
+        return None
+
+    def cerrar(self):
+        if self.propietario:
+            self._cab[_CAB_ACTIVO] = 0
+        # soltar las vistas antes de cerrar el mmap
+        self._cab = self._seqs = self._tiempos = self._frames = None
+        self.shm.close()
+        if self.propietario:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class LectorCamara:
+    """Lector del anillo con la misma interfaz básica que ``cv2.VideoCapture``."""
+
+    def __init__(self, nombre, timeout=1.0):
+        self.anillo = AnilloFrames.adjuntar(nombre)
+        self.timeout = timeout
+        self._ultima = 0
+        self.entregados = 0
+        self.descartados = 0
+
+    def isOpened(self):
+        return self.anillo is not None and self.anillo.activo
+
+    def read(self, copiar=True):
+        """Espera un frame más nuevo que el último leído y devuelve ``(ok, frame)``.
+
+        Con ``copiar=False`` el frame es una vista de la memoria compartida;
+        ``vigente()`` dice si el servidor aún no la ha sobrescrito.
+        """
+        resultado = self.leer(copiar=copiar)
+        if resultado is None:
+            return False, None
+        return True, resultado[2]
+
+    def vigente(self, seq=None):
+        """Como ``AnilloFrames.vigente`` para ``seq`` o, por defecto, el último frame leído."""
+        return self.anillo.vigente(self._ultima if seq is None else seq)
+
+    def leer_transformado(self, transformar, intentos=3):
+        """
+        ``(ok, transformar(frame))`` sin copiar el frame a la memoria del
+        juego: ``transformar`` (p. ej. ``cv2.flip``) lee la vista compartida y
+        devuelve un array nuevo. Si la ranura se sobrescribió mientras tanto
+        el resultado se descarta y se repite con un frame más nuevo; tras
+        ``intentos`` fallidos se transforma una copia.
+        """
+        for _ in range(intentos):
+            resultado = self.leer(copiar=False)
+            if resultado is None:
+                return False, None
+            salida = transformar(resultado[2])
+            if self.anillo.vigente(resultado[0]):
+                return True, salida
+        ok, frame = self.read(copiar=True)
+        return (True, transformar(frame)) if ok else (False, None)
+
+    def leer(self, copiar=True):
+        """Como ``read`` pero devuelve ``(seq, marca, frame)`` o None si se agota el tiempo."""
+        if self.anillo is None:
+            return None
+        limite = time.monotonic() + self.timeout
+        while True:
+            if self.anillo.ultima_secuencia() > self._ultima:
+                resultado = self.anillo.leer(copiar=copiar)
+                if resultado is not None:
+                    if self._ultima:
+                        # frames publicados que este lector nunca llegó a pedir
+                        self.descartados += resultado[0] - self._ultima - 1
+                    self._ultima = resultado[0]
+                    self.entregados += 1
+                    return resultado
+            if not self.anillo.activo or time.monotonic() > limite:
+                return None
+            time.sleep(0.002)
+
+    def estadisticas(self):
+        return {"entregados": self.entregados, "descartados": self.descartados}
+
+    def get(self, prop):
+        if prop == _PROP_ANCHO:
+            return float(self.anillo.forma[1])
+        if prop == _PROP_ALTO:
+            return float(self.anillo.forma[0])
+        return 0.0
+
+    def set(self, prop, valor):
+        # las propiedades de la cámara sólo las puede cambiar el servidor
+        return False
+
+    def release(self):
+        if self.anillo is not None:
+            self.anillo.cerrar()
+            self.anillo = None
+
+
+def _servir(nombre, indice, ranuras, estado, parar):
+    import cv2
+    cap = cv2.VideoCapture(indice)
+    ok, frame = cap.read() if cap.isOpened() else (False, None)
+    if not ok:
+        cap.release()
+        estado.put(("error", "No se pudo abrir la cámara."))
+        return
+    try:
+        anillo = AnilloFrames.crear(nombre, frame.shape, ranuras)
+    except Exception as e:
+        cap.release()
+        estado.put(("error", str(e)))
+        return
+    estado.put(("ok", frame.shape))
+    try:
+        anillo.escribir(frame)
+        while not parar.is_set():
+            ok, frame = cap.read()
+            if not ok or frame.shape[:2] != anillo.forma[:2]:
+                time.sleep(0.01)
+                continue
+            anillo.escribir(frame)
+    finally:
+        anillo.cerrar()
+        cap.release()
+
+
+class ServidorCamara:
+    """Proceso que abre la cámara y publica sus frames en memoria compartida."""
+
+    def __init__(self, indice=0, ranuras=4, nombre=None):
+        self.indice = indice
+        self.ranuras = ranuras
+        self.nombre = nombre or f"robot_camara_{os.getpid()}"
+        self._ctx = multiprocessing.get_context("spawn")
+        self._parar = self._ctx.Event()
+        self._proceso = None
+
+    def iniciar(self, timeout=10.0):
+        """Lanza el servidor y espera a que publique el primer frame. Devuelve True si funcionó."""
+        estado = self._ctx.Queue()
+        self._proceso = self._ctx.Process(
+            target=_servir, args=(self.nombre, self.indice, self.ranuras, estado, self._parar),
+            name="servidor-camara", daemon=True)
+        self._proceso.start()
+        _servidos_aqui.add(self.nombre)
+        try:
+            resultado, detalle = estado.get(timeout=timeout)
+        except queue.Empty:
+            resultado, detalle = "error", "el servidor de cámara no respondió a tiempo"
+        if resultado != "ok":
+            print(f"Cámara compartida no disponible: {detalle}")
+            self.detener()
+            return False
+        return True
+
+    def detener(self, timeout=3.0):
+        if self._proceso is None:
+            return
+        self._parar.set()
+        self._proceso.join(timeout)
+        if self._proceso.is_alive():
+            self._proceso.terminate()
+        self._proceso = None
+        _servidos_aqui.discard(self.nombre)
@@ -0,0 +1,117 @@
+"""Captura de cámara en un hilo con semántica de "gana el último frame".
+
+Los juegos leen la cámara, procesan el frame (máscaras HSV, contornos,
+``model.predict`` o MediaPipe) y sólo entonces vuelven a leer. Si procesar
+tarda más que un frame, el buffer del driver se llena y la respuesta en
+pantalla llega con varios frames de retraso. ``CapturaEnHilo`` lee la
+cámara continuamente en segundo plano y guarda sólo el frame más reciente,
+de modo que cada ``read()`` devuelve el último frame capturado (nunca uno
+ya entregado) y la latencia queda acotada por un paso de procesamiento.
+"""
+import threading
+import time
+
+
+class CapturaEnHilo:
+    """Envuelve una fuente con ``read()`` (``cv2.VideoCapture`` o similar).
+
+    Ofrece la misma interfaz básica (``read``, ``isOpened``, ``get``, ``set``,
+    ``release``), además de ``leer()`` con número de secuencia y marca de
+    tiempo, y contadores de frames capturados, entregados y descartados.
+    Cada frame se entrega a un solo consumidor.
+    """
+
+    def __init__(self, fuente, timeout=1.0, iniciar=True):
+        self.fuente = fuente
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        self._frame = None
+        self._marca = 0.0
+        self._seq = 0
+        self._entregado = 0
+        self._activo = False
+        self._hilo = None
+        self.capturados = 0
+        self.entregados = 0
+        self.descartados = 0
+        self.fallos = 0
+        self._edad_total = 0.0
+        if iniciar:
+            self.iniciar()
+
+    def iniciar(self):
+        if self._hilo is not None:
+            return
+        self._activo = True
+        self._hilo = threading.Thread(target=self._bucle, name="captura-camara", daemon=True)
+        self._hilo.start()
+
+    def _bucle(self):
+        while self._activo:
+            ok, frame = self.fuente.read()
+            marca = time.time()
+            if not ok:
+                self.fallos += 1
+                time.sleep(0.01)
+                continue
+            with self._cond:
+                if self._seq > self._entregado:
+                    # nadie pidió el frame anterior: se descarta en favor de éste
+                    self.descartados += 1
+                self._frame = frame
+                self._marca = marca
+                self._seq += 1
+                self.capturados += 1
+                self._cond.notify_all()
+
+    def leer(self, timeout=None):
+        """Devuelve ``(seq, marca, frame)`` del frame más reciente aún no entregado, o None."""
+        timeout = self.timeout if timeout is None else timeout
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > self._entregado or not self._activo, timeout)
+            if self._seq <= self._entregado:
+                return None
+            self._entregado = self._seq
+            self.entregados += 1
+            self._edad_total += time.time() - self._marca
+            return self._seq, self._marca, self._frame
+
+    def read(self):
+        resultado = self.leer()
+        if resultado is None:
+            return False, None
+        return True, resultado[2]
+
+    def leer_transformado(self, transformar):
+        """Como ``LectorCamara.leer_transformado``; aquí cada frame ya es propio, no hay copia que evitar."""
+        ok, frame = self.read()
+        return (True, transformar(frame)) if ok else (False, None)
+
+    def estadisticas(self):
+        """Contadores de captura y edad media (s) de los frames al entregarlos."""
+        with self._cond:
+            return {
+                "capturados": self.capturados,
+                "entregados": self.entregados,
+                "descartados": self.descartados,
+                "fallos": self.fallos,
+                "edad_media": self._edad_total / self.entregados if self.entregados else 0.0,
+            }
+
+    def isOpened(self):
+        return self._activo and self.fuente.isOpened()
+
+    def get(self, prop):
+        return self.fuente.get(prop)
+
+    def set(self, prop, valor):
+        return self.fuente.set(prop, valor)
+
+    def release(self):
+        self._activo = False
+        with self._cond:
+            self._cond.notify_all()
+        if self._hilo is not None:
+            self._hilo.join(timeout=2.0)
+            self._hilo = None
+        self.fuente.release()
@@ -0,0 +1,384 @@
+"""Corpus de respuestas grabadas y banco de pruebas del camino de voz.
+
+Todas las funciones de escucha leían de un ``sr.Microphone()`` en vivo, así
+que no había forma de medir la latencia del reconocimiento ni de comprobar
+que un cambio no la empeora. Este módulo añade:
+
+- grabación: con la variable ``ROBOT_CORPUS`` (o ``main.py --grabar-corpus``)
+  el micrófono compartido guarda cada respuesta en wav junto con el
+  contexto del juego (vocabulario y respuesta esperada) en
+  ``corpus.jsonl``;
+- ``FuenteGrabada``: sustituto de ``Microfono`` que reproduce esas
+  grabaciones con ``sr.AudioFile`` y las pasa por el mismo detector de voz.
+  Se puede pasar como ``mic=`` a ``escuchar_numero``, ``reconocer_audio``
+  y ``escuchar`` de los juegos;
+- el banco de pruebas, que recorre el corpus con cada reconocedor y mide
+  el cierre de frase, la latencia del reconocimiento y los aciertos::
+
+    python -m comun.corpus estado
+    python -m comun.corpus benchmark --reconocedores corpus,palabras
+
+``corpus`` compara cada grabación con las demás del corpus (MFCC y DTW de
+``comun/palabras.py``), así que funciona sin red ni grabaciones aparte;
+``palabras`` usa las referencias de ``python -m comun.palabras grabar`` y
+``google`` el servicio en línea.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+from comun import intenciones
+from comun.vad import DetectorVoz, Segmentador
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VARIABLE_ENTORNO = "ROBOT_CORPUS"
+DIRECTORIO_POR_DEFECTO = os.environ.get(VARIABLE_ENTORNO) or os.path.join(RAIZ, "corpus_voz")
+MANIFIESTO = "corpus.jsonl"
+
+# segundos de silencio que se añaden tras cada grabación para que el VAD pueda cerrarla
+SILENCIO_FINAL = 0.6
+
+
+class Grabadora:
+    """Guarda las respuestas que escucha el micrófono con su contexto."""
+
+    def __init__(self, directorio=DIRECTORIO_POR_DEFECTO):
+        self.directorio = directorio
+        self._lock = threading.Lock()
+
+    def guardar(self, audio, contexto, escucha=None):
+        """Escribe el wav y añade una línea al manifiesto; devuelve la ruta."""
+        juego = contexto.get("juego", "general")
+        carpeta = os.path.join(self.directorio, juego)
+        os.makedirs(carpeta, exist_ok=True)
+        with self._lock:
+            nombre = f"{time.strftime('%Y%m%d-%H%M%S')}-{len(os.listdir(carpeta)) + 1:04d}.wav"
+            ruta = os.path.join(carpeta, nombre)
+            with open(ruta, "wb") as f:
+                f.write(audio.get_wav_data())
+            entrada = dict(contexto, ruta=os.path.relpath(ruta, self.directorio),
+                           fecha=time.strftime("%Y-%m-%d %H:%M:%S"))
+            if escucha is not None:
+                entrada.update({k: escucha[k] for k in ("duracion", "voz", "latencia_cierre")})
+            with open(os.path.join(self.directorio, MANIFIESTO), "a", encoding="utf-8") as f:
+                f.write(json.dumps(entrada, ensure_ascii=False) + "\n")
+        return ruta
+
+
+def grabadora_de_entorno():
+    """``Grabadora`` si ``ROBOT_CORPUS`` está definida, si no None."""
+    directorio = os.environ.get(VARIABLE_ENTORNO)
+    return Grabadora(directorio) if directorio else None
+
+
+def leer_corpus(directorio=DIRECTORIO_POR_DEFECTO):
+    """Entradas del manifiesto con la ruta absoluta del wav."""
+    ruta = os.path.join(directorio, MANIFIESTO)
+    if not os.path.exists(ruta):
+        return []
+    entradas = []
+    with open(ruta, encoding="utf-8") as f:
+        for linea in f:
+            if linea.strip():
+                entrada = json.loads(linea)
+                entrada["ruta"] = os.path.join(directorio, entrada["ruta"])
+                entradas.append(entrada)
+    return entradas
+
+
+# --- reconocedores para reproducir el corpus ---
+
+def _palabra_esperada(entrada):
+    """Palabra del vocabulario de ``comun/palabras.py`` que corresponde a la respuesta esperada."""
+    from comun.palabras import VOCABULARIOS
+    esperado = entrada.get("esperado")
+    palabras = VOCABULARIOS.get(entrada.get("vocabulario"), [])
+    if isinstance(esperado, int):
+        return palabras[esperado] if 0 <= esperado < len(palabras) else None
+    return esperado if esperado in palabras else None
+
+
+class ReconocedorGoogle:
+    nombre = "google"
+
+    def __init__(self, idioma="es-ES"):
+        import speech_recognition as sr
+        self._reconocedor = sr.Recognizer()
+        self.idioma = idioma
+
+    def hipotesis(self, audio, entrada):
+        resultado = self._reconocedor.recognize_google(audio, language=self.idioma, show_all=True)
+        if not resultado or not resultado.get("alternative"):
+            return []
+        return [(a["transcript"], a.get("confidence")) for a in resultado["alternative"]]
+
+
+class ReconocedorReferencias:
+    """Palabras grabadas con ``python -m comun.palabras grabar``."""
+    nombre = "palabras"
+
+    def __init__(self, directorio=None):
+        from comun.palabras import BancoPalabras, DIRECTORIO_POR_DEFECTO as DIRECTORIO_PALABRAS
+        self.banco = BancoPalabras(directorio or DIRECTORIO_PALABRAS)
+
+    def hipotesis(self, audio, entrada):
+        reconocedor = self.banco.reconocedor(entrada["vocabulario"])
+        if not reconocedor.disponible():
+            return []
+        return [(c.palabra, c.probabilidad) for c in reconocedor.reconocer(audio)]
+
+
+class ReconocedorCorpus:
+    """Dejar uno fuera: cada grabación se compara con las demás del corpus."""
+    nombre = "corpus"
+
+    def __init__(self, entradas):
+        from comun.palabras import ReconocedorPalabras, VOCABULARIOS, leer_wav, mfcc
+        self._reconocedores = {v: ReconocedorPalabras(p) for v, p in VOCABULARIOS.items()}
+        self._por_ruta = {}
+        for entrada in entradas:
+            palabra = _palabra_esperada(entrada)
+            if palabra is None:
+                continue
+            caracteristicas = mfcc(leer_wav(entrada["ruta"]))
+            self._reconocedores[entrada["vocabulario"]].referencias[palabra].append(caracteristicas)
+            self._por_ruta[entrada["ruta"]] = (entrada["vocabulario"], palabra, caracteristicas)
+
+    def hipotesis(self, audio, entrada):
+        reconocedor = self._reconocedores.get(entrada.get("vocabulario"))
+        if reconocedor is None:
+            return []
+        propia = self._por_ruta.get(entrada["ruta"])
+        if propia is None:
+            return [(c.palabra, c.probabilidad) for c in reconocedor.reconocer(audio)]
+        # fuera del conjunto mientras se reconoce a sí misma
+        refs = reconocedor.referencias[propia[1]]
+        indice = next(i for i, ref in enumerate(refs) if ref is propia[2])
+        refs.pop(indice)
+        try:
+            return [(c.palabra, c.probabilidad) for c in reconocedor.reconocer(audio)]
+        finally:
+            refs.insert(indice, propia[2])
+
+
+RECONOCEDORES = ("corpus", "palabras", "google")
+
+
+def crear_reconocedor(nombre, entradas):
+    if nombre == "corpus":
+        return ReconocedorCorpus(entradas)
+    if nombre == "palabras":
+        return ReconocedorReferencias()
+    if nombre == "google":
+        return ReconocedorGoogle()
+    raise ValueError(f"Reconocedor desconocido: {nombre!r} (disponibles: {', '.join(RECONOCEDORES)})")
+
+
+# --- reproducción ---
+
+class FuenteGrabada:
+    """Sustituto de ``Microfono`` que entrega las grabaciones del corpus en orden.
+
+    Cada grabación se lee con ``sr.AudioFile`` y se pasa en bloques del mismo
+    tamaño que el micrófono por ``DetectorVoz`` y ``Segmentador``, así que el
+    cierre de frase se mide igual que en vivo. ``ultima_escucha`` tiene las
+    mismas claves que la del micrófono más ``entrada`` (la línea del
+    manifiesto) y ``ms_vad`` (tiempo de CPU del detector).
+    """
+
+    def __init__(self, entradas, reconocedor, muestras_por_bloque=1024):
+        import speech_recognition as sr
+        self._sr = sr
+        self.entradas = list(entradas)
+        self.reconocedor = reconocedor
+        self.muestras_por_bloque = muestras_por_bloque
+        self._siguiente = 0
+        self.entrada = None
+        self.ultima_escucha = None
+
+    def agotada(self):
+        return self._siguiente >= len(self.entradas)
+
+    def escuchar(self, timeout=5, limite=5, preroll=None, durante_robot=False, corto=False, contexto=None):
+        if self.agotada():
+            raise self._sr.WaitTimeoutError("No quedan grabaciones en el corpus.")
+        self.entrada = self.entradas[self._siguiente]
+        self._siguiente += 1
+        with self._sr.AudioFile(self.entrada["ruta"]) as fuente:
+            grabado = self._sr.Recognizer().record(fuente)
+        frecuencia = grabado.sample_rate
+        muestras = np.frombuffer(grabado.get_raw_data(convert_width=2), dtype=np.int16)
+        silencio = np.zeros(int(SILENCIO_FINAL * frecuencia), dtype=np.int16)
+        muestras = np.concatenate([muestras, silencio])
+
+        inicio_cpu = time.perf_counter()
+        vad = DetectorVoz(frecuencia=frecuencia)
+        # como el micrófono: suelo de ruido calibrado con el relleno previo a la voz
+        vad.calibrar(vad.analizar(muestras[:int(0.25 * frecuencia)].tobytes())[0])
+        segmentador = Segmentador.modo("corto" if corto else "normal", vad.duracion_ventana)
+        seg = self.muestras_por_bloque / frecuencia
+        arranque = cierre = evento = None
+        posicion = 0
+        for posicion in range(0, len(muestras), self.muestras_por_bloque):
+            bloque = muestras[posicion:posicion + self.muestras_por_bloque].tobytes()
+            energia_db, voz = vad.analizar(bloque)
+            vad.adaptar(energia_db, voz)
+            evento = segmentador.agregar(voz)
+            if arranque is None and evento is not None:
+                arranque = posicion / frecuencia
+            if arranque is not None and (evento == "fin" or posicion / frecuencia - arranque >= limite):
+                break
+        cierre = (posicion + self.muestras_por_bloque) / frecuencia
+        ms_vad = 1000 * (time.perf_counter() - inicio_cpu)
+        if arranque is None:
+            raise self._sr.WaitTimeoutError("No se detectó habla en la grabación.")
+        fin_voz = cierre - (segmentador.silencio if evento == "fin" else 0.0)
+        ahora = time.monotonic()
+        self.ultima_escucha = {
+            "inicio": arranque - seg,
+            "fin": cierre,
+            "duracion": cierre,
+            "voz": segmentador.voz,
+            "preroll_usado": 0.0,
+            "trozos": int(round(cierre / seg)),
+            # como si la grabación hubiera sonado en tiempo real y acabado ahora
+            "fin_voz": ahora - (cierre - fin_voz),
+            "latencia_cierre": cierre - fin_voz,
+            "latencia_resultado": None,
+            "ms_vad": ms_vad,
+            "entrada": self.entrada,
+        }
+        return grabado
+
+    def _hipotesis(self, audio, escucha):
+        inicio = time.perf_counter()
+        try:
+            hipotesis = self.reconocedor.hipotesis(audio, self.entrada or {})
+        finally:
+            if escucha is not None:
+                escucha["ms_reconocimiento"] = 1000 * (time.perf_counter() - inicio)
+                escucha["latencia_resultado"] = time.monotonic() - escucha["fin_voz"]
+        if escucha is not None:
+            escucha["hipotesis"] = hipotesis
+        if not hipotesis:
+            raise self._sr.UnknownValueError()
+        return hipotesis
+
+    def reconocer(self, audio, idioma="es-ES", alternativas=False, escucha=None):
+        hipotesis = self._hipotesis(audio, escucha if escucha is not None else self.ultima_escucha)
+        return hipotesis if alternativas else hipotesis[0][0]
+
+    def reconocer_vocabulario(self, audio, vocabulario, respaldo=True, idioma="es-ES"):
+        return self._hipotesis(audio, self.ultima_escucha)[0][0]
+
+    def estadisticas(self):
+        return {"grabaciones": len(self.entradas), "reproducidas": self._siguiente}
+
+    def cerrar(self):
+        pass
+
+
+# --- banco de pruebas ---
+
+def _percentil(valores, p):
+    return float(np.percentile(valores, p)) if valores else 0.0
+
+
+def benchmark(entradas, nombre_reconocedor):
+    """Reproduce el corpus con un reconocedor y devuelve las métricas agregadas."""
+    entradas = [e for e in entradas if e.get("vocabulario") in intenciones.POR_VOCABULARIO]
+    fuente = FuenteGrabada(entradas, crear_reconocedor(nombre_reconocedor, entradas))
+    cierre, vad, reconocimiento = [], [], []
+    aciertos = sin_respuesta = errores = 0
+    while not fuente.agotada():
+        try:
+            audio = fuente.escuchar(corto=True)
+        except fuente._sr.WaitTimeoutError:
+            sin_respuesta += 1
+            continue
+        escucha = fuente.ultima_escucha
+        cierre.append(escucha["latencia_cierre"])
+        vad.append(escucha["ms_vad"])
+        try:
+            hipotesis = fuente.reconocer(audio, alternativas=True)
+        except fuente._sr.UnknownValueError:
+            sin_respuesta += 1
+            reconocimiento.append(escucha["ms_reconocimiento"])
+            continue
+        except Exception as e:
+            print(f"  {os.path.basename(fuente.entrada['ruta'])}: {e}")
+            errores += 1
+            continue
+        reconocimiento.append(escucha["ms_reconocimiento"])
+        gramatica = intenciones.POR_VOCABULARIO[fuente.entrada["vocabulario"]]
+        aciertos += gramatica.mejor(hipotesis) == fuente.entrada.get("esperado")
+    return {
+        "reconocedor": nombre_reconocedor,
+        "grabaciones": len(entradas),
+        "aciertos": aciertos,
+        "sin_respuesta": sin_respuesta,
+        "errores": errores,
+        "cierre_medio_s": float(np.mean(cierre)) if cierre else 0.0,
+        "cierre_p95_s": _percentil(cierre, 95),
+        "vad_medio_ms": float(np.mean(vad)) if vad else 0.0,
+        "reconocimiento_medio_ms": float(np.mean(reconocimiento)) if reconocimiento else 0.0,
+        "reconocimiento_p95_ms": _percentil(reconocimiento, 95),
+    }
+
+
+def _estado(args):
+    entradas = leer_corpus(args.directorio)
+    if not entradas:
+        print(f"No hay grabaciones en {args.directorio}. Graba con {VARIABLE_ENTORNO}=<carpeta> "
+              f"o python main.py --grabar-corpus <carpeta>.")
+        return 0
+    cuentas = {}
+    for entrada in entradas:
+        clave = (entrada.get("juego", "general"), entrada.get("vocabulario"))
+        cuentas[clave] = cuentas.get(clave, 0) + 1
+    for (juego, vocabulario), n in sorted(cuentas.items(), key=str):
+        print(f"{juego} ({vocabulario}): {n} grabaciones")
+    return 0
+
+
+def _benchmark(args):
+    entradas = leer_corpus(args.directorio)
+    if not entradas:
+        print(f"No hay grabaciones en {args.directorio}.")
+        return 1
+    for nombre in args.reconocedores.split(","):
+        try:
+            m = benchmark(entradas, nombre.strip())
+        except Exception as e:
+            print(f"{nombre}: no se pudo usar ({e})")
+            continue
+        total = m["grabaciones"] or 1
+        print(f"{m['reconocedor']:9s} aciertos {m['aciertos']}/{m['grabaciones']} ({100 * m['aciertos'] / total:.0f}%), "
+              f"sin respuesta {m['sin_respuesta']}, errores {m['errores']}")
+        print(f"{'':9s} cierre de frase {m['cierre_medio_s']:.2f} s (p95 {m['cierre_p95_s']:.2f} s, "
+              f"VAD {m['vad_medio_ms']:.1f} ms de CPU)")
+        print(f"{'':9s} reconocimiento {m['reconocimiento_medio_ms']:.0f} ms (p95 {m['reconocimiento_p95_ms']:.0f} ms)")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Corpus de respuestas grabadas y banco de pruebas de voz")
+    parser.add_argument("--directorio", default=DIRECTORIO_POR_DEFECTO)
+    sub = parser.add_subparsers(dest="orden", required=True)
+    sub.add_parser("estado", help="cuántas grabaciones hay por juego")
+    bench = sub.add_parser("benchmark", help="reproduce el corpus con cada reconocedor")
+    bench.add_argument("--reconocedores", default="corpus,palabras",
+                       help=f"separados por comas: {', '.join(RECONOCEDORES)}")
+    args = parser.parse_args(argv)
+    if args.orden == "benchmark":
+        return _benchmark(args)
+    return _estado(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,251 @@
+"""Decisión temporal para los juegos de visión: cuándo dar por buena una respuesta.
+
+Cada juego decidía a su manera: el detector de números aceptaba un solo
+frame con confianza suficiente, mostrar color y direcciones llevaban un
+temporizador ``hold_start`` que se reiniciaba con un solo frame perdido, y
+enseñar figuras aceptaba el primer frame que coincidía. Un frame con ruido
+podía terminar la ronda y un frame fallido deshacía la espera.
+
+``Decisor`` recibe una observación por frame (etiqueta o None, y su
+confianza) y mantiene votos ponderados por confianza en una ventana de
+tiempo, con coste O(1) por frame:
+
+- ``modo="ema"``: media exponencial en el tiempo (constante ``ventana/2``);
+  en vez de decaer todos los votos en cada frame, los nuevos pesan más
+  (``exp(t / tau)``), así que sólo se toca la etiqueta observada;
+- ``modo="ventana"``: histograma de los votos de los últimos ``ventana``
+  segundos, con sumas acumuladas que se restan al salir cada voto.
+
+Una etiqueta pasa a candidata cuando su proporción de votos llega a
+``umbral`` y deja de serlo sólo al bajar de ``umbral - histeresis``, de
+modo que un frame perdido no la reinicia. Se acepta tras ``espera``
+segundos como candidata, o antes si acumula ``evidencia_rapida`` de
+confianza (varios frames muy seguros seguidos). Si el juego fija su propia
+``espera`` (el ``hold_time`` de mostrar color o direcciones), la vía rápida
+se desactiva salvo que también pase ``evidencia_rapida``: esa espera es la
+que tiene que cumplirse. ``PERFILES`` agrupa esos
+valores según se prefiera rapidez ("rapido") o evitar falsos aciertos
+("seguro"); el perfil por defecto se elige con ``ROBOT_DECISION``.
+
+Uso dentro del bucle de un juego::
+
+    decisor = Decisor.perfil(espera=hold_time)
+    for cada ronda:
+        decisor.reiniciar()
+        ...
+        estado = decisor.actualizar(etiqueta, confianza)
+        if estado.aceptada == objetivo:
+            ...
+    decisor.estadisticas()   # tiempo hasta decidir, frames, rondas sin decisión
+
+Sólo ``reiniciar`` cuenta rondas; la última no hace falta cerrarla, porque
+``estadisticas`` ya cuenta como sin decisión la ronda abierta que no
+decidió. Para comprobar esas cuentas::
+
+    python -m comun.decision
+"""
+import collections
+import math
+import os
+import sys
+import time
+
+VARIABLE_ENTORNO = "ROBOT_DECISION"
+
+PERFILES = {
+    "rapido": {"ventana": 0.6, "umbral": 0.55, "histeresis": 0.15, "espera": 0.4, "evidencia_rapida": 3.0},
+    "equilibrado": {"ventana": 1.0, "umbral": 0.6, "histeresis": 0.2, "espera": 0.8, "evidencia_rapida": 5.0},
+    "seguro": {"ventana": 1.5, "umbral": 0.75, "histeresis": 0.2, "espera": 1.2, "evidencia_rapida": None},
+}
+PERFIL_POR_DEFECTO = os.environ.get(VARIABLE_ENTORNO, "equilibrado")
+
+Estado = collections.namedtuple("Estado", "candidata proporcion progreso aceptada")
+
+
+class Decisor:
+    def __init__(self, ventana=1.0, umbral=0.6, histeresis=0.2, espera=0.8, evidencia_rapida=5.0,
+                 confianza_minima=0.0, peso_nada=0.5, modo="ema"):
+        if modo not in ("ema", "ventana"):
+            raise ValueError(f"Modo desconocido: {modo!r}")
+        self.ventana = ventana
+        self.umbral = umbral
+        self.histeresis = histeresis
+        self.espera = espera
+        self.evidencia_rapida = evidencia_rapida
+        self.confianza_minima = confianza_minima
+        self.peso_nada = peso_nada
+        self.modo = modo
+        self._tau = ventana / 2.0
+        self.tiempos_decision = collections.deque(maxlen=200)
+        self.frames_decision = collections.deque(maxlen=200)
+        self.rondas = 0
+        self.sin_decision = 0
+        self._ronda_abierta = False
+        self._empezar(None)
+
+    @classmethod
+    def perfil(cls, nombre=None, **cambios):
+        """Decisor con los valores de ``PERFILES[nombre]`` y los ``cambios`` indicados.
+
+        Con una ``espera`` explícita y sin ``evidencia_rapida`` no se acepta
+        antes de esa espera.
+        """
+        nombre = nombre or PERFIL_POR_DEFECTO
+        if nombre not in PERFILES:
+            raise ValueError(f"Perfil desconocido: {nombre!r} (disponibles: {', '.join(PERFILES)})")
+        if "espera" in cambios:
+            cambios.setdefault("evidencia_rapida", None)
+        return cls(**dict(PERFILES[nombre], **cambios))
+
+    def reiniciar(self, t=None):
+        """Empieza una ronda nueva (cerrando la anterior): olvida los votos y pone en marcha el cronómetro."""
+        if self._ronda_abierta and self._decidida is None:
+            self.sin_decision += 1
+        self._ronda_abierta = True
+        self.rondas += 1
+        self._empezar(t)
+
+    def _empezar(self, t):
+        self._inicio = time.monotonic() if t is None else t
+        self._frames = 0
+        self._pesos = {}      # etiqueta (None = nada) -> votos acumulados
+        self._total = 0.0
+        self._origen = self._inicio  # referencia de exp(t / tau) en modo "ema"
+        self._votos = collections.deque()  # (t, etiqueta, peso) en modo "ventana"
+        self._escala = 1.0
+        self._lider = None
+        self._candidata = None
+        self._desde = None
+        self._decidida = None
+
+    # --- votos ---
+
+    def _votar(self, etiqueta, peso, t):
+        if self.modo == "ema":
+            escala = math.exp((t - self._origen) / self._tau)
+            if escala > 1e12:
+                # reescalar de vez en cuando para no desbordar
+                for k in self._pesos:
+                    self._pesos[k] /= escala
+                self._total /= escala
+                self._origen = t
+                escala = 1.0
+            self._pesos[etiqueta] = self._pesos.get(etiqueta, 0.0) + peso * escala
+            self._total += peso * escala
+            self._escala = escala
+        else:
+            self._votos.append((t, etiqueta, peso))
+            self._pesos[etiqueta] = self._pesos.get(etiqueta, 0.0) + peso
+            self._total += peso
+            lider_bajo = False
+            while self._votos and t - self._votos[0][0] > self.ventana:
+                _, vieja, p = self._votos.popleft()
+                self._pesos[vieja] -= p
+                self._total -= p
+                lider_bajo = lider_bajo or vieja == self._lider
+            self._escala = 1.0
+            if lider_bajo:
+                # sólo si pierde votos el líder hay que buscarlo de nuevo (pocas etiquetas)
+                self._lider = max((k for k in self._pesos if k is not None),
+                                  key=self._pesos.get, default=None)
+        if etiqueta is not None and (self._lider is None or self._pesos[etiqueta] > self._pesos.get(self._lider, 0.0)):
+            self._lider = etiqueta
+
+    def proporcion(self, etiqueta):
+        """Fracción de los votos (ponderados por confianza) que tiene ``etiqueta``."""
+        return self._pesos.get(etiqueta, 0.0) / self._total if self._total > 0 else 0.0
+
+    def evidencia(self, etiqueta):
+        """Confianza acumulada por ``etiqueta`` en la ventana (≈ frames seguros recientes)."""
+        return self._pesos.get(etiqueta, 0.0) / self._escala
+
+    def lider(self):
+        """``(etiqueta, proporcion)`` de la etiqueta con más votos, o ``(None, 0.0)``."""
+        if self._lider is None:
+            return None, 0.0
+        return self._lider, self.proporcion(self._lider)
+
+    # --- decisión ---
+
+    def actualizar(self, etiqueta, confianza=1.0, t=None):
+        """Añade la observación de un frame y devuelve el ``Estado`` de la decisión.
+
+        ``etiqueta`` None (o con confianza menor que ``confianza_minima``)
+        cuenta como un frame sin nada, que vota con ``peso_nada``: no ver
+        nada en un frame pesa menos que ver otra cosa. ``Estado.aceptada`` es la etiqueta
+        aceptada en este frame o None.
+        """
+        t = time.monotonic() if t is None else t
+        self._frames += 1
+        if etiqueta is not None and confianza < self.confianza_minima:
+            etiqueta = None
+        self._votar(etiqueta, confianza if etiqueta is not None else self.peso_nada, t)
+
+        lider, proporcion_lider = self.lider()
+        if self._candidata is None or self.proporcion(self._candidata) < self.umbral - self.histeresis:
+            self._candidata = None
+            if lider is not None and proporcion_lider >= self.umbral:
+                self._candidata, self._desde = lider, t
+        elif lider != self._candidata and proporcion_lider >= self.umbral:
+            self._candidata, self._desde = lider, t
+
+        if self._candidata is None:
+            return Estado(None, proporcion_lider, 0.0, None)
+        proporcion = self.proporcion(self._candidata)
+        progreso = min(1.0, (t - self._desde) / self.espera) if self.espera > 0 else 1.0
+        rapida = self.evidencia_rapida is not None and self.evidencia(self._candidata) >= self.evidencia_rapida
+        aceptada = self._candidata if (progreso >= 1.0 or rapida) and proporcion >= self.umbral else None
+        if aceptada is not None and self._decidida is None:
+            self._decidida = aceptada
+            self.tiempos_decision.append(t - self._inicio)
+            self.frames_decision.append(self._frames)
+        return Estado(self._candidata, proporcion, progreso, aceptada)
+
+    def estadisticas(self):
+        """Tiempo hasta decidir (desde ``reiniciar``), frames usados y rondas sin decisión.
+
+        La ronda en curso cuenta como sin decisión si aún no ha decidido.
+        """
+        tiempos = sorted(self.tiempos_decision)
+        abierta_sin_decidir = self._ronda_abierta and self._decidida is None
+        return {
+            "rondas": self.rondas,
+            "decisiones": len(tiempos),
+            "sin_decision": self.sin_decision + abierta_sin_decidir,
+            "tiempo_medio": sum(tiempos) / len(tiempos) if tiempos else 0.0,
+            "tiempo_p95": tiempos[int(0.95 * (len(tiempos) - 1))] if tiempos else 0.0,
+            "frames_medios": sum(self.frames_decision) / len(self.frames_decision) if self.frames_decision else 0.0,
+        }
+
+    def resumen(self):
+        e = self.estadisticas()
+        return (f"Decisiones: {e['decisiones']} de {e['rondas']} rondas, "
+                f"{e['tiempo_medio']:.1f} s de media hasta decidir (p95 {e['tiempo_p95']:.1f} s, "
+                f"{e['frames_medios']:.0f} frames)")
+
+
+def comprobar_rondas(n=3):
+    """
+    Juega ``n`` rondas sin decisión y después una decidida, con tiempos
+    simulados, y comprueba ``rondas`` y ``sin_decision`` tras cada paso.
+    """
+    decisor = Decisor.perfil()
+    t = 0.0
+    for ronda in range(n + 1):
+        decisor.reiniciar(t)
+        decide = ronda == n
+        for _ in range(30):
+            t += 0.1
+            decisor.actualizar(7 if decide else None, 1.0, t)
+        esperado = {"rondas": ronda + 1, "sin_decision": min(ronda + 1, n)}
+        e = decisor.estadisticas()
+        obtenido = {"rondas": e["rondas"], "sin_decision": e["sin_decision"]}
+        if obtenido != esperado:
+            print(f"Tras la ronda {ronda + 1} se esperaba {esperado} y se obtuvo {obtenido}")
+            return False
+    print(f"Correcto: {decisor.resumen()}, {n} sin decisión.")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if comprobar_rondas() else 1)
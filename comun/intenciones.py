@@ -0,0 +1,284 @@
+"""Interpretación de respuestas habladas: números (0-100), colores y figuras.
+
+Cada juego buscaba la respuesta a su manera: ``escuchar_numero`` probaba
+``"uno" in texto``, ``"dos" in texto``... uno tras otro ("veintiuno" o
+"doscientos" daban 1 y 2), y los juegos de colores y figuras quitaban las
+tildes con cadenas de ``.replace()``. Aquí:
+
+- ``plegar`` pasa a minúsculas y quita tildes con una tabla de
+  ``str.translate`` construida una sola vez;
+- cada ``Gramatica`` compila sus frases (con sus variantes) en un árbol de
+  palabras y recorre la transcripción una sola vez, quedándose en cada
+  posición con la coincidencia más larga ("treinta y uno" antes que
+  "treinta"); una palabra que no está en el árbol ("doscientos") no
+  coincide con nada;
+- en ``NUMEROS``, un número se acepta sólo si cubre todas las palabras
+  numéricas seguidas: "dos mil" o "ciento uno" (fuera de 0-100) no dan
+  2 ni 100, no dan nada;
+- ``candidatos`` acepta un texto o una lista n-best (las alternativas de
+  Google o las del reconocedor de ``comun/palabras.py``) y reparte el peso
+  de cada hipótesis entre los valores que contiene.
+
+Uso::
+
+    from comun.intenciones import NUMEROS, COLORES, FIGURAS
+    NUMEROS.mejor("es el veintiuno")                 # 21
+    FIGURAS.candidatos([("un circulo", 0.8), ("un cuadrado", None)])
+
+No es más rápido que la búsqueda anterior (unos microsegundos por
+respuesta en los dos casos, nada frente a lo que tarda el reconocimiento);
+lo que gana es interpretar bien. Aciertos y coste de las dos::
+
+    python -m comun.intenciones
+"""
+import argparse
+import collections
+import timeit
+
+Candidato = collections.namedtuple("Candidato", "valor confianza texto")
+
+_TILDES = str.maketrans("áéíóúüàèìòù", "aeiouuaeiou")
+# para partir en palabras: además de las tildes, la puntuación pasa a espacio
+_PALABRAS = str.maketrans({**{chr(k): v for k, v in _TILDES.items()},
+                           **{c: " " for c in ".,;:!?¡¿-_'\"()[]{}/"}})
+
+_FIN = None  # clave del árbol que marca el final de una frase
+
+
+def plegar(texto):
+    """Minúsculas y sin tildes (la ñ se conserva)."""
+    if not texto:
+        return ""
+    return texto.lower().translate(_TILDES).strip()
+
+
+def palabras(texto):
+    """Lista de palabras de ``texto`` ya plegadas."""
+    return texto.lower().translate(_PALABRAS).split() if texto else []
+
+
+class Gramatica:
+    """Conjunto cerrado de respuestas compilado en un árbol de palabras."""
+
+    def __init__(self, nombre, frases, contiguas=None, enlaces=()):
+        """
+        ``frases`` es ``{valor: [frase, variante, ...]}``.
+
+        ``contiguas`` son palabras que, seguidas, forman una sola frase
+        (las de los números, más "mil", "doscientos"...): una coincidencia
+        que no cubre toda la racha se descarta. Las de ``enlaces`` ("y",
+        "un") sólo unen la racha entre dos de ellas.
+        """
+        self.nombre = nombre
+        self.valores = list(frases)
+        self._arbol = {}
+        for valor, variantes in frases.items():
+            for frase in variantes:
+                nodo = self._arbol
+                for palabra in palabras(frase):
+                    nodo = nodo.setdefault(palabra, {})
+                nodo[_FIN] = valor
+        self._contiguas = frozenset(palabras(" ".join(contiguas))) - set(enlaces) if contiguas else None
+        self._enlaces = frozenset(enlaces)
+
+    def _contigua(self, palabra):
+        return palabra in self._contiguas or palabra.isdigit()
+
+    def _fin_racha(self, tokens, i):
+        """Índice siguiente a la racha de palabras contiguas que empieza en ``i`` (``i`` si no hay)."""
+        j = i
+        while j < len(tokens):
+            if self._contigua(tokens[j]):
+                j += 1
+            elif (tokens[j] in self._enlaces and j > i and j + 1 < len(tokens)
+                  and (self._contigua(tokens[j + 1]) or tokens[j + 1] in self._enlaces)):
+                j += 1
+            else:
+                break
+        # un enlace al final ("treinta y") no forma parte de la racha
+        while j > i and tokens[j - 1] in self._enlaces:
+            j -= 1
+        return j
+
+    def buscar(self, texto):
+        """Valores que aparecen en ``texto``, en orden, como ``(valor, inicio, fin)`` en palabras."""
+        tokens = palabras(texto)
+        encontrados = []
+        i = 0
+        while i < len(tokens):
+            nodo = self._arbol
+            mejor = None
+            j = i
+            while j < len(tokens):
+                nodo = nodo.get(tokens[j])
+                if nodo is None:
+                    break
+                j += 1
+                if _FIN in nodo:
+                    mejor = (nodo[_FIN], i, j)
+            if self._contiguas is not None:
+                racha = self._fin_racha(tokens, i)
+                if racha > i and (mejor is None or mejor[2] < racha):
+                    # "dos mil", "ciento uno": la frase sigue con palabras que no sabemos leer
+                    i = racha
+                    continue
+            if mejor is None:
+                i += 1
+            else:
+                encontrados.append(mejor)
+                i = mejor[2]
+        return encontrados
+
+    def candidatos(self, hipotesis):
+        """Valores ordenados por confianza a partir de un texto o una lista n-best.
+
+        Cada hipótesis puede ser un texto o un par ``(texto, confianza)``;
+        sin confianza pesa ``1 / posición``. Si una hipótesis nombra varios
+        valores distintos, su peso se reparte entre ellos. Las confianzas
+        devueltas suman 1.
+        """
+        if isinstance(hipotesis, str):
+            hipotesis = [hipotesis]
+        pesos = collections.OrderedDict()
+        textos = {}
+        for posicion, h in enumerate(hipotesis):
+            texto, confianza = (h, None) if isinstance(h, str) else (h[0], h[1])
+            peso = confianza if confianza is not None else 1.0 / (posicion + 1)
+            valores = list(dict.fromkeys(v for v, _, _ in self.buscar(texto)))
+            for valor in valores:
+                pesos[valor] = pesos.get(valor, 0.0) + peso / len(valores)
+                textos.setdefault(valor, texto)
+        total = sum(pesos.values())
+        if total <= 0:
+            return []
+        return sorted((Candidato(v, p / total, textos[v]) for v, p in pesos.items()),
+                      key=lambda c: -c.confianza)
+
+    def mejor(self, hipotesis, confianza_minima=0.0):
+        """El valor más probable, o None si no hay ninguno o no llega a ``confianza_minima``."""
+        if isinstance(hipotesis, str) and confianza_minima <= 0:
+            # un solo texto: basta con la primera coincidencia, sin repartir pesos
+            encontrados = self.buscar(hipotesis)
+            return encontrados[0][0] if encontrados else None
+        candidatos = self.candidatos(hipotesis)
+        if candidatos and candidatos[0].confianza >= confianza_minima:
+            return candidatos[0].valor
+        return None
+
+
+# --- números del 0 al 100 ---
+
+_UNIDADES = ["cero", "uno", "dos", "tres", "cuatro", "cinco", "seis", "siete", "ocho", "nueve",
+             "diez", "once", "doce", "trece", "catorce", "quince", "dieciséis", "diecisiete",
+             "dieciocho", "diecinueve", "veinte", "veintiuno", "veintidós", "veintitrés",
+             "veinticuatro", "veinticinco", "veintiséis", "veintisiete", "veintiocho", "veintinueve"]
+_DECENAS = {30: "treinta", 40: "cuarenta", 50: "cincuenta", 60: "sesenta",
+            70: "setenta", 80: "ochenta", 90: "noventa"}
+
+
+def _frases_numeros():
+    frases = {n: [nombre, str(n)] for n, nombre in enumerate(_UNIDADES)}
+    frases[21].append("veintiún")
+    for n in range(16, 20):
+        frases[n].append(f"diez y {_UNIDADES[n - 10]}")
+    for decena, nombre in _DECENAS.items():
+        frases[decena] = [nombre, str(decena)]
+        for unidad in range(1, 10):
+            frases[decena + unidad] = [f"{nombre} y {_UNIDADES[unidad]}", str(decena + unidad)]
+        frases[decena + 1].append(f"{nombre} y un")
+    frases[100] = ["cien", "ciento", "100"]
+    return frases
+
+
+# palabras de números fuera de 0-100 que no deben dejar leer sólo una parte
+_NUMERALES_MAYORES = ("cientos doscientos trescientos cuatrocientos quinientos seiscientos setecientos "
+                      "ochocientos novecientos mil miles millon millones")
+
+_FRASES_NUMEROS = _frases_numeros()
+NUMEROS = Gramatica("numeros", _FRASES_NUMEROS,
+                    contiguas=[f for v in _FRASES_NUMEROS.values() for f in v] + [_NUMERALES_MAYORES],
+                    enlaces=("y", "un"))
+COLORES = Gramatica("colores", {
+    "rojo": ["rojo", "roja"],
+    "verde": ["verde"],
+    "azul": ["azul"],
+    "amarillo": ["amarillo", "amarilla"],
+    "naranja": ["naranja", "anaranjado", "anaranjada"],
+})
+FIGURAS = Gramatica("figuras", {
+    "círculo": ["círculo", "circulito", "redondo"],
+    "cuadrado": ["cuadrado", "cuadradito"],
+    "triángulo": ["triángulo", "triangulito"],
+    "rectángulo": ["rectángulo", "rectangulito"],
+})
+
+# gramática de cada vocabulario de ``comun/palabras.py``
+POR_VOCABULARIO = {"digitos": NUMEROS, "colores": COLORES, "figuras": FIGURAS}
+
+
+# --- microbenchmark ---
+
+def _numero_encadenado(texto):
+    """La búsqueda que hacía ``escuchar_numero`` antes de este módulo."""
+    for palabra in texto.split():
+        if palabra.isdigit():
+            return int(palabra)
+    for n, nombre in enumerate(_UNIDADES[:10]):
+        if nombre in texto.lower():
+            return n
+    return None
+
+
+def _figura_encadenada(texto):
+    n = texto.lower().strip()
+    n = n.replace("á", "a").replace("í", "i").replace("ó", "o").replace("ú", "u").replace("é", "e")
+    for figura in ("cuadrado", "circulo", "triangulo", "rectangulo"):
+        if figura in n:
+            return figura
+    return None
+
+
+_EJEMPLOS_NUMEROS = [("siete", 7), ("es el 4", 4), ("veintiuno", 21), ("doscientos", None),
+                     ("creo que treinta y dos", 32), ("nueve", 9), ("Dieciséis", 16), ("no sé", None),
+                     ("dos mil", None), ("ciento uno", None)]
+_EJEMPLOS_FIGURAS = ["un círculo", "Triángulo", "es un cuadrado", "rectángulo", "no lo sé"]
+
+
+def microbenchmark(repeticiones=20000):
+    """Tiempo por respuesta (µs) y aciertos de la búsqueda anterior y de la gramática."""
+    textos = [t for t, _ in _EJEMPLOS_NUMEROS]
+    resultados = {}
+    for nombre, funcion, ejemplos in [
+        ("numeros encadenado", _numero_encadenado, textos),
+        ("numeros gramatica", NUMEROS.mejor, textos),
+        ("figuras encadenado", _figura_encadenada, _EJEMPLOS_FIGURAS),
+        ("figuras gramatica", FIGURAS.mejor, _EJEMPLOS_FIGURAS),
+    ]:
+        segundos = timeit.timeit(lambda: [funcion(t) for t in ejemplos], number=repeticiones)
+        resultados[nombre] = 1e6 * segundos / (repeticiones * len(ejemplos))
+    aciertos = {
+        "numeros encadenado": sum(_numero_encadenado(t) == n for t, n in _EJEMPLOS_NUMEROS),
+        "numeros gramatica": sum(NUMEROS.mejor(t) == n for t, n in _EJEMPLOS_NUMEROS),
+    }
+    return resultados, aciertos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Aciertos y coste de la interpretación de respuestas.")
+    parser.add_argument("--repeticiones", type=int, default=20000)
+    parser.add_argument("--probar", metavar="TEXTO", help="muestra los candidatos de un texto")
+    args = parser.parse_args(argv)
+    if args.probar:
+        for gramatica in POR_VOCABULARIO.values():
+            print(f"{gramatica.nombre}: {gramatica.candidatos(args.probar)}")
+        return
+    resultados, aciertos = microbenchmark(args.repeticiones)
+    for nombre, us in resultados.items():
+        print(f"{nombre:20s} {us:7.2f} µs/respuesta")
+    total = len(_EJEMPLOS_NUMEROS)
+    for nombre, n in aciertos.items():
+        print(f"{nombre:20s} {n}/{total} números bien interpretados")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""Micrófono compartido por todos los juegos que escuchan al niño.
+
+Cada ``escuchar()`` de los juegos creaba un ``sr.Recognizer()``, abría
+``sr.Microphone()`` y calibraba el ruido ambiente (hasta 1 s) antes de
+cada pregunta: tiempo muerto en cada ronda. ``Microfono`` abre el flujo
+de PyAudio una sola vez y un hilo lo lee sin parar, guardando los
+últimos ``buffer_segundos`` en un anillo. Cada bloque pasa por el
+detector de voz (``comun/vad.py``) al capturarse. Con ese audio:
+
+- se calibra el suelo de ruido al crearse y después se sigue adaptando
+  con cada bloque sin voz capturado mientras el robot no habla;
+- ``escuchar()`` empieza a buscar la voz ``preroll`` segundos antes de
+  la llamada, así que una respuesta que el niño empezó mientras aparecía
+  la figura (o justo al acabar la pregunta) no se pierde. El audio en el
+  que sonaba el robot (más ``eco`` segundos) se ignora para no tomar la
+  propia pregunta como respuesta;
+- la frase se cierra en cuanto el VAD ve ``hangover`` de silencio; con
+  ``corto=True`` (respuestas de una palabra) el hangover es de 0,25 s.
+
+Se obtiene del registro de recursos::
+
+    mic = recursos.obtener("microfono")
+    audio = mic.escuchar(timeout=5, limite=5, corto=True)   # sr.WaitTimeoutError si no hablan
+    texto = mic.reconocer(audio)    # sr.UnknownValueError si no se entiende
+    texto = mic.reconocer_vocabulario(audio, "digitos")   # sin red, con Google de respaldo
+    mic.ultima_escucha              # qué audio entró en la frase, latencias e hipótesis
+
+Con ``ROBOT_CORPUS`` definida, cada frase que se escucha con ``contexto``
+(juego, vocabulario, respuesta esperada) se guarda en el corpus de
+``comun/corpus.py`` para reproducirla después en el banco de pruebas.
+"""
+import collections
+import threading
+import time
+
+from comun import recursos
+from comun.corpus import grabadora_de_entorno
+from comun.vad import DetectorVoz, Segmentador
+
+Trozo = collections.namedtuple("Trozo", "seq marca datos energia_db voz robot")
+
+# relleno de audio que se conserva antes del inicio de la voz (s)
+RELLENO_INICIAL = 0.3
+
+
+class Microfono:
+    def __init__(self, calibracion=1.0, frecuencia_muestreo=16000, buffer_segundos=10.0,
+                 preroll=1.5, eco=0.3):
+        import speech_recognition as sr
+        self._sr = sr
+        self.reconocedor = sr.Recognizer()
+        self.fuente = sr.Microphone(sample_rate=frecuencia_muestreo)
+        self.fuente.__enter__()  # abre el flujo de PyAudio y lo deja abierto
+        self.segundos_por_trozo = self.fuente.CHUNK / self.fuente.SAMPLE_RATE
+        self.vad = DetectorVoz(frecuencia=self.fuente.SAMPLE_RATE)
+        self.preroll = preroll
+        self.eco = eco
+        self._anillo = collections.deque(maxlen=max(1, int(buffer_segundos / self.segundos_por_trozo)))
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._escuchando = threading.Lock()
+        self._consumido = 0  # último trozo que ya formó parte de una frase
+        self._ultimo_robot = float("-inf")
+        self._parar = threading.Event()
+        self.escuchas = 0
+        self.fallos_lectura = 0
+        self.ultima_escucha = None
+        self.grabadora = grabadora_de_entorno()
+        self._latencias_cierre = collections.deque(maxlen=50)
+        self._latencias_resultado = collections.deque(maxlen=50)
+        self._hilo = threading.Thread(target=self._capturar, name="captura-microfono", daemon=True)
+        self._hilo.start()
+        try:
+            self.calibrar(calibracion)
+        except BaseException:
+            self.cerrar()
+            raise
+
+    # --- captura continua ---
+
+    def _robot_hablando(self):
+        creado, _ = recursos.estado().get("voz", (False, 0))
+        return creado and recursos.obtener("voz").hablando()
+
+    def _capturar(self):
+        while not self._parar.is_set():
+            try:
+                datos = self.fuente.stream.read(self.fuente.CHUNK)
+            except Exception:
+                self.fallos_lectura += 1
+                time.sleep(0.05)
+                continue
+            marca = time.monotonic()
+            if self._robot_hablando():
+                self._ultimo_robot = marca
+            robot = marca - self._ultimo_robot <= self.eco
+            energia_db, voz = self.vad.analizar(datos)
+            if not robot:
+                self.vad.adaptar(energia_db, voz)
+            with self._cond:
+                self._seq += 1
+                self._anillo.append(Trozo(self._seq, marca, datos, energia_db, voz, robot))
+                self._cond.notify_all()
+
+    def _siguiente(self, seq, hasta):
+        """Primer trozo con número > ``seq``, esperando hasta ``hasta`` (monotonic) o None."""
+        with self._cond:
+            while self._seq <= seq:
+                restante = hasta - time.monotonic()
+                if restante <= 0 or self._parar.is_set():
+                    return None
+                self._cond.wait(min(restante, 0.2))
+            primero = self._anillo[0].seq
+            return self._anillo[max(seq + 1, primero) - primero]
+
+    def _seq_desde(self, marca):
+        """Número de secuencia anterior al primer trozo capturado en ``marca`` o después."""
+        with self._cond:
+            for trozo in self._anillo:
+                if trozo.marca >= marca:
+                    return trozo.seq - 1
+            return self._seq
+
+    def calibrar(self, duracion=1.0):
+        """Mide el ruido ambiente durante los próximos ``duracion`` s y fija el suelo de ruido."""
+        import numpy as np
+        seq = self._seq_desde(time.monotonic())
+        trozos = []
+        while len(trozos) * self.segundos_por_trozo < duracion:
+            trozo = self._siguiente(seq, time.monotonic() + 2.0)
+            if trozo is None:
+                raise RuntimeError("El micrófono no entrega audio.")
+            trozos.append(trozo)
+            seq = trozo.seq
+        self.vad.calibrar(np.concatenate([t.energia_db for t in trozos]))
+
+    # --- escucha ---
+
+    def escuchar(self, timeout=5, limite=5, preroll=None, durante_robot=False, corto=False, contexto=None):
+        """Devuelve el ``sr.AudioData`` de la próxima frase del niño.
+
+        La búsqueda empieza ``preroll`` segundos antes de la llamada. Si nadie
+        empieza a hablar en ``timeout`` segundos lanza ``sr.WaitTimeoutError``;
+        la frase se corta a los ``limite`` segundos. ``corto`` cierra la frase
+        antes, para respuestas de una sola palabra. ``contexto`` se guarda con
+        la frase cuando se está grabando el corpus.
+        """
+        preroll = self.preroll if preroll is None else preroll
+        llamada = time.monotonic()
+        seg = self.segundos_por_trozo
+        segmentador = Segmentador.modo("corto" if corto else "normal", self.vad.duracion_ventana)
+        with self._escuchando:
+            # el preroll nunca vuelve a entregar audio de la frase anterior
+            seq = max(self._seq_desde(llamada - preroll), self._consumido)
+            previos = collections.deque(maxlen=max(1, round(RELLENO_INICIAL / seg)))
+            frase = []
+            while True:
+                hasta = llamada + timeout if not frase else llamada + timeout + limite + 1.0
+                trozo = self._siguiente(seq, hasta)
+                if trozo is None:
+                    raise self._sr.WaitTimeoutError("No se detectó habla.")
+                seq = trozo.seq
+                if trozo.robot and not durante_robot:
+                    if not frase:
+                        # no arrastrar el final de la pregunta del robot
+                        previos.clear()
+                        segmentador.reiniciar()
+                        continue
+                    evento = segmentador.agregar([False] * len(trozo.voz))
+                else:
+                    evento = segmentador.agregar(trozo.voz)
+                if not frase:
+                    if evento is None:
+                        previos.append(trozo)
+                        continue
+                    arranque = trozo
+                    frase = list(previos) + [trozo]
+                else:
+                    frase.append(trozo)
+                if evento == "fin" or len(frase) * seg >= limite:
+                    break
+            self._consumido = seq
+            self.escuchas += 1
+        cierre = time.monotonic()
+        fin_voz = frase[-1].marca - (segmentador.silencio if evento == "fin" else 0.0)
+        inicio = arranque.marca - seg - llamada
+        self._latencias_cierre.append(cierre - fin_voz)
+        self.ultima_escucha = {
+            "inicio": inicio,  # negativo: empezó antes de llamar a escuchar()
+            "fin": frase[-1].marca - llamada,
+            "duracion": len(frase) * seg,
+            "voz": segmentador.voz,
+            "preroll_usado": max(0.0, llamada - (frase[0].marca - seg)),
+            "trozos": len(frase),
+            "fin_voz": fin_voz,
+            "latencia_cierre": cierre - fin_voz,  # fin de la voz -> frase cerrada
+            "latencia_resultado": None,           # fin de la voz -> texto reconocido
+        }
+        if inicio < 0:
+            print(f"(escuché {self.ultima_escucha['duracion']:.1f} s de audio; "
+                  f"la respuesta empezó {-inicio:.1f} s antes de preguntar)")
+        datos = b"".join(t.datos for t in frase)
+        audio = self._sr.AudioData(datos, self.fuente.SAMPLE_RATE, self.fuente.SAMPLE_WIDTH)
+        if self.grabadora is not None and contexto is not None:
+            try:
+                self.grabadora.guardar(audio, contexto, self.ultima_escucha)
+            except OSError as e:
+                print(f"No se pudo guardar la grabación en el corpus: {e}")
+        return audio
+
+    def reconocer(self, audio, idioma="es-ES", alternativas=False, escucha=None):
+        """Texto reconocido por Google Speech Recognition.
+
+        Con ``alternativas`` devuelve la lista n-best de ``(texto, confianza)``;
+        Google sólo da la confianza de la primera, las demás llevan None.
+        ``escucha`` es el ``ultima_escucha`` de la frase cuando se reconoce en
+        otro hilo mientras ya se escucha la siguiente.
+        """
+        try:
+            if not alternativas:
+                return self.reconocedor.recognize_google(audio, language=idioma)
+            resultado = self.reconocedor.recognize_google(audio, language=idioma, show_all=True)
+            if not resultado or not resultado.get("alternative"):
+                raise self._sr.UnknownValueError()
+            return [(a["transcript"], a.get("confidence")) for a in resultado["alternative"]]
+        finally:
+            self._anotar_resultado(escucha)
+
+    def reconocer_vocabulario(self, audio, vocabulario, respaldo=True, idioma="es-ES"):
+        """Reconoce una palabra de ``vocabulario`` (``comun/palabras.py``) sin red.
+
+        Si no hay grabaciones de referencia o la palabra no queda clara, usa
+        Google cuando ``respaldo`` es True y si no lanza ``sr.UnknownValueError``.
+        Las mejores palabras y el tiempo empleado quedan en ``ultima_escucha``;
+        ``ultima_escucha["hipotesis"]`` es la lista n-best ``(texto, confianza)``
+        que se puede pasar a ``comun.intenciones``.
+        """
+        from comun.palabras import decidir
+        inicio = time.perf_counter()
+        candidatos = []
+        try:
+            reconocedor = recursos.obtener("palabras").reconocedor(vocabulario)
+            if reconocedor.disponible():
+                candidatos = reconocedor.reconocer(audio)
+        except Exception as e:
+            print(f"No se pudo usar el reconocedor de palabras: {e}")
+        escucha = self.ultima_escucha
+        if escucha is not None:
+            escucha["candidatos"] = candidatos
+            escucha["ms_palabras"] = 1000 * (time.perf_counter() - inicio)
+        palabra = decidir(candidatos)
+        if palabra is not None:
+            self._anotar_resultado()
+            hipotesis = [(c.palabra, c.probabilidad) for c in candidatos]
+        elif not respaldo:
+            self._anotar_resultado()
+            raise self._sr.UnknownValueError()
+        else:
+            hipotesis = self.reconocer(audio, idioma, alternativas=True)
+        if escucha is not None:
+            escucha["hipotesis"] = hipotesis
+        return hipotesis[0][0]
+
+    def _anotar_resultado(self, escucha=None):
+        escucha = escucha if escucha is not None else self.ultima_escucha
+        if escucha is not None and escucha["latencia_resultado"] is None:
+            escucha["latencia_resultado"] = time.monotonic() - escucha["fin_voz"]
+            self._latencias_resultado.append(escucha["latencia_resultado"])
+
+    def estadisticas(self):
+        def media(valores):
+            return sum(valores) / len(valores) if valores else 0.0
+
+        return {
+            "suelo_ruido_db": self.vad.suelo_db,
+            "escuchas": self.escuchas,
+            "fallos_lectura": self.fallos_lectura,
+            "segundos_en_buffer": len(self._anillo) * self.segundos_por_trozo,
+            "latencia_cierre_media": media(self._latencias_cierre),
+            "latencia_resultado_media": media(self._latencias_resultado),
+        }
+
+    def cerrar(self):
+        self._parar.set()
+        with self._cond:
+            self._cond.notify_all()
+        self._hilo.join(timeout=2.0)
+        self.fuente.__exit__(None, None, None)
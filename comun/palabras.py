@@ -0,0 +1,299 @@
+"""Reconocimiento de palabras sueltas sin red (dígitos, colores, figuras).
+
+Los juegos de adivinar mandaban cada respuesta a ``recognize_google`` sólo
+para compararla con diez dígitos, cinco colores o cuatro figuras. Aquí se
+compara la respuesta con grabaciones de referencia de cada palabra:
+coeficientes MFCC calculados con NumPy y distancia DTW (alineamiento
+temporal dinámico), todo en CPU y en unas decenas de milisegundos.
+
+Las referencias se graban una vez con la herramienta de registro (mejor
+con varios niños y varias repeticiones por palabra)::
+
+    python -m comun.palabras grabar digitos --repeticiones 3
+    python -m comun.palabras probar digitos
+    python -m comun.palabras estado
+
+Se guardan como wav en ``palabras_grabadas/<vocabulario>/<palabra>/`` (o
+en la carpeta de ``ROBOT_PALABRAS``). Si un vocabulario no tiene
+grabaciones, o la palabra no queda clara, los juegos recurren a Google.
+"""
+import argparse
+import collections
+import functools
+import os
+import sys
+import threading
+import time
+import wave
+
+import numpy as np
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DIRECTORIO_POR_DEFECTO = os.environ.get("ROBOT_PALABRAS", os.path.join(RAIZ, "palabras_grabadas"))
+FRECUENCIA = 16000
+
+VOCABULARIOS = {
+    "digitos": ["cero", "uno", "dos", "tres", "cuatro", "cinco", "seis", "siete", "ocho", "nueve"],
+    "colores": ["rojo", "verde", "azul", "amarillo", "naranja"],
+    "figuras": ["círculo", "cuadrado", "triángulo", "rectángulo"],
+}
+
+Candidato = collections.namedtuple("Candidato", "palabra probabilidad distancia")
+
+
+# --- características ---
+
+@functools.lru_cache(maxsize=4)
+def _banco_mel(filtros, nfft, frecuencia):
+    def a_mel(f):
+        return 2595.0 * np.log10(1.0 + f / 700.0)
+
+    def de_mel(m):
+        return 700.0 * (10.0 ** (m / 2595.0) - 1.0)
+
+    puntos = de_mel(np.linspace(a_mel(0.0), a_mel(frecuencia / 2.0), filtros + 2))
+    bins = np.floor((nfft + 1) * puntos / frecuencia).astype(int)
+    banco = np.zeros((filtros, nfft // 2 + 1))
+    for i in range(filtros):
+        izq, centro, der = bins[i], bins[i + 1], bins[i + 2]
+        if centro > izq:
+            banco[i, izq:centro] = (np.arange(izq, centro) - izq) / (centro - izq)
+        if der > centro:
+            banco[i, centro:der] = (der - np.arange(centro, der)) / (der - centro)
+    return banco
+
+
+@functools.lru_cache(maxsize=4)
+def _dct(coeficientes, filtros):
+    n = np.arange(filtros)
+    k = np.arange(coeficientes)[:, None]
+    return np.cos(np.pi * k * (2 * n + 1) / (2 * filtros)) * np.sqrt(2.0 / filtros)
+
+
+def mfcc(muestras, frecuencia=FRECUENCIA, coeficientes=13, filtros=26, ventana=0.025, paso=0.010,
+         nfft=512, rango_db=35.0):
+    """MFCC (sin c0) con sus deltas, normalizados por la media y sin los silencios de los extremos."""
+    x = np.asarray(muestras, dtype=np.float32) / 32768.0
+    largo, salto = int(ventana * frecuencia), int(paso * frecuencia)
+    if len(x) < largo:
+        x = np.pad(x, (0, largo - len(x)))
+    x = np.append(x[0], x[1:] - 0.97 * x[:-1])  # pre-énfasis
+    n = 1 + (len(x) - largo) // salto
+    indices = np.arange(largo)[None, :] + salto * np.arange(n)[:, None]
+    tramas = x[indices] * np.hamming(largo)
+    potencia = np.abs(np.fft.rfft(tramas, nfft)) ** 2 / nfft
+    # quitar silencio al principio y al final
+    energia = 10.0 * np.log10(potencia.sum(axis=1) + 1e-10)
+    sonoras = np.flatnonzero(energia > energia.max() - rango_db)
+    potencia = potencia[sonoras[0]:sonoras[-1] + 1]
+    mel = np.log(potencia @ _banco_mel(filtros, nfft, frecuencia).T + 1e-10)
+    cep = (mel @ _dct(coeficientes, filtros).T)[:, 1:]
+    cep -= cep.mean(axis=0)
+    delta = np.gradient(cep, axis=0) if len(cep) > 1 else np.zeros_like(cep)
+    return np.hstack([cep, delta]).astype(np.float32)
+
+
+def dtw(a, b):
+    """Distancia DTW entre dos secuencias de características, normalizada por su longitud."""
+    coste = np.sqrt(((a[:, None, :] - b[None, :, :]) ** 2).sum(axis=2))
+    fila = np.cumsum(coste[0])
+    for i in range(1, len(a)):
+        # D[i,j] = c[i,j] + min(D[i-1,j], D[i-1,j-1], D[i,j-1]); la dependencia con
+        # D[i,j-1] se resuelve con un mínimo acumulado sobre la suma acumulada de la fila
+        diagonal = np.concatenate(([np.inf], fila[:-1]))
+        desde_arriba = coste[i] + np.minimum(fila, diagonal)
+        suma = np.cumsum(coste[i])
+        fila = np.minimum.accumulate(desde_arriba - suma) + suma
+    return float(fila[-1]) / (len(a) + len(b))
+
+
+def _muestras(audio):
+    """Muestras int16 a 16 kHz de un ``sr.AudioData``, bytes PCM o array."""
+    if hasattr(audio, "get_raw_data"):
+        audio = audio.get_raw_data(convert_rate=FRECUENCIA, convert_width=2)
+    if isinstance(audio, (bytes, bytearray, memoryview)):
+        return np.frombuffer(audio, dtype=np.int16)
+    return np.asarray(audio)
+
+
+# --- reconocedor ---
+
+class ReconocedorPalabras:
+    """Compara una respuesta con las grabaciones de referencia de un vocabulario."""
+
+    def __init__(self, palabras, temperatura=0.5):
+        self.palabras = list(palabras)
+        self.temperatura = temperatura
+        self.referencias = {p: [] for p in self.palabras}
+
+    @classmethod
+    def cargar(cls, vocabulario, directorio=DIRECTORIO_POR_DEFECTO):
+        reconocedor = cls(VOCABULARIOS[vocabulario])
+        for palabra in reconocedor.palabras:
+            carpeta = os.path.join(directorio, vocabulario, palabra)
+            if not os.path.isdir(carpeta):
+                continue
+            for nombre in sorted(os.listdir(carpeta)):
+                if nombre.endswith(".wav"):
+                    reconocedor.agregar(palabra, leer_wav(os.path.join(carpeta, nombre)))
+        return reconocedor
+
+    def agregar(self, palabra, audio):
+        self.referencias[palabra].append(mfcc(_muestras(audio)))
+
+    def disponible(self):
+        """True si hay al menos una grabación de cada palabra."""
+        return all(self.referencias.values())
+
+    def reconocer(self, audio, n=3):
+        """Devuelve los ``n`` mejores ``Candidato`` (palabra, probabilidad, distancia)."""
+        caracteristicas = mfcc(_muestras(audio))
+        distancias = {
+            palabra: min(dtw(caracteristicas, ref) for ref in refs)
+            for palabra, refs in self.referencias.items() if refs
+        }
+        if not distancias:
+            return []
+        mejor = min(distancias.values())
+        pesos = {p: np.exp(-(d - mejor) / self.temperatura) for p, d in distancias.items()}
+        total = sum(pesos.values())
+        candidatos = [Candidato(p, float(pesos[p] / total), d) for p, d in distancias.items()]
+        candidatos.sort(key=lambda c: c.distancia)
+        return candidatos[:n]
+
+
+def decidir(candidatos, probabilidad_minima=0.6, distancia_maxima=8.0):
+    """Palabra ganadora si está clara, o None para recurrir a otro reconocedor."""
+    if not candidatos:
+        return None
+    mejor = candidatos[0]
+    if mejor.probabilidad < probabilidad_minima or mejor.distancia > distancia_maxima:
+        return None
+    return mejor.palabra
+
+
+class BancoPalabras:
+    """Reconocedores por vocabulario, cargados la primera vez que se piden."""
+
+    def __init__(self, directorio=DIRECTORIO_POR_DEFECTO):
+        self.directorio = directorio
+        self._reconocedores = {}
+        self._lock = threading.Lock()
+
+    def reconocedor(self, vocabulario):
+        with self._lock:
+            if vocabulario not in self._reconocedores:
+                self._reconocedores[vocabulario] = ReconocedorPalabras.cargar(vocabulario, self.directorio)
+            return self._reconocedores[vocabulario]
+
+    def recargar(self):
+        with self._lock:
+            self._reconocedores.clear()
+
+
+# --- grabaciones ---
+
+def leer_wav(ruta):
+    with wave.open(ruta, "rb") as w:
+        if w.getsampwidth() != 2 or w.getnchannels() != 1 or w.getframerate() != FRECUENCIA:
+            raise ValueError(f"{ruta}: se esperaba wav mono de 16 bits a {FRECUENCIA} Hz")
+        return np.frombuffer(w.readframes(w.getnframes()), dtype=np.int16)
+
+
+def guardar_wav(ruta, muestras):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with wave.open(ruta, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(FRECUENCIA)
+        w.writeframes(np.asarray(muestras, dtype=np.int16).tobytes())
+
+
+def _siguiente_nombre(carpeta):
+    existentes = [n for n in os.listdir(carpeta) if n.endswith(".wav")] if os.path.isdir(carpeta) else []
+    return os.path.join(carpeta, f"{len(existentes) + 1:03d}.wav")
+
+
+def _grabar(args):
+    from comun import recursos
+    import speech_recognition as sr
+    mic = recursos.obtener("microfono")
+    palabras = args.palabras or VOCABULARIOS[args.vocabulario]
+    try:
+        for palabra in palabras:
+            for i in range(args.repeticiones):
+                while True:
+                    input(f"Pulsa Enter y di «{palabra}» ({i + 1}/{args.repeticiones})...")
+                    try:
+                        audio = mic.escuchar(timeout=5, limite=3, preroll=0, corto=True)
+                        break
+                    except sr.WaitTimeoutError:
+                        print("No se oyó nada, otra vez.")
+                carpeta = os.path.join(args.directorio, args.vocabulario, palabra)
+                ruta = _siguiente_nombre(carpeta)
+                guardar_wav(ruta, _muestras(audio))
+                print(f"  guardado {os.path.relpath(ruta, args.directorio)} ({mic.ultima_escucha['voz']:.2f} s de voz)")
+    finally:
+        recursos.cerrar_todo()
+
+
+def _probar(args):
+    from comun import recursos
+    import speech_recognition as sr
+    reconocedor = ReconocedorPalabras.cargar(args.vocabulario, args.directorio)
+    if not reconocedor.disponible():
+        faltan = [p for p, refs in reconocedor.referencias.items() if not refs]
+        print(f"Faltan grabaciones de: {', '.join(faltan)}")
+        return 1
+    mic = recursos.obtener("microfono")
+    print("Di una palabra (Ctrl+C para salir).")
+    try:
+        while True:
+            try:
+                audio = mic.escuchar(timeout=10, limite=3, corto=True)
+            except sr.WaitTimeoutError:
+                continue
+            inicio = time.perf_counter()
+            candidatos = reconocedor.reconocer(audio)
+            ms = 1000 * (time.perf_counter() - inicio)
+            texto = ", ".join(f"{c.palabra} {c.probabilidad:.2f} (d={c.distancia:.1f})" for c in candidatos)
+            print(f"{decidir(candidatos) or '¿?'}  <- {texto}  [{ms:.0f} ms]")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        recursos.cerrar_todo()
+    return 0
+
+
+def _estado(args):
+    for vocabulario, palabras in VOCABULARIOS.items():
+        cuentas = []
+        for palabra in palabras:
+            carpeta = os.path.join(args.directorio, vocabulario, palabra)
+            n = len([f for f in os.listdir(carpeta) if f.endswith(".wav")]) if os.path.isdir(carpeta) else 0
+            cuentas.append(f"{palabra}={n}")
+        print(f"{vocabulario}: {' '.join(cuentas)}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Grabaciones de referencia para reconocer palabras sin red")
+    parser.add_argument("--directorio", default=DIRECTORIO_POR_DEFECTO)
+    sub = parser.add_subparsers(dest="orden", required=True)
+    grabar = sub.add_parser("grabar", help="graba referencias de un vocabulario")
+    grabar.add_argument("vocabulario", choices=sorted(VOCABULARIOS))
+    grabar.add_argument("--repeticiones", type=int, default=3)
+    grabar.add_argument("--palabras", nargs="+", help="sólo estas palabras")
+    probar = sub.add_parser("probar", help="escucha y muestra las mejores palabras")
+    probar.add_argument("vocabulario", choices=sorted(VOCABULARIOS))
+    sub.add_parser("estado", help="cuántas grabaciones hay de cada palabra")
+    args = parser.parse_args(argv)
+    if args.orden == "grabar":
+        return _grabar(args)
+    if args.orden == "probar":
+        return _probar(args)
+    return _estado(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
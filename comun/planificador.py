@@ -0,0 +1,118 @@
+"""Planificador de detección para los bucles de visión.
+
+Los juegos ejecutaban la detección en cada vuelta del bucle con
+``cv2.waitKey(1)``, ocupando un núcleo entero aunque no cambiara nada. El
+``Planificador`` decide cuándo toca detectar:
+
+- ``hz_deteccion``: ritmo objetivo de detección en reposo.
+- ``hz_pantalla``: ritmo al que el juego redibuja la ventana con el último
+  frame de la cámara y atiende las teclas. Es independiente de la
+  detección: entre dos detecciones se repinta encima el último resultado,
+  así que la imagen no baja a 8-10 Hz ni se congela cuando se retrocede.
+- ``presupuesto_cpu``: fracción de un núcleo que puede gastar la detección.
+  Se mide con ``time.thread_time()``, la CPU del hilo que detecta: los
+  hilos de la cámara, la voz y el micrófono no cuentan. Si el tiempo de
+  CPU por detección lo supera, se baja el ritmo (hasta
+  ``hz_minimo``) y se recupera poco a poco cuando vuelve a sobrar.
+- ``candidato()``: mientras hay una detección candidata (p. ej. corre el
+  ``hold_time``) se detecta a ``hz_candidato`` para confirmar cuanto antes.
+
+Uso típico dentro de un bucle::
+
+    plan = Planificador(hz_deteccion=10)
+    resultado = None
+    while ...:
+        ret, frame = cap.read()
+        if plan.debe_detectar():
+            with plan.medir():
+                resultado = detectar(frame)
+            plan.candidato(resultado is not None)
+        cv2.imshow(..., dibujar(frame, resultado))
+        if plan.esperar_tecla() == ord('q'):
+            break
+"""
+import time
+from contextlib import contextmanager
+
+
+class Planificador:
+    def __init__(self, hz_deteccion=10, hz_pantalla=30, hz_minimo=2, hz_candidato=None,
+                 presupuesto_cpu=0.6):
+        self.hz_objetivo = hz_deteccion
+        self.hz_pantalla = hz_pantalla
+        self.hz_minimo = hz_minimo
+        self.hz_candidato = hz_candidato or 2 * hz_deteccion
+        self.presupuesto_cpu = presupuesto_cpu
+        self.hz_actual = hz_deteccion
+        self._hay_candidato = False
+        self._ultima = time.monotonic() - 1.0 / hz_deteccion  # la primera vuelta ya detecta
+        self._pantalla = time.monotonic()
+        self._cpu_medio = None
+        self.detecciones = 0
+        self.retrocesos = 0
+
+    @property
+    def hz(self):
+        """Ritmo de detección vigente (más alto mientras hay un candidato)."""
+        if self._hay_candidato:
+            return max(self.hz_actual, self.hz_candidato)
+        return self.hz_actual
+
+    def proxima(self):
+        """Instante (``time.monotonic``) en que toca la siguiente detección."""
+        return self._ultima + 1.0 / self.hz
+
+    def debe_detectar(self):
+        return time.monotonic() >= self.proxima()
+
+    def candidato(self, hay=True):
+        """Indica si hay una detección candidata que conviene confirmar rápido."""
+        self._hay_candidato = bool(hay)
+
+    @contextmanager
+    def medir(self):
+        """Mide el tiempo de CPU de una detección (sólo de este hilo) y ajusta el ritmo."""
+        inicio = time.monotonic()
+        # process_time() sumaría la CPU de la captura, la voz y el micrófono
+        cpu0 = time.thread_time()
+        try:
+            yield
+        finally:
+            self.registrar(time.thread_time() - cpu0, inicio)
+
+    def registrar(self, cpu, inicio=None):
+        self._ultima = time.monotonic() if inicio is None else inicio
+        self.detecciones += 1
+        self._cpu_medio = cpu if self._cpu_medio is None else 0.8 * self._cpu_medio + 0.2 * cpu
+        carga = self._cpu_medio * self.hz_actual
+        if carga > self.presupuesto_cpu:
+            nuevo = max(self.hz_minimo, 0.9 * self.presupuesto_cpu / max(self._cpu_medio, 1e-6))
+            if nuevo < self.hz_actual:
+                self.hz_actual = nuevo
+                self.retrocesos += 1
+        elif carga < 0.6 * self.presupuesto_cpu and self.hz_actual < self.hz_objetivo:
+            self.hz_actual = min(self.hz_objetivo, self.hz_actual * 1.25)
+
+    def esperar_tecla(self):
+        """
+        Atiende la ventana hasta el siguiente frame de pantalla (o hasta la
+        próxima detección, si llega antes); devuelve la tecla o -1.
+        """
+        import cv2
+        t0 = time.monotonic()
+        espera = max(min(self._pantalla + 1.0 / self.hz_pantalla, self.proxima()) - t0, 0.001)
+        tecla = cv2.waitKey(max(1, int(espera * 1000)))
+        transcurrido = time.monotonic() - t0
+        if tecla == -1 and transcurrido < espera / 2:
+            # sin ventanas abiertas waitKey vuelve al instante
+            time.sleep(espera - transcurrido)
+        self._pantalla = time.monotonic()
+        return tecla & 0xFF if tecla != -1 else -1
+
+    def estadisticas(self):
+        return {
+            "hz_actual": self.hz,
+            "detecciones": self.detecciones,
+            "cpu_medio": self._cpu_medio or 0.0,
+            "retrocesos": self.retrocesos,
+        }
@@ -0,0 +1,233 @@
+"""Frases con plantilla compuestas a partir de trozos ya sintetizados.
+
+Muchas frases de los juegos sólo cambian en una parte pequeña ("Ronda 3.
+Muéstrame el número 7. Tienes 15 segundos."). Cachear la frase entera
+obliga a sintetizar cada combinación. Con una ``Plantilla`` se sintetizan
+una sola vez los trozos fijos y los valores posibles de cada hueco
+(dígitos, colores, figuras, números de ronda); al decir la frase se
+decodifican a PCM, se recortan los silencios de los extremos y se unen
+con un fundido cruzado corto, sin esperar a ningún backend de voz.
+
+Uso en un juego::
+
+    RONDA = Plantilla("Ronda {n}. Muéstrame el número {objetivo}.",
+                      n=range(1, 11), objetivo=range(10))
+    preparar(RONDA)                     # sintetiza los trozos en segundo plano
+    decir(RONDA(n=1, objetivo=7))       # se compone al instante
+
+``RONDA(...)`` devuelve una ``Frase``, que es un ``str`` normal con el
+texto completo: funciona también con ``hablar()`` y, si algo falla al
+componer, se sintetiza entera como cualquier otra frase.
+"""
+import itertools
+import string
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# pausa (s) que se inserta en lugar de la puntuación que separa trozos
+PAUSAS = {".": 0.28, "!": 0.28, "?": 0.28, ",": 0.12, ";": 0.12, ":": 0.12}
+
+
+def _partir(formato):
+    """Divide el formato en ("texto", str), ("pausa", s) y ("hueco", nombre)."""
+    partes = []
+    for literal, campo, espec, conversion in string.Formatter().parse(formato):
+        literal = literal.strip()
+        # la puntuación con la que empieza un trozo cierra el hueco anterior: pausa
+        pausa = 0.0
+        while literal and literal[0] in PAUSAS:
+            pausa = max(pausa, PAUSAS[literal[0]])
+            literal = literal[1:].lstrip()
+        if pausa and partes:
+            partes.append(("pausa", pausa))
+        if literal:
+            partes.append(("texto", literal))
+        if campo is not None:
+            if not campo.isidentifier() or espec or conversion:
+                raise ValueError(f"Hueco no admitido en una plantilla: {{{campo}}}")
+            partes.append(("hueco", campo))
+    return partes
+
+
+class Plantilla:
+    def __init__(self, formato, **dominios):
+        self.formato = formato
+        self.partes = _partir(formato)
+        huecos = {n for tipo, n in self.partes if tipo == "hueco"}
+        faltan = huecos - set(dominios)
+        if faltan:
+            raise ValueError(f"Faltan los valores posibles de: {', '.join(sorted(faltan))}")
+        self.dominios = {n: [str(v) for v in dominios[n]] for n in huecos}
+
+    def __call__(self, **valores):
+        return Frase(self, valores)
+
+    def trozos(self):
+        """Todos los textos que hay que sintetizar: partes fijas y valores de los huecos."""
+        textos = [n for tipo, n in self.partes if tipo == "texto"]
+        for nombre in sorted(self.dominios):
+            textos.extend(self.dominios[nombre])
+        return list(dict.fromkeys(textos))
+
+    def frases(self):
+        """Recorre todas las frases completas que puede generar la plantilla."""
+        nombres = sorted(self.dominios)
+        for combinacion in itertools.product(*(self.dominios[n] for n in nombres)):
+            yield self.formato.format(**dict(zip(nombres, combinacion)))
+
+    def __repr__(self):
+        return f"Plantilla({self.formato!r})"
+
+
+class Frase(str):
+    """Texto de una plantilla ya rellenada; recuerda de qué trozos se compone."""
+
+    def __new__(cls, plantilla, valores):
+        frase = super().__new__(cls, plantilla.formato.format(**valores))
+        frase.plantilla = plantilla
+        frase.valores = {k: str(v) for k, v in valores.items()}
+        return frase
+
+    def segmentos(self):
+        """Lista de ("texto", str) y ("pausa", s) en orden."""
+        return [("texto", self.valores[v]) if tipo == "hueco" else (tipo, v)
+                for tipo, v in self.plantilla.partes]
+
+
+def _recortar(pcm, margen):
+    """Quita el silencio del principio y del final, dejando ``margen`` muestras."""
+    import numpy as np
+    if pcm.dtype.kind == "i":
+        umbral = 0.02 * np.iinfo(pcm.dtype).max
+    elif pcm.dtype.kind == "f":
+        umbral = 0.02
+    else:
+        return pcm
+    amplitud = np.abs(pcm.astype(np.float32))
+    if amplitud.ndim > 1:
+        amplitud = amplitud.max(axis=1)
+    sonoras = np.flatnonzero(amplitud > umbral)
+    if not len(sonoras):
+        return pcm
+    return pcm[max(0, sonoras[0] - margen):sonoras[-1] + margen + 1]
+
+
+def _unir(trozos, cruce):
+    """Concatena PCM con un fundido cruzado lineal de ``cruce`` muestras entre trozos."""
+    import numpy as np
+    salida = trozos[0].astype(np.float32)
+    for trozo in trozos[1:]:
+        trozo = trozo.astype(np.float32)
+        k = min(cruce, len(salida), len(trozo))
+        if k:
+            rampa = np.linspace(0.0, 1.0, k, dtype=np.float32)
+            if trozo.ndim > 1:
+                rampa = rampa[:, None]
+            mezcla = salida[-k:] * (1.0 - rampa) + trozo[:k] * rampa
+            salida = np.concatenate([salida[:-k], mezcla, trozo[k:]])
+        else:
+            salida = np.concatenate([salida, trozo])
+    return salida
+
+
+class Compositor:
+    """
+    Decodifica los trozos una vez y compone ``Frase`` como sonidos de pygame.
+
+    Tanto el PCM de los trozos como las frases compuestas se guardan en
+    cachés LRU (``max_trozos`` y ``max_frases``), igual que los sonidos de
+    ``MotorAudio``, para que una sesión larga no acumule memoria sin límite.
+    """
+
+    def __init__(self, motor, cruce=0.02, margen=0.01, max_frases=128, max_trozos=256):
+        self.motor = motor
+        self.cruce = cruce
+        self.margen = margen
+        self.max_frases = max_frases
+        self.max_trozos = max_trozos
+        self._pcm = OrderedDict()
+        self._frases = OrderedDict()
+        self._lock = threading.Lock()
+        self.compuestas = 0
+
+    def _frecuencia(self):
+        import pygame
+        return pygame.mixer.get_init()[0]
+
+    def pcm(self, texto, lang="es", slow=False):
+        """PCM recortado de un trozo (sintetizándolo si hace falta)."""
+        clave = (texto, lang, slow)
+        with self._lock:
+            pcm = self._pcm.get(clave)
+            if pcm is not None:
+                self._pcm.move_to_end(clave)
+                return pcm
+        import pygame
+        from comun import voz
+        sonido = self.motor.cargar(voz.sintetizar(texto, lang, slow))
+        pcm = _recortar(pygame.sndarray.array(sonido), int(self.margen * self._frecuencia()))
+        with self._lock:
+            self._pcm[clave] = pcm
+            while len(self._pcm) > self.max_trozos:
+                self._pcm.popitem(last=False)
+        return pcm
+
+    def componer(self, frase, lang="es", slow=False):
+        """Devuelve un ``pygame.mixer.Sound`` con la frase compuesta."""
+        import numpy as np
+        import pygame
+        clave = (str(frase), lang, slow)
+        with self._lock:
+            sonido = self._frases.get(clave)
+            if sonido is not None:
+                self._frases.move_to_end(clave)
+                return sonido
+        frecuencia = self._frecuencia()
+        trozos = []
+        for tipo, valor in frase.segmentos():
+            if tipo == "texto":
+                trozos.append(self.pcm(valor, lang, slow))
+            elif trozos:
+                forma = (int(valor * frecuencia),) + trozos[-1].shape[1:]
+                trozos.append(np.zeros(forma, dtype=trozos[-1].dtype))
+        pcm = _unir(trozos, int(self.cruce * frecuencia))
+        if trozos[0].dtype.kind == "i":
+            info = np.iinfo(trozos[0].dtype)
+            pcm = np.clip(pcm, info.min, info.max)
+        sonido = pygame.sndarray.make_sound(np.ascontiguousarray(pcm.astype(trozos[0].dtype)))
+        with self._lock:
+            self._frases[clave] = sonido
+            while len(self._frases) > self.max_frases:
+                self._frases.popitem(last=False)
+            self.compuestas += 1
+        return sonido
+
+    def precalentar(self, plantillas, lang="es", slow=False, hilos=4):
+        """Sintetiza y decodifica todos los trozos de ``plantillas``; devuelve {trozo: error}."""
+        textos = list(dict.fromkeys(t for p in plantillas for t in p.trozos()))
+        errores = {}
+
+        def _uno(texto):
+            try:
+                self.pcm(texto, lang, slow)
+            except Exception as e:
+                errores[texto] = e
+
+        with ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="plantillas") as pool:
+            list(pool.map(_uno, textos))
+        return errores
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "trozos": len(self._pcm),
+                "muestras": sum(len(p) for p in self._pcm.values()),
+                "frases_en_memoria": len(self._frases),
+                "compuestas": self.compuestas,
+            }
+
+    def cerrar(self):
+        with self._lock:
+            self._pcm.clear()
+            self._frases.clear()
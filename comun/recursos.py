@@ -0,0 +1,253 @@
+"""Registro de recursos caros compartidos por los juegos.
+
+La cámara, el modelo de dígitos, el detector de manos de MediaPipe, el
+micrófono, las palabras grabadas, el mezclador de pygame, el motor de
+audio y las frases con plantilla se crean la primera vez que alguien los
+pide (o al llamar a ``precalentar``) y después se reutilizan. Cada recurso lleva un
+contador de referencias: ``adquirir``/``soltar`` (o ``usar`` como
+``with``) marcan quién lo está usando, y ``liberar_sin_uso``/``cerrar_todo``
+cierran los que ya nadie usa.
+
+Importar este módulo no importa TensorFlow, MediaPipe, OpenCV ni pygame:
+cada fábrica importa lo que necesita al crear el recurso.
+"""
+import os
+import threading
+from contextlib import contextmanager
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# índice de la cámara que usan todos los juegos
+INDICE_CAMARA = 0
+
+# rutas donde se busca el modelo entrenado por numeros/entrenador.py
+RUTAS_MODELO_DIGITOS = [
+    os.path.abspath("mnist_cnn_model.h5"),
+    os.path.join(RAIZ, "numeros", "mnist_cnn_model.h5"),
+]
+# los mismos pesos exportados para la inferencia con NumPy (comun/red_digitos.py)
+RUTAS_PESOS_DIGITOS = [os.path.splitext(r)[0] + ".npz" for r in RUTAS_MODELO_DIGITOS]
+
+
+class Recurso:
+    """Un recurso con creación perezosa y contador de referencias."""
+
+    def __init__(self, nombre, crear, liberar=None):
+        self.nombre = nombre
+        self.crear = crear
+        self.liberar = liberar
+        self.valor = None
+        self.creado = False
+        self.refs = 0
+        self.lock = threading.Lock()
+
+    def _crear(self):
+        # con self.lock ya tomado
+        if not self.creado:
+            self.valor = self.crear()
+            self.creado = True
+        return self.valor
+
+    def obtener(self):
+        """Devuelve el valor, creándolo si hace falta (sin tocar el contador)."""
+        with self.lock:
+            return self._crear()
+
+    def adquirir(self):
+        """Como ``obtener`` pero sumando una referencia en el mismo paso."""
+        with self.lock:
+            valor = self._crear()
+            self.refs += 1
+            return valor
+
+    def cerrar(self, solo_sin_uso=False):
+        """
+        Libera el valor. Con ``solo_sin_uso`` no hace nada si alguien tiene
+        una referencia; la comprobación va bajo el mismo lock que
+        ``adquirir``, así que no puede cerrarse un recurso recién adquirido.
+        """
+        with self.lock:
+            if not self.creado or (solo_sin_uso and self.refs > 0):
+                return
+            valor = self.valor
+            self.valor = None
+            self.creado = False
+        if self.liberar is not None:
+            try:
+                self.liberar(valor)
+            except Exception as e:
+                print(f"Error al liberar '{self.nombre}': {e}")
+
+
+_registro = {}
+_registro_lock = threading.Lock()
+
+
+def registrar(nombre, crear, liberar=None):
+    """Registra (o reemplaza) la fábrica de un recurso."""
+    with _registro_lock:
+        anterior = _registro.get(nombre)
+        _registro[nombre] = Recurso(nombre, crear, liberar)
+    if anterior is not None:
+        anterior.cerrar()
+
+
+def _recurso(nombre):
+    try:
+        return _registro[nombre]
+    except KeyError:
+        raise KeyError(f"Recurso no registrado: {nombre}") from None
+
+
+def obtener(nombre):
+    """Devuelve el recurso sin registrar un uso (para quien ya tiene una referencia)."""
+    return _recurso(nombre).obtener()
+
+
+def adquirir(nombre):
+    """Devuelve el recurso (creándolo si hace falta) y suma una referencia."""
+    return _recurso(nombre).adquirir()
+
+
+def soltar(nombre):
+    """Resta una referencia. El recurso sigue creado para reutilizarlo."""
+    recurso = _recurso(nombre)
+    with recurso.lock:
+        if recurso.refs > 0:
+            recurso.refs -= 1
+
+
+@contextmanager
+def usar(nombre):
+    valor = adquirir(nombre)
+    try:
+        yield valor
+    finally:
+        soltar(nombre)
+
+
+def precalentar(nombres=None, en_segundo_plano=False):
+    """Crea por adelantado los recursos indicados (todos si ``nombres`` es None).
+
+    Devuelve un diccionario nombre -> excepción con los que fallaron, o el
+    hilo lanzado si ``en_segundo_plano`` es True.
+    """
+    if nombres is None:
+        nombres = list(_registro)
+    errores = {}
+
+    def _precalentar():
+        for nombre in nombres:
+            try:
+                obtener(nombre)
+            except Exception as e:
+                errores[nombre] = e
+
+    if en_segundo_plano:
+        hilo = threading.Thread(target=_precalentar, name="precalentar-recursos", daemon=True)
+        hilo.start()
+        return hilo
+    _precalentar()
+    return errores
+
+
+def liberar_sin_uso(nombres=None):
+    """Cierra los recursos creados (todos o sólo ``nombres``) que no tienen ninguna referencia activa."""
+    if nombres is None:
+        nombres = list(_registro)
+    for nombre in nombres:
+        _recurso(nombre).cerrar(solo_sin_uso=True)
+
+
+def cerrar_todo():
+    """Cierra todos los recursos, se estén usando o no (al salir del programa)."""
+    for recurso in list(_registro.values()):
+        recurso.cerrar()
+        with recurso.lock:
+            recurso.refs = 0
+
+
+def estado():
+    """Devuelve {nombre: (creado, referencias)} para depurar o medir."""
+    return {n: (r.creado, r.refs) for n, r in _registro.items()}
+
+
+# --- Recursos de los juegos ---
+
+def _crear_camara():
+    # si main.py lanzó el servidor de cámara compartida, leer de la memoria compartida
+    nombre = os.environ.get("ROBOT_CAMARA_SHM")
+    if nombre:
+        from comun import camara_compartida
+        try:
+            return camara_compartida.LectorCamara(nombre)
+        except (FileNotFoundError, ValueError) as e:
+            print(f"No se pudo usar la cámara compartida ({e}); abriendo la cámara directamente.")
+    import cv2
+    from comun.captura import CapturaEnHilo
+    cap = cv2.VideoCapture(INDICE_CAMARA)
+    if not cap.isOpened():
+        cap.release()
+        raise RuntimeError("No se pudo abrir la cámara.")
+    # un hilo vacía el buffer del driver para que los juegos siempre reciban el último frame
+    return CapturaEnHilo(cap)
+
+
+def _crear_modelo_digitos():
+    # con NumPy si hay pesos exportados; TensorFlow sólo si no (o con ROBOT_MOTOR_DIGITOS=keras)
+    from comun.red_digitos import cargar_modelo
+    return cargar_modelo(RUTAS_MODELO_DIGITOS, RUTAS_PESOS_DIGITOS)
+
+
+def _crear_manos():
+    import mediapipe as mp
+    return mp.solutions.hands.Hands()
+
+
+def _crear_microfono():
+    from comun.microfono import Microfono
+    return Microfono()
+
+
+def _crear_palabras():
+    from comun.palabras import BancoPalabras
+    return BancoPalabras()
+
+
+def _crear_voz():
+    from comun.voz import ColaVoz
+    return ColaVoz()
+
+
+def _crear_plantillas():
+    from comun.plantillas import Compositor
+    return Compositor(adquirir("audio"))
+
+
+def _cerrar_plantillas(compositor):
+    compositor.cerrar()
+    soltar("audio")
+
+
+def _crear_audio():
+    from comun.audio import MotorAudio
+    return MotorAudio()
+
+
+def _crear_mezclador():
+    import pygame
+    pygame.mixer.init()
+    return pygame.mixer
+
+
+registrar("camara", _crear_camara, lambda cap: cap.release())
+registrar("modelo_digitos", _crear_modelo_digitos)
+registrar("manos", _crear_manos, lambda manos: manos.close())
+registrar("microfono", _crear_microfono, lambda mic: mic.cerrar())
+registrar("palabras", _crear_palabras)
+# "voz", "plantillas" y "audio" van antes que "mezclador" para que cerrar_todo()
+# pare la cola y los sonidos antes de cerrar el mezclador
+registrar("voz", _crear_voz, lambda cola: cola.cerrar())
+registrar("plantillas", _crear_plantillas, _cerrar_plantillas)
+registrar("audio", _crear_audio, lambda motor: motor.cerrar())
+registrar("mezclador", _crear_mezclador, lambda mixer: mixer.quit())
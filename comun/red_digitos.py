@@ -0,0 +1,361 @@
+"""Inferencia de la CNN de dígitos con NumPy, sin TensorFlow.
+
+``detectarNumeros.py`` importaba TensorFlow entero (segundos de arranque y
+cientos de MB) sólo para pasar una imagen de 28x28 por frame por
+``model.predict``, que además añade milisegundos de sobrecarga por
+llamada. La red de ``numeros/entrenador.py`` es pequeña (2 Conv2D, 2
+MaxPooling2D, 2 Dense), así que aquí:
+
+- ``exportar`` guarda las capas y los pesos del modelo Keras en un
+  ``.npz`` (``numeros/entrenador.py`` ya lo hace al terminar);
+- ``RedNumpy`` hace la misma pasada hacia delante con NumPy: las
+  convoluciones como im2col + un producto de matrices, con los búferes
+  reservados una vez por tamaño de lote. ``predict`` tiene la misma firma
+  que la de Keras, así que el detector no cambia.
+
+El registro de recursos carga ``mnist_cnn_model.npz`` si existe; con
+``ROBOT_MOTOR_DIGITOS=keras`` se vuelve a usar TensorFlow.
+
+Variantes comprimidas (``numeros/comprimir.py`` las genera y compara):
+``cuantizar`` guarda los pesos en int8 con una escala por canal de salida
+(``_int8``, 4 veces menos espacio) y "alumno" es una red más pequeña
+destilada de la original. ``ROBOT_MODELO_DIGITOS`` (o ``variante=``)
+elige cuál cargar: ``original``, ``int8``, ``alumno`` o ``alumno_int8``.
+Desde la línea de comandos::
+
+    python -m comun.red_digitos exportar numeros/mnist_cnn_model.h5
+    python -m comun.red_digitos cuantizar      # mnist_cnn_model_int8.npz
+    python -m comun.red_digitos verificar      # misma predicción que Keras
+    python -m comun.red_digitos benchmark      # arranque, memoria y latencia
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VARIABLE_ENTORNO = "ROBOT_MOTOR_DIGITOS"
+RUTA_H5 = os.path.join(RAIZ, "numeros", "mnist_cnn_model.h5")
+RUTA_NPZ = os.path.join(RAIZ, "numeros", "mnist_cnn_model.npz")
+
+VARIABLE_VARIANTE = "ROBOT_MODELO_DIGITOS"
+# sufijo del .npz de cada variante: mnist_cnn_model{sufijo}.npz
+VARIANTES = {"original": "", "int8": "_int8", "alumno": "_alumno", "alumno_int8": "_alumno_int8"}
+
+_ACTIVACIONES = ("linear", "relu", "softmax")
+
+
+# --- exportación ---
+
+def exportar(modelo, ruta, activacion_final=None):
+    """Guarda un ``Sequential`` de Keras (Conv2D/MaxPooling2D/Flatten/Dense) en ``ruta``.
+
+    ``activacion_final`` sustituye la de la última capa (el alumno se
+    entrena con logits y se exporta con "softmax").
+    """
+    tipos, activaciones, datos = [], [], {}
+    for i, capa in enumerate(modelo.layers):
+        tipo = type(capa).__name__
+        config = capa.get_config()
+        if tipo == "Conv2D":
+            if tuple(config["strides"]) != (1, 1) or config["padding"] != "valid":
+                raise ValueError(f"{capa.name}: sólo se admiten convoluciones 'valid' con paso 1")
+            datos[f"w{i}"], datos[f"b{i}"] = capa.get_weights()
+        elif tipo == "Dense":
+            datos[f"w{i}"], datos[f"b{i}"] = capa.get_weights()
+        elif tipo == "MaxPooling2D":
+            datos[f"pool{i}"] = np.array(config["pool_size"])
+        elif tipo not in ("Flatten", "InputLayer", "Dropout"):
+            raise ValueError(f"Capa no soportada: {tipo}")
+        activacion = config.get("activation", "linear")
+        if activacion not in _ACTIVACIONES:
+            raise ValueError(f"{capa.name}: activación no soportada {activacion!r}")
+        tipos.append(tipo)
+        activaciones.append(activacion)
+    if activacion_final is not None:
+        activaciones[-1] = activacion_final
+    np.savez(ruta, tipos=np.array(tipos), activaciones=np.array(activaciones), **datos)
+    return ruta
+
+
+def cuantizar(ruta, ruta_int8=None):
+    """Copia ``ruta`` con los pesos en int8 simétrico, con una escala por canal de salida.
+
+    Los sesgos siguen en float32 (son pocos). ``RedNumpy.cargar`` vuelve a
+    float32 al cargar (``q * escala``): NumPy no tiene un producto int8 más
+    rápido que el de float32, así que se gana tamaño de fichero, no latencia.
+    """
+    ruta_int8 = ruta_int8 or os.path.splitext(ruta)[0] + VARIANTES["int8"] + ".npz"
+    with np.load(ruta) as datos:
+        salida = {}
+        for clave in datos.files:
+            if clave.startswith("w"):
+                w = datos[clave].astype(np.float32)
+                ejes = tuple(range(w.ndim - 1))  # todo salvo el canal de salida
+                escala = np.abs(w).max(axis=ejes) / 127.0
+                escala[escala == 0] = 1.0
+                salida["q" + clave[1:]] = np.clip(np.round(w / escala), -127, 127).astype(np.int8)
+                salida["s" + clave[1:]] = escala.astype(np.float32)
+            else:
+                salida[clave] = datos[clave]
+    np.savez(ruta_int8, **salida)
+    return ruta_int8
+
+
+def ruta_variante(ruta_npz, variante):
+    """``.../mnist_cnn_model.npz`` -> ``.../mnist_cnn_model{sufijo}.npz``."""
+    if variante not in VARIANTES:
+        raise ValueError(f"Variante desconocida: {variante!r} (disponibles: {', '.join(VARIANTES)})")
+    base = os.path.splitext(ruta_npz)[0]
+    return base + VARIANTES[variante] + ".npz"
+
+
+# --- inferencia ---
+
+class RedNumpy:
+    """Pasada hacia delante de la red exportada, con búferes reutilizados."""
+
+    def __init__(self, capas, forma_entrada=(28, 28, 1)):
+        self.capas = capas
+        self.forma_entrada = tuple(forma_entrada)
+        self._buferes = {}  # tamaño de lote -> búferes de cada capa
+
+    @staticmethod
+    def _pesos(datos, i):
+        """Pesos de la capa ``i`` en float32, tanto si se guardaron así como en int8."""
+        if f"q{i}" in datos.files:
+            return datos[f"q{i}"].astype(np.float32) * datos[f"s{i}"]
+        return datos[f"w{i}"].astype(np.float32)
+
+    @classmethod
+    def cargar(cls, ruta=RUTA_NPZ):
+        with np.load(ruta) as datos:
+            capas = []
+            for i, (tipo, activacion) in enumerate(zip(datos["tipos"].tolist(), datos["activaciones"].tolist())):
+                if tipo == "Conv2D":
+                    w = cls._pesos(datos, i)
+                    kh, kw, c, f = w.shape
+                    # mismo orden (fila, columna, canal) que las columnas de im2col
+                    capas.append(("conv", activacion, w.reshape(kh * kw * c, f), datos[f"b{i}"].astype(np.float32), (kh, kw)))
+                elif tipo == "Dense":
+                    capas.append(("dense", activacion, cls._pesos(datos, i), datos[f"b{i}"].astype(np.float32), None))
+                elif tipo == "MaxPooling2D":
+                    capas.append(("pool", activacion, None, None, tuple(datos[f"pool{i}"].tolist())))
+                elif tipo == "Flatten":
+                    capas.append(("flatten", activacion, None, None, None))
+        return cls(capas)
+
+    def _preparar(self, n):
+        """Reserva los búferes de im2col y de salida de cada capa para lotes de ``n``."""
+        buferes = []
+        h, w, c = self.forma_entrada
+        for tipo, _, pesos, _, extra in self.capas:
+            if tipo == "conv":
+                kh, kw = extra
+                h, w = h - kh + 1, w - kw + 1
+                columnas = np.empty((n, h, w, kh, kw, c), np.float32)
+                c = pesos.shape[1]
+                buferes.append((columnas, np.empty((n * h * w, c), np.float32)))
+            elif tipo == "pool":
+                ph, pw = extra
+                h, w = h // ph, w // pw
+                buferes.append(None)
+            elif tipo == "flatten":
+                h, w, c = 1, 1, h * w * c
+                buferes.append(None)
+            else:
+                c = pesos.shape[1]
+                buferes.append(np.empty((n, c), np.float32))
+        return buferes
+
+    def predecir(self, x):
+        """Probabilidades ``(N, 10)`` para un lote ``(N, 28, 28, 1)``."""
+        x = np.asarray(x, dtype=np.float32)
+        if x.ndim == 3:
+            x = x[..., None]
+        n = x.shape[0]
+        buferes = self._buferes.get(n)
+        if buferes is None:
+            buferes = self._buferes[n] = self._preparar(n)
+        for (tipo, activacion, pesos, sesgo, extra), bufer in zip(self.capas, buferes):
+            if tipo == "conv":
+                columnas, salida = bufer
+                kh, kw = extra
+                _, ho, wo = columnas.shape[:3]
+                s = x.strides
+                ventanas = np.lib.stride_tricks.as_strided(
+                    x, shape=columnas.shape, strides=(s[0], s[1], s[2], s[1], s[2], s[3]), writeable=False)
+                np.copyto(columnas, ventanas)
+                np.matmul(columnas.reshape(n * ho * wo, -1), pesos, out=salida)
+                salida += sesgo
+                x = salida.reshape(n, ho, wo, -1)
+            elif tipo == "pool":
+                ph, pw = extra
+                _, h, w, c = x.shape
+                ho, wo = h // ph, w // pw
+                x = x[:, :ho * ph, :wo * pw].reshape(n, ho, ph, wo, pw, c).max(axis=(2, 4))
+            elif tipo == "flatten":
+                x = x.reshape(n, -1)
+            else:
+                np.matmul(x, pesos, out=bufer)
+                bufer += sesgo
+                x = bufer
+            if activacion == "relu":
+                np.maximum(x, 0, out=x)
+            elif activacion == "softmax":
+                x = np.exp(x - x.max(axis=1, keepdims=True))
+                x /= x.sum(axis=1, keepdims=True)
+        # copia: el búfer de la última capa se reutiliza en la siguiente llamada
+        return np.array(x)
+
+    def predict(self, x, verbose=0):
+        """Igual que ``keras.Model.predict`` para que el detector no cambie."""
+        return self.predecir(x)
+
+
+def cargar_modelo(rutas_h5=(RUTA_H5,), rutas_npz=(RUTA_NPZ,), variante=None):
+    """``RedNumpy`` si hay pesos exportados (salvo ``ROBOT_MOTOR_DIGITOS=keras``); si no, Keras.
+
+    ``variante`` (o ``ROBOT_MODELO_DIGITOS``) elige una de ``VARIANTES``;
+    las comprimidas sólo existen como ``.npz``.
+    """
+    variante = (variante or os.environ.get(VARIABLE_VARIANTE, "original")).strip().lower()
+    if variante != "original":
+        rutas = [ruta_variante(r, variante) for r in rutas_npz]
+        npz = next((r for r in rutas if os.path.isfile(r)), None)
+        if npz is None:
+            raise FileNotFoundError(
+                f"No se encontró la variante '{variante}' ({os.path.basename(rutas[0])}). "
+                "Genérala con 'python numeros/comprimir.py'.")
+        return RedNumpy.cargar(npz)
+    motor = os.environ.get(VARIABLE_ENTORNO, "numpy").strip().lower()
+    npz = next((r for r in rutas_npz if os.path.isfile(r)), None)
+    if motor != "keras" and npz is not None:
+        return RedNumpy.cargar(npz)
+    h5 = next((r for r in rutas_h5 if os.path.isfile(r)), None)
+    if h5 is None:
+        raise FileNotFoundError(
+            "No se encontró 'mnist_cnn_model.h5'. Entrénalo con numeros/entrenador.py "
+            "o cópialo a la carpeta del proyecto.")
+    import tensorflow as tf
+    if motor != "keras":
+        print("Usando TensorFlow: exporta el modelo con 'python -m comun.red_digitos exportar' "
+              "para no cargarlo.")
+    return tf.keras.models.load_model(h5)
+
+
+# --- verificación y benchmark ---
+
+def _entradas_prueba(n, semilla=0):
+    """Imágenes binarias con trazos, parecidas a las ROI que prepara el detector."""
+    rng = np.random.default_rng(semilla)
+    x = np.zeros((n, 28, 28, 1), np.float32)
+    for imagen in x:
+        for _ in range(rng.integers(2, 5)):
+            f, c = rng.integers(4, 24, size=2)
+            df, dc = rng.integers(-1, 2, size=2)
+            for paso in range(rng.integers(6, 14)):
+                ff, cc = np.clip([f + df * paso, c + dc * paso], 2, 25)
+                imagen[ff - 1:ff + 2, cc - 1:cc + 2] = 1.0
+    return x
+
+
+_MEDIR = r"""
+import os, sys, time, json
+inicio = time.perf_counter()
+sys.path.insert(0, {raiz!r})
+os.environ[{variable!r}] = {motor!r}
+from comun.red_digitos import cargar_modelo, _entradas_prueba
+modelo = cargar_modelo()
+x = _entradas_prueba(1)
+modelo.predict(x, verbose=0)
+arranque = time.perf_counter() - inicio
+tiempos = []
+for _ in range({repeticiones}):
+    t = time.perf_counter()
+    modelo.predict(x, verbose=0)
+    tiempos.append(time.perf_counter() - t)
+tiempos.sort()
+try:
+    import resource  # no existe en Windows
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+except ImportError:
+    rss = None
+print(json.dumps({{"arranque_s": arranque, "rss_mb": rss,
+                  "mediana_ms": 1000 * tiempos[len(tiempos) // 2], "p95_ms": 1000 * tiempos[int(len(tiempos) * 0.95)]}}))
+"""
+
+
+def _medir_en_proceso(motor, repeticiones):
+    """Arranque, memoria máxima y latencia de un motor en un proceso nuevo."""
+    import json
+    codigo = _MEDIR.format(raiz=RAIZ, variable=VARIABLE_ENTORNO, motor=motor, repeticiones=repeticiones)
+    salida = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True)
+    if salida.returncode != 0:
+        raise RuntimeError(salida.stderr.strip().splitlines()[-1] if salida.stderr.strip() else "falló")
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def _verificar(args):
+    import tensorflow as tf
+    keras = tf.keras.models.load_model(args.h5)
+    red = RedNumpy.cargar(args.npz)
+    x = _entradas_prueba(args.muestras)
+    esperado = keras.predict(x, verbose=0)
+    obtenido = red.predecir(x)
+    diferencia = float(np.abs(esperado - obtenido).max())
+    iguales = int((esperado.argmax(1) == obtenido.argmax(1)).sum())
+    print(f"diferencia máxima {diferencia:.2e}; misma clase en {iguales}/{len(x)}")
+    return 0 if diferencia < 1e-4 and iguales == len(x) else 1
+
+
+def _benchmark(args):
+    for motor in ("numpy", "keras"):
+        try:
+            m = _medir_en_proceso(motor, args.repeticiones)
+        except Exception as e:
+            print(f"{motor:6s} no disponible: {e}")
+            continue
+        memoria = f"{m['rss_mb']:.0f} MB" if m["rss_mb"] is not None else "?"
+        print(f"{motor:6s} arranque {m['arranque_s']:.2f} s, memoria {memoria}, "
+              f"predicción {m['mediana_ms']:.2f} ms (p95 {m['p95_ms']:.2f} ms)")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CNN de dígitos con NumPy")
+    sub = parser.add_subparsers(dest="orden", required=True)
+    exp = sub.add_parser("exportar", help="guarda los pesos de un modelo Keras en .npz")
+    exp.add_argument("h5", nargs="?", default=RUTA_H5)
+    exp.add_argument("npz", nargs="?", default=RUTA_NPZ)
+    ver = sub.add_parser("verificar", help="compara las predicciones con las de Keras")
+    ver.add_argument("--h5", default=RUTA_H5)
+    ver.add_argument("--npz", default=RUTA_NPZ)
+    ver.add_argument("--muestras", type=int, default=256)
+    cua = sub.add_parser("cuantizar", help="guarda una copia del .npz con los pesos en int8")
+    cua.add_argument("npz", nargs="?", default=RUTA_NPZ)
+    cua.add_argument("salida", nargs="?")
+    bench = sub.add_parser("benchmark", help="arranque, memoria y latencia de NumPy frente a Keras")
+    bench.add_argument("--repeticiones", type=int, default=200)
+    args = parser.parse_args(argv)
+    if args.orden == "exportar":
+        import tensorflow as tf
+        inicio = time.perf_counter()
+        print(f"Guardado {exportar(tf.keras.models.load_model(args.h5), args.npz)} "
+              f"({time.perf_counter() - inicio:.1f} s)")
+        return 0
+    if args.orden == "cuantizar":
+        salida = cuantizar(args.npz, args.salida)
+        print(f"Guardado {salida} ({os.path.getsize(args.npz) // 1024} KB -> "
+              f"{os.path.getsize(salida) // 1024} KB)")
+        return 0
+    if args.orden == "verificar":
+        return _verificar(args)
+    return _benchmark(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,342 @@
+"""Síntesis de voz con motores intercambiables y respaldo automático.
+
+gTTS va a los servidores de Google por cada frase nueva, y con el Wi-Fi
+del colegio eso es lo que más tarda y lo que más falla. Aquí la síntesis
+queda detrás de una interfaz común (``Backend.sintetizar(texto, lang, slow)
+-> bytes``) con tres implementaciones:
+
+- ``BackendGTTS`` ("gtts"): la voz de siempre; mp3 por red, con timeout.
+- ``BackendLocal`` ("local"): sin conexión, con las voces del sistema
+  (``pyttsx3``: SAPI5 en Windows, espeak en Linux, NSSpeech en macOS).
+- ``BackendFalso`` ("falso"): determinista y sin dependencias; genera un
+  tono cuya duración depende del texto. Sirve para pruebas y para CI.
+
+``Sintesis`` prueba los backends en orden. Si uno falla se pasa al
+siguiente y el que falló queda fuera: tras ``pausa`` segundos (el doble
+con cada fallo seguido, hasta ``pausa_max``) un hilo aparte comprueba si
+vuelve a estar disponible (``Backend.comprobar``: para gTTS, que se llega
+al servidor) y sólo entonces vuelve a usarse al hablar. Así, sin red sólo
+la primera frase paga el timeout de gTTS. Antes de sintetizar nada se
+busca la frase en la caché de todos los backends, de modo que una frase
+ya sintetizada (aunque sea con la voz local) nunca espera a la red.
+
+El orden se elige con la variable ``ROBOT_VOZ`` (por defecto
+``gtts,local``; en CI ``ROBOT_VOZ=falso``). Para comparar latencias::
+
+    python -m comun.sintesis "Hola, vamos a jugar"
+"""
+import argparse
+import hashlib
+import io
+import math
+import os
+import socket
+import struct
+import sys
+import tempfile
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+VARIABLE_ENTORNO = "ROBOT_VOZ"
+ORDEN_POR_DEFECTO = "gtts,local"
+
+
+class Backend:
+    nombre = ""
+    extension = "wav"
+
+    def sintetizar(self, texto, lang="es", slow=False):
+        """Devuelve el audio de ``texto`` como bytes (en formato ``extension``)."""
+        raise NotImplementedError
+
+    def comprobar(self):
+        """Lanza una excepción si el backend no está disponible (por defecto no comprueba nada)."""
+
+
+class BackendGTTS(Backend):
+    nombre = "gtts"
+    extension = "mp3"
+
+    def __init__(self, timeout=4.0, servidor=("translate.google.com", 443)):
+        self.timeout = timeout
+        self.servidor = servidor
+
+    def comprobar(self):
+        socket.create_connection(self.servidor, timeout=self.timeout).close()
+
+    def sintetizar(self, texto, lang="es", slow=False):
+        from gtts import gTTS
+        buf = io.BytesIO()
+        gTTS(text=str(texto), lang=lang, slow=slow, timeout=self.timeout).write_to_fp(buf)
+        return buf.getvalue()
+
+
+class BackendLocal(Backend):
+    """
+    Voz del sistema operativo mediante ``pyttsx3`` (no necesita red).
+
+    pyttsx3 no admite llamadas concurrentes y sus drivers (SAPI5 por COM,
+    NSSpeech) quedan ligados al hilo que los creó, así que el motor se crea
+    y se usa siempre en un mismo hilo propio; ``sintetizar`` le pasa el
+    trabajo y espera el resultado.
+    """
+
+    nombre = "local"
+    extension = "wav"
+
+    def __init__(self, velocidad=160):
+        self.velocidad = velocidad
+        self._motor = None
+        self._voces = {}
+        self._hilo = None
+        self._lock = threading.Lock()
+
+    def _elegir_voz(self, lang):
+        if lang not in self._voces:
+            self._voces[lang] = None
+            for v in self._motor.getProperty("voices"):
+                idiomas = " ".join(
+                    l.decode(errors="ignore") if isinstance(l, bytes) else str(l)
+                    for l in (getattr(v, "languages", None) or [])
+                )
+                texto = f"{v.id} {v.name} {idiomas}".lower()
+                if lang in idiomas.lower() or (lang == "es" and ("spanish" in texto or "español" in texto)):
+                    self._voces[lang] = v.id
+                    break
+        return self._voces[lang]
+
+    def sintetizar(self, texto, lang="es", slow=False):
+        with self._lock:
+            if self._hilo is None:
+                self._hilo = ThreadPoolExecutor(max_workers=1, thread_name_prefix="voz-local")
+        return self._hilo.submit(self._sintetizar, texto, lang, slow).result()
+
+    def _sintetizar(self, texto, lang, slow):
+        import pyttsx3
+        if self._motor is None:
+            self._motor = pyttsx3.init()
+        voz = self._elegir_voz(lang)
+        if voz is not None:
+            self._motor.setProperty("voice", voz)
+        self._motor.setProperty("rate", int(self.velocidad * (0.7 if slow else 1.0)))
+        fd, ruta = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
+        try:
+            self._motor.save_to_file(str(texto), ruta)
+            self._motor.runAndWait()
+            with open(ruta, "rb") as f:
+                datos = f.read()
+        finally:
+            try:
+                os.remove(ruta)
+            except OSError:
+                pass
+        if not datos:
+            raise RuntimeError("la voz local no generó audio")
+        return datos
+
+
+class BackendFalso(Backend):
+    """Tono determinista: mismo texto, mismos bytes. Sin red ni dependencias."""
+
+    nombre = "falso"
+    extension = "wav"
+
+    def __init__(self, frecuencia_muestreo=16000, segundos_por_letra=0.03, latencia=0.0):
+        self.frecuencia_muestreo = frecuencia_muestreo
+        self.segundos_por_letra = segundos_por_letra
+        self.latencia = latencia
+
+    def sintetizar(self, texto, lang="es", slow=False):
+        if self.latencia:
+            time.sleep(self.latencia)
+        texto = str(texto)
+        semilla = hashlib.sha256(f"{texto}|{lang}|{slow}".encode("utf-8")).digest()
+        tono = 220 + semilla[0] * 2
+        duracion = max(0.2, len(texto) * self.segundos_por_letra * (1.5 if slow else 1.0))
+        n = int(duracion * self.frecuencia_muestreo)
+        paso = 2 * math.pi * tono / self.frecuencia_muestreo
+        muestras = struct.pack(f"<{n}h", *(int(8000 * math.sin(paso * i)) for i in range(n)))
+        buf = io.BytesIO()
+        with wave.open(buf, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(self.frecuencia_muestreo)
+            w.writeframes(muestras)
+        return buf.getvalue()
+
+
+BACKENDS = {
+    "gtts": BackendGTTS,
+    "local": BackendLocal,
+    "falso": BackendFalso,
+}
+
+
+def crear_backends(orden=None):
+    """Instancia los backends de ``orden`` ("gtts,local", lista de nombres o de objetos)."""
+    if orden is None:
+        orden = os.environ.get(VARIABLE_ENTORNO) or ORDEN_POR_DEFECTO
+    if isinstance(orden, str):
+        orden = [n.strip() for n in orden.split(",") if n.strip()]
+    backends = []
+    for b in orden:
+        if isinstance(b, str):
+            if b not in BACKENDS:
+                raise ValueError(f"Backend de voz desconocido: {b!r} (opciones: {', '.join(BACKENDS)})")
+            b = BACKENDS[b]()
+        backends.append(b)
+    if not backends:
+        raise ValueError("Hace falta al menos un backend de voz.")
+    return backends
+
+
+class Sintesis:
+    """Cadena de backends con respaldo, caché compartida y métricas de latencia."""
+
+    def __init__(self, cache, backends=None, pausa=30.0, pausa_max=600.0):
+        self.cache = cache
+        self.backends = crear_backends(backends)
+        self.pausa = pausa
+        self.pausa_max = pausa_max
+        self._lock = threading.Lock()
+        self._pausado_hasta = {}
+        self._fallos_seguidos = {}  # backend caído -> fallos seguidos
+        self._comprobando = set()
+        self._metricas = {b.nombre: {"llamadas": 0, "fallos": 0, "latencia_total": 0.0,
+                                     "latencia_max": 0.0, "ultimo_error": None}
+                          for b in self.backends}
+
+    def en_cache(self, texto, lang="es", slow=False):
+        """
+        Ruta de la frase ya sintetizada por algún backend (en orden de
+        preferencia), o None. Cuenta un solo acierto o fallo por frase, no
+        uno por backend consultado.
+        """
+        ruta = None
+        for b in self.backends:
+            ruta = self.cache.buscar(texto, lang, slow, b.extension, voz=b.nombre, contar=False)
+            if ruta is not None:
+                break
+        self.cache.contar(ruta is not None)
+        return ruta
+
+    def obtener(self, texto, lang="es", slow=False):
+        """Devuelve la ruta del audio de ``texto``, sintetizándolo si hace falta."""
+        texto = str(texto)
+        ruta = self.en_cache(texto, lang, slow)
+        if ruta is not None:
+            return ruta
+        errores = []
+        for b in self.backends:
+            if not self._disponible(b):
+                continue
+            try:
+                datos = self._medir(b, texto, lang, slow)
+            except Exception as e:
+                errores.append(f"{b.nombre}: {e}")
+                with self._lock:
+                    self._anotar_fallo(b.nombre)
+                continue
+            return self.cache.guardar(texto, datos, lang, slow, b.extension, voz=b.nombre)
+        raise RuntimeError("Ningún backend de voz pudo sintetizar la frase ("
+                           + ("; ".join(errores) or "todos en pausa") + ")")
+
+    def _anotar_fallo(self, nombre):
+        # con self._lock tomado: pausa que se dobla con cada fallo seguido
+        fallos = self._fallos_seguidos.get(nombre, 0) + 1
+        self._fallos_seguidos[nombre] = fallos
+        self._pausado_hasta[nombre] = time.monotonic() + min(self.pausa * 2 ** (fallos - 1), self.pausa_max)
+
+    def _disponible(self, backend):
+        """
+        True si ``backend`` se puede usar al hablar. Si está caído y ya pasó
+        su pausa, lanza la comprobación en otro hilo y de momento devuelve False.
+        """
+        with self._lock:
+            if backend.nombre not in self._fallos_seguidos:
+                return True
+            if time.monotonic() < self._pausado_hasta[backend.nombre] or backend.nombre in self._comprobando:
+                return False
+            self._comprobando.add(backend.nombre)
+        threading.Thread(target=self._comprobar, args=(backend,),
+                         name=f"comprobar-voz-{backend.nombre}", daemon=True).start()
+        return False
+
+    def _comprobar(self, backend):
+        try:
+            backend.comprobar()
+            error = None
+        except Exception as e:
+            error = e
+        with self._lock:
+            self._comprobando.discard(backend.nombre)
+            if error is None:
+                self._fallos_seguidos.pop(backend.nombre, None)
+                self._pausado_hasta.pop(backend.nombre, None)
+            else:
+                self._anotar_fallo(backend.nombre)
+                self._metricas[backend.nombre]["ultimo_error"] = f"{type(error).__name__}: {error}"
+
+    def _medir(self, backend, texto, lang, slow):
+        inicio = time.perf_counter()
+        error = None
+        try:
+            return backend.sintetizar(texto, lang, slow)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            latencia = time.perf_counter() - inicio
+            with self._lock:
+                m = self._metricas[backend.nombre]
+                m["llamadas"] += 1
+                m["latencia_total"] += latencia
+                m["latencia_max"] = max(m["latencia_max"], latencia)
+                if error is not None:
+                    m["fallos"] += 1
+                    m["ultimo_error"] = f"{type(error).__name__}: {error}"
+
+    def estadisticas(self):
+        """Métricas por backend: llamadas, fallos, latencia media y máxima (s)."""
+        ahora = time.monotonic()
+        with self._lock:
+            return {
+                nombre: {
+                    "llamadas": m["llamadas"],
+                    "fallos": m["fallos"],
+                    "latencia_media": m["latencia_total"] / m["llamadas"] if m["llamadas"] else 0.0,
+                    "latencia_max": m["latencia_max"],
+                    "en_pausa": nombre in self._fallos_seguidos,
+                    "pausa_restante": max(0.0, self._pausado_hasta.get(nombre, ahora) - ahora),
+                    "ultimo_error": m["ultimo_error"],
+                }
+                for nombre, m in self._metricas.items()
+            }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compara la latencia de los backends de voz")
+    parser.add_argument("texto", nargs="?", default="Hola, vamos a jugar. Muéstrame el número siete.")
+    parser.add_argument("--backends", default=",".join(BACKENDS),
+                        help="lista separada por comas (por defecto: todos)")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args(argv)
+    for backend in crear_backends(args.backends):
+        tiempos = []
+        try:
+            for _ in range(args.repeticiones):
+                inicio = time.perf_counter()
+                datos = backend.sintetizar(args.texto)
+                tiempos.append(time.perf_counter() - inicio)
+        except Exception as e:
+            print(f"{backend.nombre:>6}: no disponible ({type(e).__name__}: {e})")
+            continue
+        print(f"{backend.nombre:>6}: {1000 * min(tiempos):7.1f} ms mín, "
+              f"{1000 * sum(tiempos) / len(tiempos):7.1f} ms media, {len(datos) / 1024:.0f} KiB")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
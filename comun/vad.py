@@ -0,0 +1,120 @@
+"""Detector de actividad de voz (VAD) con NumPy.
+
+``Recognizer.listen`` decide que la frase terminó tras ``pause_threshold``
+(0,8 s) de silencio medido con un umbral de energía fijo, así que cada
+respuesta arrastra casi un segundo muerto antes de empezar a reconocerse.
+Aquí la decisión se toma por ventanas de 16 ms:
+
+- ``DetectorVoz`` marca una ventana como voz si su energía supera el suelo
+  de ruido en ``margen_db`` y la mayor parte de su espectro cae en la banda
+  de la voz (250-4000 Hz), lo que descarta zumbidos graves y siseos. El
+  suelo de ruido se adapta solo con las ventanas que no son voz: baja
+  rápido y sube despacio.
+- ``Segmentador`` convierte esas decisiones en inicio y fin de frase: hace
+  falta ``min_voz`` de voz seguida para empezar y la frase se cierra tras
+  ``hangover`` de silencio. ``MODOS["corto"]`` usa un hangover corto para
+  respuestas de una palabra (dígitos, colores, figuras).
+"""
+import numpy as np
+
+# hangover (s), voz mínima para empezar (s) y duración máxima (s) de cada modo
+MODOS = {
+    "normal": {"hangover": 0.5, "min_voz": 0.1, "max_duracion": None},
+    "corto": {"hangover": 0.25, "min_voz": 0.08, "max_duracion": 2.5},
+}
+
+
+class DetectorVoz:
+    def __init__(self, frecuencia=16000, muestras_por_ventana=256, margen_db=10.0,
+                 proporcion_banda=0.5, banda=(250, 4000), bajada=0.3, subida=0.02, subida_en_voz=0.002):
+        self.frecuencia = frecuencia
+        self.muestras_por_ventana = muestras_por_ventana
+        self.duracion_ventana = muestras_por_ventana / frecuencia
+        self.margen_db = margen_db
+        self.proporcion_banda = proporcion_banda
+        self.bajada = bajada
+        self.subida = subida
+        self.subida_en_voz = subida_en_voz
+        frecuencias = np.fft.rfftfreq(muestras_por_ventana, 1.0 / frecuencia)
+        self._en_banda = (frecuencias >= banda[0]) & (frecuencias <= banda[1])
+        self._ventana = np.hanning(muestras_por_ventana).astype(np.float32)
+        self.suelo_db = None
+
+    def analizar(self, datos):
+        """Devuelve ``(energia_db, es_voz)`` por ventana de un bloque PCM de 16 bits."""
+        muestras = np.frombuffer(datos, dtype=np.int16).astype(np.float32)
+        n = len(muestras) // self.muestras_por_ventana
+        if n == 0:
+            return np.zeros(0, np.float32), np.zeros(0, bool)
+        ventanas = muestras[:n * self.muestras_por_ventana].reshape(n, self.muestras_por_ventana)
+        energia_db = 10.0 * np.log10(np.mean(ventanas * ventanas, axis=1) + 1e-9)
+        espectro = np.abs(np.fft.rfft(ventanas * self._ventana, axis=1)) ** 2
+        banda = espectro[:, self._en_banda].sum(axis=1) / (espectro.sum(axis=1) + 1e-9)
+        if self.suelo_db is None:
+            self.suelo_db = float(energia_db.min())
+        es_voz = (energia_db > self.suelo_db + self.margen_db) & (banda > self.proporcion_banda)
+        return energia_db, es_voz
+
+    def adaptar(self, energia_db, es_voz):
+        """Actualiza el suelo de ruido con un bloque ya analizado."""
+        suelo = self.suelo_db
+        for db, voz in zip(energia_db.tolist(), es_voz.tolist()):
+            if voz:
+                # subir muy despacio: si el suelo quedó bajo, un ruido constante
+                # dejaría de parecer voz al cabo de unos segundos
+                suelo += self.subida_en_voz * (db - suelo)
+            elif db < suelo:
+                suelo += self.bajada * (db - suelo)
+            else:
+                suelo += self.subida * (db - suelo)
+        self.suelo_db = suelo
+
+    def calibrar(self, energia_db):
+        """Fija el suelo de ruido a partir de ventanas de silencio."""
+        if len(energia_db):
+            self.suelo_db = float(np.median(energia_db))
+
+
+class Segmentador:
+    """Máquina de estados inicio/fin de frase sobre las decisiones del VAD."""
+
+    def __init__(self, duracion_ventana, hangover=0.5, min_voz=0.1, max_duracion=None):
+        self.duracion_ventana = duracion_ventana
+        self.hangover = hangover
+        self.min_voz = min_voz
+        self.max_duracion = max_duracion
+        self.reiniciar()
+
+    @classmethod
+    def modo(cls, nombre, duracion_ventana):
+        return cls(duracion_ventana, **MODOS[nombre])
+
+    def reiniciar(self):
+        self.hablando = False
+        self.seguidas = 0.0
+        self.voz = 0.0
+        self.silencio = 0.0
+        self.duracion = 0.0
+
+    def agregar(self, es_voz):
+        """Procesa un bloque de decisiones; devuelve "inicio", "fin" o None."""
+        dv = self.duracion_ventana
+        evento = None
+        for voz in es_voz:
+            if not self.hablando:
+                self.seguidas = self.seguidas + dv if voz else 0.0
+                if self.seguidas >= self.min_voz:
+                    self.hablando = True
+                    self.voz = self.duracion = self.seguidas
+                    self.silencio = 0.0
+                    evento = "inicio"
+                continue
+            self.duracion += dv
+            if voz:
+                self.voz += dv
+                self.silencio = 0.0
+            else:
+                self.silencio += dv
+            if self.silencio >= self.hangover or (self.max_duracion and self.duracion >= self.max_duracion):
+                return "fin"
+        return evento
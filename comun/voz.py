@@ -0,0 +1,214 @@
+"""Voz del robot compartida por todos los juegos.
+
+Sustituye a las copias de ``hablar()`` que había en cada carpeta: el audio
+se obtiene de la caché de frases (``comun/cache_voz.py``) y sólo se
+sintetiza cuando la frase no está cacheada, con el primer backend que
+responda (``comun/sintesis.py``: gTTS, voz local sin red o falso). La
+reproducción usa el motor de audio compartido (``comun/audio.py``), que
+mantiene decodificadas en memoria las frases recientes.
+
+Las frases pasan por una cola con prioridad atendida por un hilo (recurso
+"voz"), así que los bucles de cámara pueden seguir procesando frames
+mientras el robot habla:
+
+- ``decir(texto)`` encola la frase y devuelve un ``Pedido`` (un ``Future``;
+  en código asyncio se puede esperar con ``asyncio.wrap_future``).
+- ``decir(texto, interrumpir=True)`` corta la frase que esté sonando, p. ej.
+  cuando el niño responde antes de que el robot termine de preguntar.
+- ``hablar(texto)`` es ``decir(texto)`` y esperar a que termine.
+- ``callar()`` corta la frase actual y descarta las pendientes.
+
+Las frases creadas con una ``Plantilla`` (``comun/plantillas.py``) se
+componen con trozos ya sintetizados; ``preparar(plantilla, ...)`` los
+sintetiza en segundo plano al empezar el juego.
+"""
+import itertools
+import queue
+import threading
+from concurrent.futures import Future
+
+from comun import recursos
+from comun.audio import esperar_futuro
+from comun.cache_voz import CacheVoz
+from comun.plantillas import Frase
+from comun.sintesis import Sintesis
+
+cache = CacheVoz()
+_sintesis = None
+_sintesis_lock = threading.Lock()
+
+PRIORIDAD_ALTA = 0
+PRIORIDAD_NORMAL = 5
+PRIORIDAD_BAJA = 9
+
+
+def sintesis():
+    """Cadena de backends en uso (se crea al primer uso según ``ROBOT_VOZ``)."""
+    global _sintesis
+    with _sintesis_lock:
+        if _sintesis is None:
+            _sintesis = Sintesis(cache)
+        return _sintesis
+
+
+def usar_backends(backends):
+    """Cambia el orden de backends, p. ej. ``usar_backends("falso")`` en pruebas."""
+    global _sintesis
+    with _sintesis_lock:
+        _sintesis = Sintesis(cache, backends)
+    return _sintesis
+
+
+def sintetizar(texto, lang="es", slow=False):
+    """Devuelve la ruta del audio de ``texto`` (de la caché si ya existe)."""
+    return sintesis().obtener(texto, lang=lang, slow=slow)
+
+
+class Pedido(Future):
+    """Frase encolada. ``result()`` es True si se dijo entera y False si se cortó o falló."""
+
+    def __init__(self, texto, prioridad, lang, slow):
+        super().__init__()
+        # una Frase (str con su plantilla) se conserva tal cual para componerla
+        self.texto = texto if isinstance(texto, str) else str(texto)
+        self.prioridad = prioridad
+        self.lang = lang
+        self.slow = slow
+        self._reproduccion = None
+        self.interrumpido = False
+
+    def interrumpir(self):
+        """Cancela la frase si aún no empezó, o la corta si está sonando."""
+        if self.cancel():
+            return
+        self.interrumpido = True
+        rep = self._reproduccion
+        if rep is not None:
+            rep.detener()
+
+    def esperar(self, timeout=None):
+        return esperar_futuro(self, timeout)
+
+
+class ColaVoz:
+    """Hilo que sintetiza y reproduce las frases de una en una, por prioridad."""
+
+    def __init__(self):
+        self._cola = queue.PriorityQueue()
+        self._orden = itertools.count()
+        self._lock = threading.Lock()
+        self._actual = None
+        self._activa = True
+        self._hilo = threading.Thread(target=self._bucle, name="cola-voz", daemon=True)
+        self._hilo.start()
+
+    def decir(self, texto, prioridad=PRIORIDAD_NORMAL, interrumpir=False, lang="es", slow=False):
+        pedido = Pedido(texto, prioridad, lang, slow)
+        if interrumpir:
+            self.interrumpir()
+        self._cola.put((prioridad, next(self._orden), pedido))
+        return pedido
+
+    def interrumpir(self, vaciar=False):
+        """Corta la frase actual y, si ``vaciar``, cancela también las pendientes."""
+        if vaciar:
+            while True:
+                try:
+                    _, _, pedido = self._cola.get_nowait()
+                except queue.Empty:
+                    break
+                if pedido is not None:
+                    pedido.cancel()
+        with self._lock:
+            actual = self._actual
+        if actual is not None:
+            actual.interrumpir()
+
+    def hablando(self):
+        with self._lock:
+            return self._actual is not None or not self._cola.empty()
+
+    def _bucle(self):
+        while self._activa:
+            _, _, pedido = self._cola.get()
+            if pedido is None or not pedido.set_running_or_notify_cancel():
+                continue
+            with self._lock:
+                self._actual = pedido
+            try:
+                pedido.set_result(self._decir(pedido))
+            except BaseException as e:
+                pedido.set_exception(e)
+            finally:
+                with self._lock:
+                    self._actual = None
+
+    def _decir(self, pedido):
+        print(f"Robot dice: {pedido.texto}")
+        try:
+            audio = self._componer(pedido)
+            if audio is None:
+                audio = sintetizar(pedido.texto, pedido.lang, pedido.slow)
+            if pedido.interrumpido:
+                return False  # se cortó mientras se sintetizaba
+            rep = recursos.obtener("audio").reproducir(audio)
+            pedido._reproduccion = rep
+            if pedido.interrumpido:
+                rep.detener()
+            return rep.result()
+        except Exception as e:
+            print(f"Error al reproducir audio: {e}")
+            print(f"Robot intentó decir: {pedido.texto}")
+            return False
+
+    def _componer(self, pedido):
+        if not isinstance(pedido.texto, Frase):
+            return None
+        try:
+            return recursos.obtener("plantillas").componer(pedido.texto, pedido.lang, pedido.slow)
+        except Exception as e:
+            print(f"No se pudo componer la frase ({e}); se sintetiza entera.")
+            return None
+
+    def cerrar(self):
+        self.interrumpir(vaciar=True)
+        self._activa = False
+        # despertar al hilo; la tupla va detrás de cualquier prioridad real
+        self._cola.put((float("inf"), next(self._orden), None))
+        self._hilo.join(timeout=2.0)
+
+
+def decir(texto, prioridad=PRIORIDAD_NORMAL, interrumpir=False, lang="es", slow=False):
+    """Encola ``texto`` sin bloquear y devuelve su ``Pedido``."""
+    return recursos.obtener("voz").decir(texto, prioridad, interrumpir, lang, slow)
+
+
+def callar():
+    """Corta lo que esté diciendo el robot y descarta lo pendiente."""
+    recursos.obtener("voz").interrumpir(vaciar=True)
+
+
+def hablar(texto, lang="es", slow=False):
+    """Dice ``texto`` en voz alta y espera a que termine (respetando el orden de la cola)."""
+    pedido = decir(texto, lang=lang, slow=slow)
+    try:
+        return pedido.esperar()
+    except KeyboardInterrupt:
+        callar()
+        raise
+
+
+def preparar(*plantillas, lang="es", slow=False):
+    """Sintetiza en segundo plano los trozos de ``plantillas`` y devuelve el hilo."""
+    def _preparar():
+        try:
+            errores = recursos.obtener("plantillas").precalentar(plantillas, lang, slow)
+        except Exception as e:
+            print(f"No se pudieron preparar las frases: {e}")
+            return
+        if errores:
+            print(f"No se pudieron preparar {len(errores)} trozos de frases; se sintetizarán al usarlos.")
+
+    hilo = threading.Thread(target=_preparar, name="preparar-frases", daemon=True)
+    hilo.start()
+    return hilo
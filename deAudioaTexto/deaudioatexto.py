@@ -1,39 +1,189 @@
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import speech_recognition as sr
 
-def escuchar_y_escribir():
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+from comun import recursos
+
+class EstadisticasDictado:
+    """
+    Latencias por etapa (segundos) y profundidad de la cola del dictado:
+    - frase: duración del audio de cada frase;
+    - espera: desde que la frase se cierra hasta que un trabajador la toma;
+    - reconocimiento: lo que tarda Google con la frase;
+    - resultado: desde el fin de la voz hasta que el texto se muestra.
+    """
+    ETAPAS = ("frase", "espera", "reconocimiento", "resultado")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tiempos = {etapa: [] for etapa in self.ETAPAS}
+        self.en_cola = 0
+        self.max_en_cola = 0
+        self.bloqueos = 0  # veces que la captura esperó por tener la cola llena
+
+    def anotar(self, etapa, segundos):
+        with self._lock:
+            self._tiempos[etapa].append(segundos)
+
+    def encolada(self, bloqueo):
+        with self._lock:
+            self.en_cola += 1
+            self.max_en_cola = max(self.max_en_cola, self.en_cola)
+            self.bloqueos += bloqueo
+
+    def mostrada(self):
+        with self._lock:
+            self.en_cola -= 1
+
+    def resumen(self):
+        with self._lock:
+            resumen = {
+                etapa: {
+                    "media": sum(t) / len(t) if t else 0.0,
+                    "max": max(t) if t else 0.0,
+                }
+                for etapa, t in self._tiempos.items()
+            }
+            resumen["frases"] = len(self._tiempos["frase"])
+            resumen["en_cola"] = self.en_cola
+            resumen["max_en_cola"] = self.max_en_cola
+            resumen["bloqueos"] = self.bloqueos
+            return resumen
+
+def _reconocer(mic, audio, escucha, cerrada, estadisticas):
+    """Trabajo de un hilo del grupo: reconoce una frase y devuelve (texto, error)."""
+    empieza = time.monotonic()
+    estadisticas.anotar("espera", empieza - cerrada)
+    try:
+        return mic.reconocer(audio, escucha=escucha), None
+    except Exception as e:
+        return None, e
+    finally:
+        estadisticas.anotar("reconocimiento", time.monotonic() - empieza)
+
+def _mostrar_en_orden(pendientes, estadisticas):
+    """Muestra los textos en el orden en que se dijeron las frases."""
+    while True:
+        elemento = pendientes.get()
+        if elemento is None:
+            return
+        futuro, escucha = elemento
+        texto, error = futuro.result()
+        estadisticas.mostrada()
+        if escucha.get("latencia_resultado") is not None:
+            estadisticas.anotar("resultado", escucha["latencia_resultado"])
+        if error is None:
+            print(f"Tú dijiste: '{texto}'")
+        elif isinstance(error, sr.UnknownValueError):
+            print("No pude entender el audio. ¿Podrías repetirlo?")
+        elif isinstance(error, sr.RequestError):
+            print(f"No se pudo solicitar los resultados del servicio de reconocimiento de voz; {error}")
+        else:
+            print(f"Ocurrió un error inesperado: {error}")
+
+def dictado_en_paralelo(mic, trabajadores=3, max_pendientes=4):
+    """
+    Dictado continuo: este hilo sigue cortando frases mientras un grupo de
+    ``trabajadores`` las reconoce a la vez, y otro hilo muestra los textos
+    en orden. Si hay más de ``max_pendientes`` frases sin mostrar, la
+    captura espera (el micrófono sigue guardando audio en su búfer mientras tanto).
+    Devuelve las estadísticas al terminar con Ctrl+C.
+    """
+    estadisticas = EstadisticasDictado()
+    pendientes = queue.Queue(maxsize=max_pendientes)
+    mostrador = threading.Thread(target=_mostrar_en_orden, args=(pendientes, estadisticas),
+                                 name="dictado-resultados", daemon=True)
+    mostrador.start()
+    grupo = ThreadPoolExecutor(max_workers=trabajadores, thread_name_prefix="dictado-reconocer")
+    try:
+        while True:
+            try:
+                audio = mic.escuchar(timeout=30, limite=20)
+            except sr.WaitTimeoutError:
+                continue # nadie habló: seguir escuchando
+            escucha = mic.ultima_escucha
+            cerrada = time.monotonic()
+            estadisticas.anotar("frase", escucha["duracion"])
+            futuro = grupo.submit(_reconocer, mic, audio, escucha, cerrada, estadisticas)
+            bloqueo = pendientes.full()
+            while True:
+                try:
+                    # en tramos cortos para que Ctrl+C siga funcionando
+                    pendientes.put((futuro, escucha), timeout=0.2)
+                    break
+                except queue.Full:
+                    continue
+            estadisticas.encolada(bloqueo)
+    except KeyboardInterrupt:
+        print("\nPrograma terminado por el usuario. Terminando las frases pendientes...")
+    finally:
+        pendientes.put(None)
+        mostrador.join()
+        grupo.shutdown(wait=True)
+    return estadisticas
+
+def _mostrar_estadisticas(estadisticas):
+    resumen = estadisticas.resumen()
+    print(f"{resumen['frases']} frases; cola máxima {resumen['max_en_cola']}, "
+          f"captura detenida {resumen['bloqueos']} veces por cola llena")
+    for etapa in EstadisticasDictado.ETAPAS:
+        print(f"  {etapa:15s} media {resumen[etapa]['media']:.2f} s, máx {resumen[etapa]['max']:.2f} s")
+
+def escuchar_y_escribir(en_paralelo=True):
     """
     Escucha el audio del micrófono y lo transcribe a texto,
     luego lo imprime en la consola.
+    Con ``en_paralelo`` el micrófono no deja de escuchar mientras se
+    reconocen las frases anteriores.
     """
-    r = sr.Recognizer() # Crea un objeto Recognizer
-
     print("¡Hola! Estoy escuchando... Di algo.")
     print("Para salir, puedes presionar Ctrl+C en la consola.")
 
-    with sr.Microphone() as source:
-        r.adjust_for_ambient_noise(source) # Ajusta dinámicamente el umbral de energía para la sensibilidad del ruido ambiental
-        print("Calibrando ruido ambiental. Por favor, mantente en silencio por un momento...")
-        r.pause_threshold = 0.8 # Espera 0.8 segundos de silencio antes de considerar que la frase ha terminado
-        print("Listo para escuchar. ¡Di algo!")
+    # Micrófono compartido: se calibra con el ruido ambiental una sola vez y el
+    # detector de voz cierra cada frase en cuanto se deja de hablar
+    print("Calibrando ruido ambiental. Por favor, mantente en silencio por un momento...")
+    try:
+        mic = recursos.obtener("microfono")
+    except Exception as e:
+        print(f"No se pudo abrir el micrófono: {e}")
+        return
+    print("Listo para escuchar. ¡Di algo!")
 
-        while True:
-            try:
-                audio = r.listen(source) # Escucha el audio del micrófono
-
-                # Intenta reconocer el audio usando el servicio de Google
-                texto = r.recognize_google(audio, language="es-ES")
-                print(f"Tú dijiste: '{texto}'")
-
-            except sr.UnknownValueError:
-                print("No pude entender el audio. ¿Podrías repetirlo?")
-            except sr.RequestError as e:
-                print(f"No se pudo solicitar los resultados del servicio de reconocimiento de voz; {e}")
-            except KeyboardInterrupt:
-                print("\nPrograma terminado por el usuario.")
-                break
-            except Exception as e:
-                print(f"Ocurrió un error inesperado: {e}")
+    if en_paralelo:
+        _mostrar_estadisticas(dictado_en_paralelo(mic))
+        return
+
+    while True:
+        try:
+            audio = mic.escuchar(timeout=30, limite=20) # Escucha el audio del micrófono
+
+            # Intenta reconocer el audio usando el servicio de Google
+            texto = mic.reconocer(audio)
+            print(f"Tú dijiste: '{texto}'")
+            print(f"(texto listo {mic.ultima_escucha['latencia_resultado']:.2f} s después de que dejaras de hablar)")
+
+        except sr.WaitTimeoutError:
+            continue # nadie habló: seguir escuchando
+        except sr.UnknownValueError:
+            print("No pude entender el audio. ¿Podrías repetirlo?")
+        except sr.RequestError as e:
+            print(f"No se pudo solicitar los resultados del servicio de reconocimiento de voz; {e}")
+        except KeyboardInterrupt:
+            print("\nPrograma terminado por el usuario.")
+            break
+        except Exception as e:
+            print(f"Ocurrió un error inesperado: {e}")
 
 # Llama a la función para iniciar el programa
 if __name__ == "__main__":
-    escuchar_y_escribir()
+    try:
+        escuchar_y_escribir(en_paralelo="--secuencial" not in sys.argv[1:])
+    finally:
+        recursos.cerrar_todo()
@@ -1,62 +1,156 @@
-from gtts import gTTS
 import os
+import queue
+import re
+import sys
+import threading
+import time
 import pygame
 
-def texto_a_audio():
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+from comun import recursos
+from comun import voz
+
+def partir_en_trozos(texto, max_caracteres=150, primero=60):
+    """
+    Divide el texto en frases y, si son largas, en partes separadas por comas.
+    El primer trozo se deja corto para que el robot empiece a hablar cuanto antes.
+    """
+    trozos = []
+    for frase in re.split(r"(?<=[.!?;:])\s+|\n+", texto.strip()):
+        frase = frase.strip()
+        while frase:
+            limite = primero if not trozos else max_caracteres
+            if len(frase) <= limite:
+                trozos.append(frase)
+                break
+            # cortar en la última coma antes del límite, o si no en el último espacio
+            corte = frase.rfind(",", 0, limite) + 1
+            if corte <= 0:
+                corte = frase.rfind(" ", 0, limite)
+            if corte <= 0:
+                corte = limite
+            trozos.append(frase[:corte].strip())
+            frase = frase[corte:].strip()
+    return trozos
+
+def _sintetizar_por_delante(trozos, adelanto=2):
+    """
+    Genera las rutas de audio de cada trozo en orden. Un hilo va sintetizando
+    los siguientes (hasta ``adelanto`` por delante) mientras suena el actual.
+    """
+    cola = queue.Queue(maxsize=adelanto)
+    parar = threading.Event()
+
+    def poner(resultado):
+        # si el consumidor se fue (error o Ctrl+C) no quedarse esperando
+        while not parar.is_set():
+            try:
+                cola.put(resultado, timeout=0.2)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def productor():
+        for trozo in trozos:
+            try:
+                resultado = voz.sintetizar(trozo)
+            except Exception as e:
+                resultado = e
+            if not poner(resultado) or isinstance(resultado, Exception):
+                return
+        poner(None)
+
+    threading.Thread(target=productor, name="sintesis-trozos", daemon=True).start()
+    try:
+        while True:
+            try:
+                # en tramos cortos para que Ctrl+C siga funcionando
+                resultado = cola.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            if resultado is None:
+                return
+            if isinstance(resultado, Exception):
+                raise resultado
+            yield resultado
+    finally:
+        parar.set()
+
+def decir_por_trozos(texto, motor):
+    """
+    Dice un texto largo sintetizando el trozo siguiente mientras suena el actual.
+    Devuelve un diccionario con las métricas de la reproducción.
+    """
+    trozos = partir_en_trozos(texto)
+    inicio = time.perf_counter()
+    primer_audio = []
+    sonidos, huecos = motor.encadenar(
+        _sintetizar_por_delante(trozos),
+        al_empezar=lambda: primer_audio.append(time.perf_counter() - inicio))
+    total = time.perf_counter() - inicio
+    return {
+        "trozos": sonidos,
+        "primer_audio": primer_audio[0] if primer_audio else None,
+        "total": total,
+        "caracteres_por_segundo": len(texto) / total if total else 0.0,
+        "huecos": huecos,
+    }
+
+def texto_a_audio(por_trozos=True):
     """
     Función que pide al usuario que escriba algo,
     convierte ese texto a audio y lo reproduce usando pygame.
+    Con ``por_trozos`` los textos largos empiezan a sonar tras sintetizar
+    sólo la primera frase.
     """
     print("¡Hola! Escribe algo y yo lo diré en voz alta. Escribe 'salir' para terminar.")
 
     try:
-        pygame.mixer.init()
+        motor = recursos.adquirir("audio")
     except pygame.error as e:
         print(f"Error al inicializar pygame mixer: {e}")
         print("Asegúrate de tener un dispositivo de audio funcionando.")
         return
 
-    # Ruta y nombre del archivo de audio temporal
-    nombre_archivo_audio = "respuesta_robot.mp3"
-
-    while True:
-        texto_usuario = input("Tú (escribe para que el robot hable): ")
-
-        if texto_usuario.lower() == 'salir':
-            print("¡Adiós! Gracias por interactuar.")
-            break
-
-        if not texto_usuario.strip():
-            print("Por favor, escribe algo para que el robot lo diga.")
-            continue
-
-        try:
-            # Genera el audio y lo guarda
-            tts = gTTS(text=texto_usuario, lang='es', slow=False)
-            tts.save(nombre_archivo_audio)
-
-            print(f"Robot (diciendo): '{texto_usuario}'")
+    try:
+        while True:
+            texto_usuario = input("Tú (escribe para que el robot hable): ")
 
-            # Carga y reproduce el archivo de audio con pygame
-            pygame.mixer.music.load(nombre_archivo_audio)
-            pygame.mixer.music.play()
+            if texto_usuario.lower() == 'salir':
+                print("¡Adiós! Gracias por interactuar.")
+                break
 
-            # Espera a que el audio termine de reproducirse
-            while pygame.mixer.music.get_busy():
-                pygame.time.Clock().tick(10)
+            if not texto_usuario.strip():
+                print("Por favor, escribe algo para que el robot lo diga.")
+                continue
 
-            # !!! SOLUCIÓN AL WinError 32 !!!
-            # Descarga la música del mezclador para liberar el archivo
-            pygame.mixer.music.unload()
+            try:
+                print(f"Robot (diciendo): '{texto_usuario}'")
 
-            # Ahora podemos eliminar el archivo de forma segura
-            os.remove(nombre_archivo_audio)
+                if por_trozos:
+                    m = decir_por_trozos(texto_usuario, motor)
+                    if m["primer_audio"] is not None:
+                        print(f"({m['trozos']} trozos, primer audio en {m['primer_audio']:.2f} s, "
+                              f"{m['caracteres_por_segundo']:.0f} caracteres/s, {m['huecos']} huecos)")
+                else:
+                    # Genera el audio (o lo toma de la caché de frases)
+                    nombre_archivo_audio = voz.sintetizar(texto_usuario)
 
-        except Exception as e:
-            print(f"Ocurrió un error al intentar convertir a voz o reproducir: {e}")
-            print("Asegúrate de tener conexión a internet.")
+                    # Reproduce el audio desde memoria con el motor compartido
+                    # y espera a que termine
+                    motor.reproducir(nombre_archivo_audio).esperar()
 
-    pygame.mixer.quit()
+            except Exception as e:
+                print(f"Ocurrió un error al intentar convertir a voz o reproducir: {e}")
+                print("Asegúrate de tener conexión a internet o una voz local instalada (pyttsx3).")
+    finally:
+        recursos.soltar("audio")
 
 if __name__ == "__main__":
-    texto_a_audio()
+    try:
+        texto_a_audio(por_trozos="--sin-trozos" not in sys.argv[1:])
+    finally:
+        recursos.cerrar_todo()
@@ -1,129 +1,147 @@
 import cv2
-import mediapipe as mp
 import numpy as np
 import time
 import random
 import os
-from gtts import gTTS
-import pygame
+import sys
 
-cv2.namedWindow("Seguimiento1", cv2.WINDOW_NORMAL)
-cv2.resizeWindow("Seguimiento1", 1280, 720)
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+from comun import recursos
+from comun.voz import hablar, decir, callar, preparar
+from comun.plantillas import Plantilla
+from comun.decision import Decisor
+from comun.planificador import Planificador
 
-mp_mano = mp.solutions.hands
-mano = mp_mano.Hands()
-mp_drawing = mp.solutions.drawing_utils #Configuraciones de para el funcionamiento de mp_hands
+RONDA = Plantilla("Ronda {n}. Levanta la mano {lado}. Tienes {segundos} segundos.",
+                  n=range(1, 11), lado=("derecha", "izquierda"), segundos=(10, 15, 20))
 
-cap = cv2.VideoCapture(0) #apertura de la camara 
-
-def hablar(texto):
-    """Reproduce texto en voz (gTTS + pygame)."""
-    print("Robot:", texto)
-    try:
-        fname = "tts_direccion.mp3"
-        tts = gTTS(text=str(texto), lang="es", slow=False)
-        tts.save(fname)
-        pygame.mixer.init()
-        pygame.mixer.music.load(fname)
-        pygame.mixer.music.play()
-        while pygame.mixer.music.get_busy():
-            pygame.time.Clock().tick(10)
-        pygame.mixer.quit()
-        try:
-            os.remove(fname)
-        except Exception:
-            pass
-    except Exception as e:
-        print("Audio error:", e)
+# MediaPipe y el detector de manos (recurso "manos") se cargan al empezar el juego
 
 # Juego interactivo: 4 rondas pidiendo mano izquierda/derecha
 def jugar_direcciones(rounds=4, timeout=15, hold_time=1.0):
+    # ventana y cámara se crean al empezar el juego, no al importar el módulo
+    try:
+        cap = recursos.adquirir("camara") #apertura de la camara
+    except RuntimeError:
+        hablar("No pude abrir la cámara.")
+        return
+    try:
+        with recursos.usar("manos") as mano:
+            cv2.namedWindow("Seguimiento1", cv2.WINDOW_NORMAL)
+            cv2.resizeWindow("Seguimiento1", 1280, 720)
+            _jugar(cap, mano, rounds, timeout, hold_time)
+    finally:
+        recursos.soltar("camara")
+        cv2.destroyAllWindows()
+
+def _jugar(cap, mano, rounds, timeout, hold_time):
+    import mediapipe as mp
+    mp_mano = mp.solutions.hands
+    mp_drawing = mp.solutions.drawing_utils #Configuraciones de para el funcionamiento de mp_hands
+
     opciones = ["Derecha", "Izquierda"]
+    preparar(RONDA)
     hablar("Vamos a jugar. Te pediré que levantes la mano derecha o izquierda. Son cuatro rondas.")
     time.sleep(0.6)
 
+    plan = Planificador(hz_deteccion=10, hz_candidato=20)
+    # la dirección tiene que dominar los votos durante hold_time; un frame perdido no la reinicia
+    decisor = Decisor.perfil(espera=hold_time)
     for r in range(rounds):
         objetivo = random.choice(opciones)
-        hablar(f"Ronda {r+1}. Levanta la mano {objetivo.lower()}. Tienes {timeout} segundos.")
-        start = time.time()
-        hold_start = None
+        aviso = decir(RONDA(n=r+1, lado=objetivo.lower(), segundos=timeout))
+        # el tiempo de la ronda corre desde que el robot termina de pedirlo, pero los
+        # frames se procesan desde ya: si el niño se adelanta se le corta la pregunta
+        start = None
         success = False
+        decisor.reiniciar()
 
         # loop de detección por ronda (usa la misma lógica presente más abajo)
-        while time.time() - start < timeout and cap.isOpened():
+        manos, direction, estado = [], None, None
+        while (start is None or time.time() - start < timeout) and cap.isOpened():
+            if start is None and aviso.done():
+                start = time.time()
             ret, frame = cap.read() #frame normal
             if not ret:
                 continue
 
+            # la imagen se redibuja a hz_pantalla; MediaPipe corre sólo cuando toca
+            if plan.debe_detectar():
+                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                with plan.medir():
+                    resultado = mano.process(frame_rgb)
+                manos = resultado.multi_hand_landmarks or []
+                direction = None
+                for landmarks in manos:
+                    # Determinar la dirección de la línea (misma lógica original)
+                    if landmarks.landmark[8].x > landmarks.landmark[0].x:
+                        direction = "Derecha"
+                    else:
+                        direction = "Izquierda"
+
+                # lógica de hold: aceptar cuando la dirección pedida domina los últimos frames
+                estado = decisor.actualizar(direction)
+                if estado.aceptada == objetivo:
+                    success = True
+                    decir("¡Bien hecho! Correcto.", interrumpir=True)
+                    break
+                plan.candidato(estado.candidata is not None)
+
             frame2 = frame.copy() #frame2 pintando landmakers 4, 0 y 12
             frame3 = frame.copy() #frame3 pintando la linea entre el 8 y 0 
             frame4 = frame.copy() #frame4 pintando todos los landmakers de la mano
 
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            resultado = mano.process(frame_rgb)
-
-            direction = None
-            if resultado.multi_hand_landmarks:
-                for landmarks in resultado.multi_hand_landmarks:
-                    mp_drawing.draw_landmarks(frame4, landmarks, mp_mano.HAND_CONNECTIONS)
-                    hand_landmarks = landmarks.landmark
-                    for landmark_id in [4, 0, 12]:
-                        landmark = hand_landmarks[landmark_id]
-                        height, width, _ = frame.shape
-                        cx, cy = int(landmark.x * width), int(landmark.y * height)
-                        cv2.circle(frame2, (cx, cy), 5, (0, 255, 0), -1)
-
-                    landmark_0 = hand_landmarks[0]
-                    landmark_8 = hand_landmarks[8]
+            # las manos de la última detección, sobre el frame actual
+            for landmarks in manos:
+                mp_drawing.draw_landmarks(frame4, landmarks, mp_mano.HAND_CONNECTIONS)
+                hand_landmarks = landmarks.landmark
+                for landmark_id in [4, 0, 12]:
+                    landmark = hand_landmarks[landmark_id]
                     height, width, _ = frame.shape
-                    cx0, cy0 = int(landmark_0.x * width), int(landmark_0.y * height)
-                    cx8, cy8 = int(landmark_8.x * width), int(landmark_8.y * height)
-                    cv2.line(frame3, (cx0, cy0), (cx8, cy8), (0, 255, 0), 2)
+                    cx, cy = int(landmark.x * width), int(landmark.y * height)
+                    cv2.circle(frame2, (cx, cy), 5, (0, 255, 0), -1)
 
-                    # Determinar la dirección de la línea (misma lógica original)
-                    if landmark_8.x > landmark_0.x:
-                        direction = "Derecha"
-                    else:
-                        direction = "Izquierda"
+                landmark_0 = hand_landmarks[0]
+                landmark_8 = hand_landmarks[8]
+                height, width, _ = frame.shape
+                cx0, cy0 = int(landmark_0.x * width), int(landmark_0.y * height)
+                cx8, cy8 = int(landmark_8.x * width), int(landmark_8.y * height)
+                cv2.line(frame3, (cx0, cy0), (cx8, cy8), (0, 255, 0), 2)
 
-                    cv2.putText(frame3, f'Direccion: {direction}', (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+                cv2.putText(frame3, f'Direccion: {direction}', (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
 
             ventana1 = np.hstack((frame, frame4))
             ventana2 = np.hstack((frame2, frame3))
             ventana_final = np.vstack((ventana1, ventana2))
 
-            # lógica de hold: aceptar cuando la dirección pedida se mantiene continuamente
-            if direction == objetivo:
-                if hold_start is None:
-                    hold_start = time.time()
-                elapsed = time.time() - hold_start
-                cv2.putText(ventana_final, f"Holding: {elapsed:.1f}/{hold_time}s", (10, 100), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,200,0), 2)
-                if elapsed >= hold_time:
-                    success = True
-                    hablar("¡Bien hecho! Correcto.")
-                    break
-            else:
-                hold_start = None
+            if estado is not None and estado.candidata == objetivo:
+                cv2.putText(ventana_final, f"Holding: {estado.progreso * hold_time:.1f}/{hold_time}s", (10, 100), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,200,0), 2)
 
-            secs_left = int(timeout - (time.time() - start))
+            secs_left = timeout if start is None else int(timeout - (time.time() - start))
             cv2.putText(ventana_final, f"Tiempo: {secs_left}s  Objetivo: {objetivo}", (10, 40), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255,255,0), 2)
             cv2.imshow('Seguimiento1', ventana_final)
-            if cv2.waitKey(1) & 0xFF == ord('q'):
+            if plan.esperar_tecla() == ord('q'):
+                callar()
                 hablar("Saliendo del juego.")
                 return
 
         if not success:
+            # la dirección que más votos tuvo en la ronda, no la del último frame
+            direction, _ = decisor.lider()
             if direction is None:
-                hablar("No detecté tu mano. Intenta acercarte o mejorar la iluminación.")
+                decir("No detecté tu mano. Intenta acercarte o mejorar la iluminación.")
             else:
-                hablar(f"Casi. Yo vi la mano en {direction.lower()}. ¡Sigue intentándolo!")
+                decir(f"Casi. Yo vi la mano en {direction.lower()}. ¡Sigue intentándolo!")
         time.sleep(0.8)
 
+    print(decisor.resumen())
     hablar("Hemos terminado las rondas. ¡Buen trabajo!")
 
 if __name__ == '__main__':
     try:
         jugar_direcciones(rounds=4, timeout=15, hold_time=1.0)
     finally:
-        cap.release()
-        cv2.destroyAllWindows()
\ No newline at end of file
+        cv2.destroyAllWindows()
+        recursos.cerrar_todo()
@@ -1,40 +1,31 @@
 import speech_recognition as sr
-from gtts import gTTS
 import os
-import pygame
+import sys
 import cv2
 import numpy as np
 import time
 import random
 
-# --- Voz ---
-def hablar(texto):
-    print(f"Robot dice: {texto}")
-    try:
-        tts = gTTS(text=texto, lang='es', slow=False)
-        filename = "robot_response.mp3"
-        tts.save(filename)
-        pygame.mixer.init()
-        pygame.mixer.music.load(filename)
-        pygame.mixer.music.play()
-        while pygame.mixer.music.get_busy():
-            pygame.time.Clock().tick(10)
-        pygame.mixer.quit()
-        os.remove(filename)
-    except Exception as e:
-        print(f"Error al reproducir audio: {e}")
-        print(f"Robot intentó decir: {texto}")
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+from comun import intenciones, recursos
+from comun.voz import hablar, preparar
+from comun.plantillas import Plantilla
 
+FIGURAS = ['cuadrado', 'círculo', 'triángulo', 'rectángulo']
+CASI = Plantilla("Casi. Era un {figura}.", figura=FIGURAS)
 
-def escuchar():
-    r = sr.Recognizer()
+def escuchar(mic=None, esperado=None):
+    """Escucha el nombre de una figura; ``mic`` y ``esperado`` como en ``escuchar_numero``."""
+    contexto = {"juego": "adivinar_figuras", "vocabulario": "figuras", "esperado": esperado}
     try:
-        with sr.Microphone() as source:
-            r.adjust_for_ambient_noise(source, duration=1)
-            audio = r.listen(source, timeout=6, phrase_time_limit=6)
-        texto = r.recognize_google(audio, language="es-ES")
+        mic = mic or recursos.obtener("microfono")
+        audio = mic.escuchar(timeout=6, limite=6, corto=True, contexto=contexto)
+        texto = mic.reconocer_vocabulario(audio, "figuras")
         print(f"Tú dijiste: {texto}")
-        return texto.lower()
+        # la figura nombrada (con tilde, como en FIGURAS) o el texto tal cual
+        return intenciones.FIGURAS.mejor(mic.ultima_escucha["hipotesis"]) or texto.lower()
     except sr.UnknownValueError:
         hablar("No pude entender lo que dijiste.")
         return ""
@@ -76,36 +67,21 @@ def dibujar_figura(nombre, size=400):
 
     return img
 
-# Sólo permitir estas cuatro figuras (variantes sin tilde incluidas)
-ALLOWED_SHAPES = {"círculo","circulo","cuadrado","triángulo","triangulo","rectángulo","rectangulo"}
-
 def filtrar_figura_detectada(nombre):
     """Normaliza y permite sólo círculo/cuadrado/triángulo/rectángulo; devuelve 'desconocida' si no."""
-    if not nombre:
-        return "desconocida"
-    n = nombre.lower().strip()
-    # normalizar acentos básicos
-    n = n.replace("á","a").replace("í","i").replace("ó","o").replace("ú","u").replace("é","e")
-    # comprobar permitido
-    if n in ALLOWED_SHAPES:
-        if "triang" in n:
-            return "triángulo"
-        if "cuadr" in n:
-            return "cuadrado"
-        if "rect" in n:
-            return "rectángulo"
-        if "cir" in n:
-            return "círculo"
-    return "desconocida"
+    return intenciones.FIGURAS.mejor(nombre) or "desconocida"
 
 # --- Modo: adivinar (robot muestra, niño responde) ---
 
 def iniciar_modo_adivinar():
+    preparar(CASI)
+    # abrir el micrófono mientras el robot saluda: así ya está calibrado y
+    # guardando audio (pre-roll) cuando llegue la primera pregunta
+    recursos.precalentar(["microfono"], en_segundo_plano=True)
     hablar("¡Hola! Vamos a jugar a adivinar. Yo te mostraré una figura en pantalla y tú me dirás su nombre.")
 
-    figuras = ['cuadrado', 'círculo', 'triángulo', 'rectángulo']
     for i in range(3):
-        objetivo = random.choice(figuras)
+        objetivo = random.choice(FIGURAS)
         img = dibujar_figura(objetivo)
         ventana = 'Adivina la figura'
         cv2.namedWindow(ventana, cv2.WINDOW_NORMAL)
@@ -120,7 +96,7 @@ def iniciar_modo_adivinar():
                 break
                 
         # Escuchar respuesta
-        respuesta = escuchar()
+        respuesta = escuchar(esperado=objetivo)
         cv2.destroyWindow(ventana)
         cv2.waitKey(1)  # Dar tiempo a que se cierre la ventana
 
@@ -128,14 +104,11 @@ def iniciar_modo_adivinar():
             hablar("No te escuché bien.")
             continue
 
-        # Normalizar y verificar
-        resp_norm = respuesta.replace('á','a').replace('é','e').replace('í','i').replace('ó','o').replace('ú','u')
-        objetivo_norm = objetivo.replace('á','a').replace('é','e').replace('í','i').replace('ó','o').replace('ú','u')
-
-        if objetivo_norm in resp_norm:
+        # escuchar() ya devuelve la figura normalizada
+        if respuesta == objetivo:
             hablar("¡Correcto! Muy bien.")
         else:
-            hablar(f"Casi. Era un {objetivo}.")
+            hablar(CASI(figura=objetivo))
         time.sleep(1)
 
     hablar("Hemos terminado el modo adivinar. ¡Buen trabajo!")
@@ -147,9 +120,5 @@ if __name__ == '__main__':
     except KeyboardInterrupt:
         hablar("Adiós")
     finally:
-        try:
-            if pygame.mixer.get_init():
-                pygame.mixer.quit()
-        except Exception:
-            pass
+        recursos.cerrar_todo()
         cv2.destroyAllWindows()
@@ -1,40 +1,34 @@
 import speech_recognition as sr
-from gtts import gTTS
 import os
-import pygame
+import sys
 import cv2
 import numpy as np
 import time
 import random
 
-# --- Voz ---
-def hablar(texto):
-    print(f"Robot dice: {texto}")
-    try:
-        tts = gTTS(text=texto, lang='es', slow=False)
-        filename = "robot_response.mp3"
-        tts.save(filename)
-        pygame.mixer.init()
-        pygame.mixer.music.load(filename)
-        pygame.mixer.music.play()
-        while pygame.mixer.music.get_busy():
-            pygame.time.Clock().tick(10)
-        pygame.mixer.quit()
-        os.remove(filename)
-    except Exception as e:
-        print(f"Error al reproducir audio: {e}")
-        print(f"Robot intentó decir: {texto}")
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+from comun import intenciones, recursos
+from comun.voz import hablar, decir, preparar
+from comun.plantillas import Plantilla
+from comun.decision import Decisor
+from comun.planificador import Planificador
 
+FIGURAS = ["cuadrado", "círculo", "triángulo", "rectángulo"]
+PEDIR = Plantilla("Por favor, muéstrame un {figura} de color verde limón. Tienes 15 segundos.", figura=FIGURAS)
+VISTA = Plantilla("¡Excelente! Vi el {figura}.", figura=FIGURAS)
 
-def escuchar():
-    r = sr.Recognizer()
+def escuchar(mic=None, esperado=None):
+    """Escucha el nombre de una figura; ``mic`` y ``esperado`` como en ``escuchar_numero``."""
+    contexto = {"juego": "ensenar_figuras", "vocabulario": "figuras", "esperado": esperado}
     try:
-        with sr.Microphone() as source:
-            r.adjust_for_ambient_noise(source, duration=1)
-            audio = r.listen(source, timeout=6, phrase_time_limit=6)
-        texto = r.recognize_google(audio, language="es-ES")
+        mic = mic or recursos.obtener("microfono")
+        audio = mic.escuchar(timeout=6, limite=6, corto=True, contexto=contexto)
+        texto = mic.reconocer_vocabulario(audio, "figuras")
         print(f"Tú dijiste: {texto}")
-        return texto.lower()
+        # la figura nombrada (con tilde, como en FIGURAS) o el texto tal cual
+        return intenciones.FIGURAS.mejor(mic.ultima_escucha["hipotesis"]) or texto.lower()
     except sr.UnknownValueError:
         hablar("No pude entender lo que dijiste.")
         return ""
@@ -127,6 +121,15 @@ def remove_collinear_vertices(approx, angle_thresh_deg=15):
     return np.array(keep).reshape(-1, 1, 2).astype(np.int32)
 
 def detectar_figura_en_imagen(frame):
+    """Detecta la figura y la dibuja sobre ``frame``: devuelve (figura, frame)."""
+    analisis = analizar_figura(frame)
+    return analisis[0], dibujar_figura(frame, analisis)
+
+def analizar_figura(frame):
+    """
+    Sólo la detección, sin tocar ``frame``: devuelve (figura, approx, area,
+    debug_view) para ``dibujar_figura``, que puede pintarlo en otro frame.
+    """
     hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
     
     # RANGO DE COLOR VERDE LIMÓN EN HSV
@@ -148,12 +151,12 @@ def detectar_figura_en_imagen(frame):
         cv2.resize(edges, (160, 120)),
         cv2.resize(cv2.bitwise_and(mask_green_lemon, edges), (160, 120))
     ])
-    frame[10:130, 10:490] = cv2.cvtColor(debug_view, cv2.COLOR_GRAY2BGR)
     
     # conservar todos los puntos del contorno para no perder puntas agudas
     contours, _ = cv2.findContours(mask_green_lemon, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
     
     figura_detectada = "ninguna"
+    approx = None
     mejor_contorno = None
     max_area = 0
 
@@ -204,69 +207,101 @@ def detectar_figura_en_imagen(frame):
             a_hull = remove_collinear_vertices(cv2.approxPolyDP(cv2.convexHull(mejor_contorno), epsilons[1], True), angle_thresh_deg=12)
             approx = a_cont if len(a_cont) <= len(a_hull) else a_hull
  
-        # Filtrar contornos muy ruidosos o degenerados y dibujar resultado
+        # Filtrar contornos muy ruidosos o degenerados
         if approx is not None and len(approx) >= 3:
             figura_detectada = obtener_nombre_figura(approx, max_area)
-            cv2.drawContours(frame, [approx], 0, (0, 255, 0), 2)
-            M = cv2.moments(approx)
-            if M.get("m00", 0) != 0:
-                cX = int(M["m10"] / M["m00"])
-                cY = int(M["m01"] / M["m00"])
-                h_frame, w_frame, _ = frame.shape
-                cX = max(20, min(cX, w_frame - 100))
-                cY = max(20, min(cY, h_frame - 50))
-                cv2.putText(frame, figura_detectada, (cX - 20, cY - 20), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 0, 0), 2)
-                cv2.putText(frame, f"Area: {int(max_area)}", (cX - 20, cY + 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1)
-                cv2.putText(frame, f"Vertices: {len(approx)}", (cX - 20, cY + 30), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1)
+        else:
+            approx = None
+
+    return figura_detectada, approx, max_area, debug_view
 
-    return figura_detectada, frame
+def dibujar_figura(frame, analisis):
+    """Pinta sobre ``frame`` el resultado de ``analizar_figura`` (la vista de depuración y el contorno)."""
+    figura_detectada, approx, max_area, debug_view = analisis
+    frame[10:130, 10:490] = cv2.cvtColor(debug_view, cv2.COLOR_GRAY2BGR)
+    if approx is not None:
+        cv2.drawContours(frame, [approx], 0, (0, 255, 0), 2)
+        M = cv2.moments(approx)
+        if M.get("m00", 0) != 0:
+            cX = int(M["m10"] / M["m00"])
+            cY = int(M["m01"] / M["m00"])
+            h_frame, w_frame, _ = frame.shape
+            cX = max(20, min(cX, w_frame - 100))
+            cY = max(20, min(cY, h_frame - 50))
+            cv2.putText(frame, figura_detectada, (cX - 20, cY - 20), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 0, 0), 2)
+            cv2.putText(frame, f"Area: {int(max_area)}", (cX - 20, cY + 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1)
+            cv2.putText(frame, f"Vertices: {len(approx)}", (cX - 20, cY + 30), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1)
+    return frame
 
 # --- Modo: enseñar (el robot pide y el niño muestra) ---
 
 def iniciar_modo_ensenar():
     hablar("¡Hola! Vamos a jugar a mostrar figuras. Yo te pediré una figura y tú me la mostrarás frente a la cámara.")
 
-    cap = cv2.VideoCapture(0)
-    if not cap.isOpened():
+    try:
+        cap = recursos.adquirir("camara")
+    except RuntimeError:
         hablar("No pude abrir la cámara. Revisa la conexión.")
         return
+    try:
+        _jugar_ensenar(cap)
+    finally:
+        recursos.soltar("camara")
+        cv2.destroyAllWindows()
 
+def _jugar_ensenar(cap):
 #    hablar("Recuerda mostrar solo figuras de color VERDE LIMÓN. Las figuras de otros colores no serán detectadas.")
 #    hablar("Asegúrate de que las figuras sean de un verde brillante y que estén bien iluminadas.")
-    figuras = ["cuadrado", "círculo", "triángulo", "rectángulo"]
-    
+    preparar(PEDIR, VISTA)
     hablar("Solo reconozco cuatro figuras: círculo, cuadrado, triángulo y rectángulo.")
     
+    plan = Planificador(hz_deteccion=8, hz_candidato=20)
+    # la figura se acepta cuando domina los votos de varios frames, no con uno solo
+    decisor = Decisor.perfil()
     for i in range(3):
-        objetivo = random.choice(figuras)
-        hablar(f"Por favor, muéstrame un {objetivo} de color verde limón. Tienes 15 segundos.")
+        objetivo = random.choice(FIGURAS)
+        aviso = decir(PEDIR(figura=objetivo))
         detectado = "ninguna"
-        start = time.time()
+        # el tiempo de la ronda corre desde que el robot termina de pedirlo, pero los
+        # frames se procesan desde ya: si el niño se adelanta se le corta la pregunta
+        start = None
+        decisor.reiniciar()
+        analisis = None
 
-        while time.time() - start < 15:
-            ret, frame = cap.read()
+        while start is None or time.time() - start < 15:
+            if start is None and aviso.done():
+                start = time.time()
+            # espejo leído directamente del frame de la cámara (sin copiarlo antes)
+            ret, frame = cap.leer_transformado(lambda f: cv2.flip(f, 1))
             if not ret:
                 time.sleep(0.1)
                 continue
-            frame = cv2.flip(frame, 1)
-            detectado_actual, vis = detectar_figura_en_imagen(frame.copy())
+            # la imagen se redibuja a hz_pantalla; la detección, sólo cuando toca
+            if plan.debe_detectar():
+                with plan.medir():
+                    analisis = analizar_figura(frame)
+                detectado_actual = analisis[0]
+                estado = decisor.actualizar(None if detectado_actual == "ninguna" else detectado_actual.lower())
+                plan.candidato(estado.candidata is not None)
+                if estado.aceptada == objetivo:
+                    detectado = estado.aceptada
+                    cv2.imshow('Enséñame la figura - presiona q para salir', dibujar_figura(frame, analisis))
+                    decir(VISTA(figura=objetivo), interrumpir=True)
+                    cv2.waitKey(800) 
+                    break
+            vis = dibujar_figura(frame, analisis) if analisis is not None else frame
             cv2.imshow('Enséñame la figura - presiona q para salir', vis)
-            if detectado_actual.lower() == objetivo:
-                detectado = detectado_actual
-                cv2.waitKey(800) 
-                break
-            if cv2.waitKey(1) & 0xFF == ord('q'):
+            if plan.esperar_tecla() == ord('q'):
                 break
 
         cv2.destroyAllWindows()
-        if detectado.lower() == objetivo:
-            hablar(f"¡Excelente! Vi el {objetivo}.")
-        else:
-            hablar(f"No logré ver el {objetivo}. Detecté: {detectado}.")
+        if detectado.lower() != objetivo:
+            # lo que más se vio durante la ronda
+            detectado = decisor.lider()[0] or "ninguna"
+            decir(f"No logré ver el {objetivo}. Detecté: {detectado}.")
         time.sleep(1.5)
 
-    cap.release()
-    cv2.destroyAllWindows()
+    print(decisor.resumen())
     hablar("Terminamos el modo enseñar. ¡Buen trabajo!")
 
 
@@ -276,9 +311,5 @@ if __name__ == '__main__':
     except KeyboardInterrupt:
         hablar("Adiós")
     finally:
-        try:
-            if pygame.mixer.get_init():
-                pygame.mixer.quit()
-        except Exception:
-            pass
+        recursos.cerrar_todo()
         cv2.destroyAllWindows()
\ No newline at end of file
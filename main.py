@@ -1,8 +1,16 @@
+import argparse
+import importlib.util
 import subprocess
 import sys
 import os
+import threading
 
-ROOT = os.path.dirname(__file__)
+from comun import recursos
+from comun.camara_compartida import ServidorCamara, VARIABLE_ENTORNO
+from comun.sintesis import VARIABLE_ENTORNO as VARIABLE_VOZ
+from comun.corpus import VARIABLE_ENTORNO as VARIABLE_CORPUS
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
 
 SCRIPTS = {
 	'1': ('Mostrar Color', os.path.join(ROOT, 'color', 'mostrarColor.py')),
@@ -13,8 +21,27 @@ SCRIPTS = {
 	'6': ('Adivinar figuras (di el nombre de la figura)', os.path.join(ROOT, 'figurasGeometricas', 'adivinar_figuras.py')),
 	'7': ('Mostrar número', os.path.join(ROOT, 'numeros', 'detectarNumeros.py')),
 	'8': ('Adivinar número', os.path.join(ROOT, 'numeros', 'adivinarNumeros.py')),
+	'9': ('Direcciones (levanta la mano derecha o izquierda)', os.path.join(ROOT, 'direccion', 'direccion.py')),
+}
+
+# Función de entrada de cada script para el modo persistente: (nombre, argumentos)
+ENTRADAS = {
+	'1': ('jugar_mostrar', {'rounds': 4}),
+	'2': ('jugar_adivinar', {'rounds': 4}),
+	'3': ('texto_a_audio', {}),
+	'4': ('escuchar_y_escribir', {}),
+	'5': ('iniciar_modo_ensenar', {}),
+	'6': ('iniciar_modo_adivinar', {}),
+	'7': ('interactive_session', {'rounds': 5, 'timeout_sec': 15, 'accept_conf': 0.6}),
+	'8': ('juego_adivinar_numero_visual', {'rondas': 4}),
+	'9': ('jugar_direcciones', {'rounds': 4, 'timeout': 15, 'hold_time': 1.0}),
 }
 
+# Módulos de juego ya importados en este proceso (modo persistente)
+_modulos = {}
+_modulos_lock = threading.Lock()
+_errores_precarga = {}
+
 
 def run_script(path):
 	if not os.path.isfile(path):
@@ -27,6 +54,110 @@ def run_script(path):
 		print('\nInterrumpido por el usuario. Volviendo al menú...')
 
 
+def cargar_modulo(path):
+	"""Importa un script de juego una sola vez y lo reutiliza en las siguientes partidas."""
+	with _modulos_lock:
+		if path in _modulos:
+			return _modulos[path]
+		nombre = 'juego_' + os.path.splitext(os.path.basename(path))[0]
+		spec = importlib.util.spec_from_file_location(nombre, path)
+		modulo = importlib.util.module_from_spec(spec)
+		spec.loader.exec_module(modulo)
+		_modulos[path] = modulo
+		return modulo
+
+
+# recursos que se crean mientras se muestra el menú; la cámara y el micrófono
+# no: abiertos estarían capturando sin que ningún juego los use
+RECURSOS_PRECARGA = ['modelo_digitos', 'manos', 'mezclador', 'audio']
+# por lo mismo, al volver al menú se cierran si ningún juego los retiene
+RECURSOS_AL_VOLVER = ['camara', 'microfono']
+
+
+def precargar():
+	"""Importa todos los juegos y crea los recursos compartidos de RECURSOS_PRECARGA."""
+	for k, (desc, path) in SCRIPTS.items():
+		try:
+			cargar_modulo(path)
+		except BaseException as e:
+			# un juego que no carga no debe impedir precargar el resto
+			_errores_precarga[k] = e
+	# los recursos que fallen aquí se reintentan cuando un juego los pida
+	recursos.precalentar(RECURSOS_PRECARGA)
+
+
+def iniciar_precarga():
+	hilo = threading.Thread(target=precargar, name='precarga-juegos', daemon=True)
+	hilo.start()
+	return hilo
+
+
+def limpiar_recursos():
+	"""Cierra ventanas y corta el audio que un juego pudo dejar al terminar o al interrumpirse.
+
+	La cámara y el micrófono (RECURSOS_AL_VOLVER) se cierran si nadie los
+	usa; el modelo, el mezclador y el motor de audio siguen abiertos en el
+	registro de recursos para el siguiente juego.
+	"""
+	cv2 = sys.modules.get('cv2')
+	if cv2 is not None:
+		try:
+			cv2.destroyAllWindows()
+			cv2.waitKey(1)
+		except Exception:
+			pass
+	voz = sys.modules.get('comun.voz')
+	if voz is not None and recursos.estado().get('voz', (False, 0))[0]:
+		# descartar las frases que el juego dejó en cola (sin crear la cola si no existe)
+		try:
+			voz.callar()
+		except Exception:
+			pass
+	if recursos.estado().get('audio', (False, 0))[0]:
+		# a través del motor, para que las reproducciones cortadas den False
+		try:
+			recursos.obtener('audio').detener_todo()
+		except Exception:
+			pass
+	pygame = sys.modules.get('pygame')
+	if pygame is not None:
+		try:
+			if pygame.mixer.get_init():
+				pygame.mixer.stop()
+				pygame.mixer.music.stop()
+		except Exception:
+			pass
+	# sin esto la cámara (con su hilo de captura) y el micrófono seguirían abiertos en el menú
+	try:
+		recursos.liberar_sin_uso(RECURSOS_AL_VOLVER)
+	except Exception as e:
+		print(f"No se pudo cerrar la cámara o el micrófono: {e}")
+
+
+def run_in_process(choice):
+	desc, path = SCRIPTS[choice]
+	funcion, kwargs = ENTRADAS[choice]
+	if not os.path.isfile(path):
+		print(f"No se encontró el script: {path}")
+		return
+	error = _errores_precarga.pop(choice, None)
+	if error is not None:
+		print(f"La precarga de '{desc}' falló ({error!r}); reintentando...")
+	print(f"Iniciando: {desc} (pulsa Ctrl+C para volver al menú)\n")
+	try:
+		modulo = cargar_modulo(path)
+		getattr(modulo, funcion)(**kwargs)
+	except KeyboardInterrupt:
+		print('\nInterrumpido por el usuario. Volviendo al menú...')
+	except SystemExit:
+		# algunos scripts llaman a exit() si falta la cámara o el modelo
+		print('\nEl juego terminó antes de tiempo. Volviendo al menú...')
+	except Exception as e:
+		print(f"Error en '{desc}': {e}")
+	finally:
+		limpiar_recursos()
+
+
 def print_menu():
 	print('\n=== Menú Robot Educativo ===')
 	for k, (desc, path) in SCRIPTS.items():
@@ -34,20 +165,60 @@ def print_menu():
 	print('q. Salir')
 
 
-def main():
-	while True:
-		print_menu()
-		choice = input('Selecciona una opción: ').strip().lower()
-		if choice == 'q' or choice == 'quit' or choice == 'salir':
-			print('Saliendo. ¡Hasta pronto!')
-			break
-		if choice in SCRIPTS:
-			_, path = SCRIPTS[choice]
-			run_script(path)
+def parse_args(argv=None):
+	parser = argparse.ArgumentParser(description='Menú del Robot Educativo')
+	parser.add_argument('--persistente', action='store_true',
+		help='ejecuta los juegos dentro de este proceso, cargando las librerías y el modelo una sola vez')
+	parser.add_argument('--sin-precarga', action='store_true',
+		help='en modo persistente, no precargar los juegos en segundo plano mientras se muestra el menú')
+	parser.add_argument('--camara-compartida', action='store_true',
+		help='abre la cámara una sola vez en un proceso aparte y la comparte con los juegos por memoria compartida')
+	parser.add_argument('--voz', metavar='BACKENDS',
+		help='orden de los backends de voz separados por comas (gtts, local, falso); p. ej. "local" para no usar la red')
+	parser.add_argument('--grabar-corpus', metavar='CARPETA',
+		help='guarda cada respuesta hablada y la respuesta esperada en CARPETA para el banco de pruebas (python -m comun.corpus)')
+	return parser.parse_args(argv)
+
+
+def main(argv=None):
+	args = parse_args(argv)
+	servidor = None
+	if args.voz:
+		# también lo heredan los juegos lanzados como subproceso
+		os.environ[VARIABLE_VOZ] = args.voz
+	if args.grabar_corpus:
+		os.environ[VARIABLE_CORPUS] = os.path.abspath(args.grabar_corpus)
+	if args.camara_compartida:
+		servidor = ServidorCamara(indice=recursos.INDICE_CAMARA)
+		if servidor.iniciar():
+			# los juegos (incluidos los lanzados como subproceso) heredan la variable
+			os.environ[VARIABLE_ENTORNO] = servidor.nombre
 		else:
-			print('Opción no válida. Intenta de nuevo.')
+			servidor = None
+	if args.persistente and not args.sin_precarga:
+		print('Precargando juegos en segundo plano...')
+		iniciar_precarga()
+	try:
+		while True:
+			print_menu()
+			choice = input('Selecciona una opción: ').strip().lower()
+			if choice == 'q' or choice == 'quit' or choice == 'salir':
+				print('Saliendo. ¡Hasta pronto!')
+				break
+			if choice in SCRIPTS:
+				if args.persistente:
+					run_in_process(choice)
+				else:
+					_, path = SCRIPTS[choice]
+					run_script(path)
+			else:
+				print('Opción no válida. Intenta de nuevo.')
+	finally:
+		recursos.cerrar_todo()
+		if servidor is not None:
+			servidor.detener()
+			os.environ.pop(VARIABLE_ENTORNO, None)
 
 
 if __name__ == '__main__':
 	main()
-
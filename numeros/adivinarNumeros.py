@@ -1,60 +1,34 @@
 import random
 import time
-from gtts import gTTS
-import pygame
 import speech_recognition as sr
 import os
+import sys
 import cv2
 import numpy as np
 
-# --- Voz (gTTS + pygame) ---
-def hablar(texto):
-    """Genera y reproduce un audio corto con gTTS (es)."""
-    print(f"Robot dice: {texto}")
-    try:
-        fname = "tts_tmp_robot_visual.mp3"
-        tts = gTTS(text=str(texto), lang='es', slow=False)
-        tts.save(fname)
-        pygame.mixer.init()
-        pygame.mixer.music.load(fname)
-        pygame.mixer.music.play()
-        while pygame.mixer.music.get_busy():
-            pygame.time.Clock().tick(10)
-        pygame.mixer.quit()
-        try:
-            os.remove(fname)
-        except Exception:
-            pass
-    except Exception as e:
-        print("Error al reproducir audio:", e)
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+from comun import intenciones, recursos
+from comun.voz import hablar
 
 # --- Reconocimiento de Voz ---
-def escuchar_numero():
-    """Escucha la entrada del micrófono y retorna el número dicho."""
-    r = sr.Recognizer()
-    with sr.Microphone() as source:
-        r.adjust_for_ambient_noise(source) # Ajusta el ruido ambiental
-        audio = r.listen(source, timeout=5, phrase_time_limit=5) # Escucha por 5 segundos
-
+def escuchar_numero(mic=None, esperado=None):
+    """
+    Escucha la entrada del micrófono y retorna el número dicho.
+    ``mic`` permite usar otra fuente (p. ej. ``comun.corpus.FuenteGrabada``);
+    ``esperado`` se guarda con la grabación si se está grabando el corpus.
+    """
+    # micrófono compartido: ya está abierto y calibrado
+    mic = mic or recursos.obtener("microfono")
+    contexto = {"juego": "numeros", "vocabulario": "digitos", "esperado": esperado}
     try:
-        texto = r.recognize_google(audio, language='es-ES')
+        audio = mic.escuchar(timeout=5, limite=5, corto=True, contexto=contexto) # respuesta de una palabra
+        texto = mic.reconocer_vocabulario(audio, "digitos")
         print(f"Tú dijiste: {texto}")
-        # Intentar extraer un número del texto
-        for palabra in texto.split():
-            if palabra.isdigit():
-                return int(palabra)
-        # Si no se encuentra un dígito, intentar con palabras comunes para números
-        if "cero" in texto.lower(): return 0
-        if "uno" in texto.lower(): return 1
-        if "dos" in texto.lower(): return 2
-        if "tres" in texto.lower(): return 3
-        if "cuatro" in texto.lower(): return 4
-        if "cinco" in texto.lower(): return 5
-        if "seis" in texto.lower(): return 6
-        if "siete" in texto.lower(): return 7
-        if "ocho" in texto.lower(): return 8
-        if "nueve" in texto.lower(): return 9
-        return None # No se reconoció un número válido
+        # Número (cifra o palabras, del 0 al 100) más probable entre las
+        # alternativas reconocidas; None si no se dijo un número válido
+        return intenciones.NUMEROS.mejor(mic.ultima_escucha["hipotesis"])
     except sr.WaitTimeoutError:
         print("No se detectó habla.")
         return None
@@ -99,6 +73,9 @@ def mostrar_numero_en_ventana(numero):
 
 # --- Juego ---
 def juego_adivinar_numero_visual(rondas=4):
+    # abrir el micrófono mientras el robot saluda: así ya está calibrado y
+    # guardando audio (pre-roll) cuando llegue la primera pregunta
+    recursos.precalentar(["microfono"], en_segundo_plano=True)
     hablar("¡Hola! Vamos a jugar a adivinar números. Te mostraré un número del cero al nueve en pantalla y tú deberás adivinar cuál es, diciéndolo en voz alta.")
     time.sleep(1)
 
@@ -109,7 +86,7 @@ def juego_adivinar_numero_visual(rondas=4):
         hablar(f"Ronda número {i+1}. ¡Aquí está el número!")
         mostrar_numero_en_ventana(numero_a_mostrar) # Muestra el número
 
-        intento_usuario = escuchar_numero() # Escucha la respuesta del usuario
+        intento_usuario = escuchar_numero(esperado=numero_a_mostrar) # Escucha la respuesta del usuario
 
         if intento_usuario is not None and intento_usuario == numero_a_mostrar:
             hablar(f"¡Felicidades! ¡Lo has adivinado correctamente! El número era el {numero_a_mostrar}.")
@@ -140,9 +117,6 @@ if __name__ == "__main__":
         hablar("Juego interrumpido. ¡Adiós!")
     finally:
         # Asegurarse de que el mezclador de pygame se cierre si está activo
-        try:
-            if pygame.mixer.get_init():
-                pygame.mixer.quit()
-        except Exception:
-            pass
-        cv2.destroyAllWindows() # Asegurarse de cerrar todas las ventanas de OpenCV al finalizar
\ No newline at end of file
+        recursos.cerrar_todo()
+        cv2.destroyAllWindows()
+ # Asegurarse de cerrar todas las ventanas de OpenCV al finalizar
\ No newline at end of file
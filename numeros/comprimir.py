@@ -0,0 +1,194 @@
+"""Variantes comprimidas de la CNN de dígitos y su informe de precisión y latencia.
+
+A partir de ``mnist_cnn_model.h5`` (``numeros/entrenador.py``) genera:
+
+- ``mnist_cnn_model_int8.npz``: la misma red con los pesos en int8,
+  cuantizada tras el entrenamiento (``comun.red_digitos.cuantizar``);
+- ``mnist_cnn_model_alumno.npz``: una red más pequeña (8 y 16 filtros y
+  una capa densa de 32) destilada de la original: aprende sus
+  probabilidades suavizadas con una temperatura además de las etiquetas,
+  con las imágenes de MNIST y las mismas pasadas por el recorte del juego;
+- ``mnist_cnn_model_alumno_int8.npz``: el alumno cuantizado.
+
+Después compara todas las variantes con el motor NumPy que usan los
+juegos: precisión en el test de MNIST, precisión en esas imágenes
+convertidas en la máscara binaria que ve el juego (``_preparar_roi`` de
+``detectarNumeros.py``), tamaño del fichero y latencia por inferencia.
+
+    python numeros/comprimir.py                 # genera y compara
+    python numeros/comprimir.py --solo-informe  # compara las que ya existen
+
+El juego elige la variante con ``--modelo`` o ``ROBOT_MODELO_DIGITOS``.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+from comun.red_digitos import (RUTA_H5, RUTA_NPZ, VARIANTES, RedNumpy, _entradas_prueba,
+                               cuantizar, exportar, ruta_variante)
+from detectarNumeros import _preparar_roi
+
+
+def rois_de_juego(imagenes):
+    """Imágenes de MNIST (uint8) como las ve el juego: máscara binaria, recorte y ``_preparar_roi``."""
+    salida = np.zeros((len(imagenes), 28, 28, 1), np.float32)
+    for i, imagen in enumerate(imagenes):
+        mascara = np.where(imagen > 127, 255, 0).astype(np.uint8)
+        filas = np.flatnonzero(mascara.any(axis=1))
+        columnas = np.flatnonzero(mascara.any(axis=0))
+        if filas.size == 0:
+            continue
+        # el juego recorta el rectángulo del contorno igual que aquí
+        roi = _preparar_roi(mascara[filas[0]:filas[-1] + 1, columnas[0]:columnas[-1] + 1])
+        if roi is not None:
+            salida[i, ..., 0] = roi / 255.0
+    return salida
+
+
+def crear_alumno():
+    """Red pequeña con las mismas capas que admite ``RedNumpy``; la última da logits."""
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import Conv2D, MaxPooling2D, Flatten, Dense
+    return Sequential([
+        Conv2D(8, (3, 3), activation='relu', input_shape=(28, 28, 1)),
+        MaxPooling2D((2, 2)),
+        Conv2D(16, (3, 3), activation='relu'),
+        MaxPooling2D((2, 2)),
+        Flatten(),
+        Dense(32, activation='relu'),
+        Dense(10),
+    ])
+
+
+def destilar(maestro, x, y, temperatura=4.0, alfa=0.7, epocas=5, lote=128):
+    """
+    Entrena el alumno con ``alfa`` de pérdida frente a las probabilidades del
+    maestro a ``temperatura`` y ``1 - alfa`` frente a las etiquetas.
+    """
+    import tensorflow as tf
+    # el maestro termina en softmax: softmax(logits / T) = p^(1/T) renormalizado
+    p = maestro.predict(x, batch_size=512, verbose=0)
+    blandas = np.power(np.clip(p, 1e-8, 1.0), 1.0 / temperatura)
+    blandas = (blandas / blandas.sum(axis=1, keepdims=True)).astype(np.float32)
+
+    alumno = crear_alumno()
+    datos = (tf.data.Dataset.from_tensor_slices((x, y.astype(np.int32), blandas))
+             .shuffle(10000).batch(lote).prefetch(tf.data.AUTOTUNE))
+    optimizador = tf.keras.optimizers.Adam(1e-3)
+    kl = tf.keras.losses.KLDivergence()
+    ce = tf.keras.losses.SparseCategoricalCrossentropy(from_logits=True)
+
+    @tf.function
+    def paso(xb, yb, pb):
+        with tf.GradientTape() as cinta:
+            logits = alumno(xb, training=True)
+            # T^2 mantiene la escala de los gradientes de la parte blanda
+            blanda = kl(pb, tf.nn.softmax(logits / temperatura)) * temperatura ** 2
+            perdida = alfa * blanda + (1 - alfa) * ce(yb, logits)
+        gradientes = cinta.gradient(perdida, alumno.trainable_variables)
+        optimizador.apply_gradients(zip(gradientes, alumno.trainable_variables))
+        return perdida
+
+    for epoca in range(epocas):
+        total, pasos = 0.0, 0
+        for xb, yb, pb in datos:
+            total += float(paso(xb, yb, pb))
+            pasos += 1
+        print(f"Época {epoca + 1}/{epocas}: pérdida {total / pasos:.4f}")
+    return alumno
+
+
+def latencia_ms(red, repeticiones=300):
+    """Mediana de una predicción de una ROI, en milisegundos."""
+    x = _entradas_prueba(1)
+    red.predecir(x)  # reserva los búferes
+    tiempos = []
+    for _ in range(repeticiones):
+        t = time.perf_counter()
+        red.predecir(x)
+        tiempos.append(time.perf_counter() - t)
+    tiempos.sort()
+    return 1000 * tiempos[len(tiempos) // 2]
+
+
+def predecir_por_lotes(red, x, lote=512):
+    """
+    Clases de ``x`` en lotes de ``lote``: ``RedNumpy`` reserva los búferes de
+    im2col según el tamaño del lote, y con las 10000 imágenes de golpe
+    serían casi 3 GB.
+    """
+    return np.concatenate([red.predecir(x[i:i + lote]).argmax(1) for i in range(0, len(x), lote)])
+
+
+def informe(x_test, y_test, rois_test, ruta_base=RUTA_NPZ):
+    """Una fila por variante existente: precisión MNIST, precisión en ROI, KB y ms."""
+    filas = []
+    for variante in VARIANTES:
+        ruta = ruta_variante(ruta_base, variante)
+        if not os.path.isfile(ruta):
+            continue
+        red = RedNumpy.cargar(ruta)
+        filas.append({
+            "variante": variante,
+            "mnist": float((predecir_por_lotes(red, x_test) == y_test).mean()),
+            "roi": float((predecir_por_lotes(red, rois_test) == y_test).mean()),
+            "kb": os.path.getsize(ruta) / 1024,
+            "ms": latencia_ms(red),
+        })
+    return filas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Variantes int8 y destilada de la CNN de dígitos")
+    parser.add_argument("--h5", default=RUTA_H5, help="modelo original (maestro)")
+    parser.add_argument("--solo-informe", action="store_true", help="no genera variantes, sólo compara")
+    parser.add_argument("--epocas", type=int, default=5)
+    parser.add_argument("--temperatura", type=float, default=4.0)
+    parser.add_argument("--alfa", type=float, default=0.7)
+    parser.add_argument("--json", metavar="RUTA", help="guarda también el informe en JSON")
+    args = parser.parse_args(argv)
+
+    from tensorflow.keras.datasets import mnist
+    (x_train, y_train), (x_test, y_test) = mnist.load_data()
+    rois_test = rois_de_juego(x_test)
+    x_test = x_test.reshape(-1, 28, 28, 1).astype('float32') / 255.0
+
+    if not args.solo_informe:
+        import tensorflow as tf
+        maestro = tf.keras.models.load_model(args.h5)
+        if not os.path.isfile(RUTA_NPZ):
+            exportar(maestro, RUTA_NPZ)
+        print(f"Guardado {cuantizar(RUTA_NPZ, ruta_variante(RUTA_NPZ, 'int8'))}")
+
+        print("Destilando el alumno...")
+        x = np.concatenate([x_train.reshape(-1, 28, 28, 1).astype('float32') / 255.0,
+                            rois_de_juego(x_train)])
+        y = np.concatenate([y_train, y_train])
+        alumno = destilar(maestro, x, y, args.temperatura, args.alfa, args.epocas)
+        ruta_alumno = exportar(alumno, ruta_variante(RUTA_NPZ, "alumno"), activacion_final="softmax")
+        print(f"Guardado {ruta_alumno}")
+        print(f"Guardado {cuantizar(ruta_alumno, ruta_variante(RUTA_NPZ, 'alumno_int8'))}")
+
+    filas = informe(x_test, y_test, rois_test)
+    if not filas:
+        print("No hay variantes: entrena el modelo con numeros/entrenador.py.")
+        return 1
+    print(f"{'variante':12s} {'MNIST':>7s} {'ROI':>7s} {'tamaño':>9s} {'latencia':>10s}")
+    for f in filas:
+        print(f"{f['variante']:12s} {100 * f['mnist']:6.2f}% {100 * f['roi']:6.2f}% "
+              f"{f['kb']:6.0f} KB {f['ms']:7.3f} ms")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fichero:
+            json.dump(filas, fichero, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,49 +1,27 @@
+import argparse
+import collections
 import cv2
 import numpy as np
-import tensorflow as tf
-from gtts import gTTS
-import pygame
 import time
 import random
 import os
+import sys
 
-# Cargar el modelo pre-entrenado
-try:
-    model = tf.keras.models.load_model('mnist_cnn_model.h5')
-except Exception as e:
-    print(f"Error al cargar el modelo: {e}")
-    print("Asegúrate de haber entrenado y guardado el modelo 'mnist_cnn_model.h5' o de que esté en la ruta correcta.")
-    exit()
-
-# --- Voz (gTTS + pygame) ---
-def hablar(texto):
-    """Genera y reproduce un audio corto con gTTS (es)."""
-    print(f"Robot dice: {texto}")
-    try:
-        fname = "tts_tmp_numero.mp3"
-        tts = gTTS(text=str(texto), lang='es', slow=False)
-        tts.save(fname)
-        pygame.mixer.init()
-        pygame.mixer.music.load(fname)
-        pygame.mixer.music.play()
-        while pygame.mixer.music.get_busy():
-            pygame.time.Clock().tick(10)
-        pygame.mixer.quit()
-        try:
-            os.remove(fname)
-        except Exception:
-            pass
-    except Exception as e:
-        print("Error audio:", e)
-
-# Inicializar la cámara
-cap = cv2.VideoCapture(0)
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+from comun import recursos
+from comun.voz import hablar, decir, callar, preparar
+from comun.decision import Decisor
+from comun.planificador import Planificador
+from comun.red_digitos import VARIABLE_VARIANTE, VARIANTES
+from comun.plantillas import Plantilla
 
-if not cap.isOpened():
-    print("Error: No se pudo abrir la cámara.")
-    exit()
-
-print("Presiona 'q' para salir.")
+# El modelo pre-entrenado se carga la primera vez que se usa, a través del
+# registro de recursos ("modelo_digitos"): con NumPy si existe
+# mnist_cnn_model.npz (comun/red_digitos.py) y si no con TensorFlow.
+# "--modelo int8" (o alumno, alumno_int8) usa una variante comprimida por
+# numeros/comprimir.py en su lugar.
 
 # Definir el rango de color verde limón en HSV
 # Estos valores están bien como punto de partida. AJÚSTALOS con el script de trackbars
@@ -51,115 +29,297 @@ print("Presiona 'q' para salir.")
 lower_green_lemon = np.array([35, 100, 100])
 upper_green_lemon = np.array([85, 255, 255])
 
-def detect_digit_from_frame(frame):
-    """Extrae la ROI por color, procesa y devuelve (digit, confidence, vis_frame) o (None,0,frame)."""
-    hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-    mask = cv2.inRange(hsv, lower_green_lemon, upper_green_lemon)
-    kernel_m = np.ones((3,3), np.uint8)
-    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel_m, iterations=1)
-    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel_m, iterations=1)
+# frase de cada ronda: los trozos se sintetizan una vez y se componen al decirla
+FORMATO_RONDA = "Ronda número {n}. Muéstrame el número {objetivo}. Tienes {segundos} segundos. ¡Adelante!"
 
-    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    if not contours:
-        return None, 0.0, frame, mask
+# con dominios literales para que ``python -m comun.calentar_voz`` pueda expandirlas
+RONDA = Plantilla(FORMATO_RONDA, n=range(1, 11), objetivo=range(10), segundos=(10, 15, 20))
+RONDA_DOS_CIFRAS = Plantilla(FORMATO_RONDA, n=range(1, 11), objetivo=range(100), segundos=(10, 15, 20))
 
-    plausible_contours = []
-    for contour in contours:
-        area = cv2.contourArea(contour)
-        x, y, w, h = cv2.boundingRect(contour)
-        if 1000 < area < 150000:
-            aspect_ratio = float(w) / h if h>0 else 0
-            if 0.6 < aspect_ratio < 1.3:
-                plausible_contours.append((area, contour, (x, y, w, h)))
+# proporción ancho/alto admitida para una cifra: un "1" mide entre 0.3 y 0.5
+ASPECTO_MIN = 0.25
+ASPECTO_MAX = 1.3
 
-    if not plausible_contours:
-        return None, 0.0, frame, mask
+# Una cifra clasificada: dígito, confianza y rectángulo (x, y, w, h) en el frame
+Deteccion = collections.namedtuple("Deteccion", "digito confianza caja")
 
-    plausible_contours.sort(key=lambda x: x[0], reverse=True)
-    _, _, (x, y, w, h) = plausible_contours[0]
-    cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
-    roi = mask[y:y+h, x:x+w]
+def _preparar_roi(roi, target_size=28, padding=4):
+    """Centra la ROI binaria en 28x28 como las imágenes de MNIST; None si está vacía."""
     if roi.size == 0 or np.max(roi) == 0:
-        return None, 0.0, frame, mask
-
-    # preparar ROI para el modelo (centrado/pad simple, manteniendo tu pipeline)
-    target_size = 28
-    padding = 4
+        return None
     max_dim = max(roi.shape[0], roi.shape[1])
-    if max_dim == 0:
-        return None, 0.0, frame, mask
     scale_factor = min((target_size - 2 * padding) / max_dim, 1.0)
     resized_roi_w = int(roi.shape[1] * scale_factor)
     resized_roi_h = int(roi.shape[0] * scale_factor)
     if resized_roi_w == 0 or resized_roi_h == 0:
-        return None, 0.0, frame, mask
+        return None
     resized_roi = cv2.resize(roi, (resized_roi_w, resized_roi_h), interpolation=cv2.INTER_AREA)
     final_roi = np.zeros((target_size, target_size), dtype=np.uint8)
     start_x = (target_size - resized_roi_w) // 2
     start_y = (target_size - resized_roi_h) // 2
     final_roi[start_y:start_y + resized_roi_h, start_x:start_x + resized_roi_w] = resized_roi
     _, final_roi = cv2.threshold(final_roi, 127, 255, cv2.THRESH_BINARY)
-    inp = final_roi.astype('float32') / 255.0
-    inp = np.expand_dims(inp, axis=-1)
-    inp = np.expand_dims(inp, axis=0)
-    preds = model.predict(inp, verbose=0)
-    digit = int(np.argmax(preds))
-    confidence = float(np.max(preds))
-    cv2.putText(frame, f"{digit} ({confidence*100:.1f}%)", (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
-    return digit, confidence, frame, mask
+    return final_roi
+
+def _mascara(frame):
+    hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+    mask = cv2.inRange(hsv, lower_green_lemon, upper_green_lemon)
+    kernel_m = np.ones((3,3), np.uint8)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel_m, iterations=1)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel_m, iterations=1)
+    return mask
+
+def _cajas_plausibles(mask):
+    """Rectángulos de los contornos con área y proporción de una cifra."""
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    cajas = []
+    for contour in contours:
+        area = cv2.contourArea(contour)
+        x, y, w, h = cv2.boundingRect(contour)
+        if 1000 < area < 150000:
+            aspect_ratio = float(w) / h if h>0 else 0
+            if ASPECTO_MIN < aspect_ratio < ASPECTO_MAX:
+                cajas.append((x, y, w, h))
+    return cajas
+
+def clasificar_cajas(mask, cajas, model=None):
+    """
+    Clasifica todas las cajas en una sola llamada al modelo: las ROI se
+    preparan en un lote (N, 28, 28, 1). Devuelve una ``Deteccion`` por ROI válida.
+    """
+    rois, validas = [], []
+    for (x, y, w, h) in cajas:
+        roi = _preparar_roi(mask[y:y+h, x:x+w])
+        if roi is not None:
+            rois.append(roi)
+            validas.append((x, y, w, h))
+    if not rois:
+        return []
+    lote = np.stack(rois).astype('float32')[..., None] / 255.0
+    model = model or recursos.obtener("modelo_digitos")
+    preds = model.predict(lote, verbose=0)
+    return [Deteccion(int(np.argmax(p)), float(np.max(p)), caja) for p, caja in zip(preds, validas)]
+
+def agrupar_numeros(detecciones, max_hueco=0.6, min_solape=0.5):
+    """
+    Une de izquierda a derecha las cifras contiguas (misma altura y separadas
+    menos de ``max_hueco`` veces su alto) en números de varias cifras.
+    Devuelve ``(numero, confianza, caja)`` por grupo; la confianza es el
+    producto de las de sus cifras.
+    """
+    grupos = []
+    for d in sorted(detecciones, key=lambda d: d.caja[0]):
+        x, y, w, h = d.caja
+        if grupos:
+            ultima = grupos[-1][-1]
+            ux, uy, uw, uh = ultima.caja
+            hueco = x - (ux + uw)
+            solape = min(y + h, uy + uh) - max(y, uy)
+            if hueco < max_hueco * max(h, uh) and solape > min_solape * min(h, uh):
+                grupos[-1].append(d)
+                continue
+        grupos.append([d])
+    numeros = []
+    for grupo in grupos:
+        numero = int("".join(str(d.digito) for d in grupo))
+        confianza = float(np.prod([d.confianza for d in grupo]))
+        x0 = min(d.caja[0] for d in grupo)
+        y0 = min(d.caja[1] for d in grupo)
+        x1 = max(d.caja[0] + d.caja[2] for d in grupo)
+        y1 = max(d.caja[1] + d.caja[3] for d in grupo)
+        numeros.append((numero, confianza, (x0, y0, x1 - x0, y1 - y0)))
+    return numeros
+
+def detectar_numeros(frame):
+    """
+    Extrae por color todas las cifras plausibles, las clasifica en un solo lote
+    y compone los números de varias cifras. Devuelve (numero, confidence,
+    numeros, mask) del número más grande en pantalla o (None, 0, [], mask);
+    ``numeros`` es la lista de ``agrupar_numeros`` para ``dibujar_numeros``.
+    """
+    mask = _mascara(frame)
+    cajas = _cajas_plausibles(mask)
+    if not cajas:
+        return None, 0.0, [], mask
+    detecciones = clasificar_cajas(mask, cajas)
+    if not detecciones:
+        return None, 0.0, [], mask
+    numeros = agrupar_numeros(detecciones)
+    numero, confidence, _ = max(numeros, key=lambda n: n[2][2] * n[2][3])
+    return numero, confidence, numeros, mask
+
+def dibujar_numeros(frame, numeros):
+    """Dibuja las cajas y números de ``detectar_numeros`` sobre ``frame`` (puede ser otro frame más nuevo)."""
+    for numero, confidence, (x, y, w, h) in numeros:
+        cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
+        cv2.putText(frame, f"{numero} ({confidence*100:.1f}%)", (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+    return frame
+
+def detect_digit_from_frame(frame):
+    """Como ``detectar_numeros`` pero con los números ya dibujados: (numero, confidence, vis_frame, mask)."""
+    numero, confidence, numeros, mask = detectar_numeros(frame)
+    return numero, confidence, dibujar_numeros(frame, numeros), mask
+
+def benchmark_candidatos(max_candidatos=8, repeticiones=30):
+    """
+    Coste por frame frente al número de cifras en pantalla: el lote único
+    frente a una llamada al modelo por cifra.
+    """
+    model = recursos.obtener("modelo_digitos")
+    print("dibujadas  cifras  lote (ms/frame)  una a una (ms/frame)")
+    for n in range(1, max_candidatos + 1):
+        frame = np.zeros((480, 80 * max_candidatos + 40, 3), np.uint8)
+        for i in range(n):
+            cv2.putText(frame, str(i % 10), (20 + 80 * i, 300), cv2.FONT_HERSHEY_SIMPLEX, 3, (0, 255, 200), 12)
+        mask = _mascara(frame)
+        cajas = _cajas_plausibles(mask)
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            clasificar_cajas(mask, cajas, model)
+        lote = 1000 * (time.perf_counter() - inicio) / repeticiones
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            for caja in cajas:
+                clasificar_cajas(mask, [caja], model)
+        separadas = 1000 * (time.perf_counter() - inicio) / repeticiones
+        print(f"{n:9d}  {len(cajas):6d}  {lote:15.2f}  {separadas:20.2f}")
+
+def comprobar_dos_cifras():
+    """
+    Dibuja un "1" y un "2" juntos y comprueba que los dos pasan el filtro de
+    ``_cajas_plausibles`` y que ``agrupar_numeros`` los compone en 12 (sin
+    el modelo: a cada caja se le da la cifra que se dibujó).
+    """
+    frame = np.zeros((240, 320, 3), np.uint8)
+    # un "1" recortado como las tarjetas: palo y bandera, sin pie (ancho/alto ≈ 0.4)
+    cv2.rectangle(frame, (96, 60), (120, 180), (0, 255, 200), -1)
+    cv2.fillPoly(frame, [np.array([[96, 60], [120, 60], [120, 80], [72, 100], [72, 84]], np.int32)], (0, 255, 200))
+    cv2.putText(frame, "2", (150, 180), cv2.FONT_HERSHEY_SIMPLEX, 5, (0, 255, 200), 14)
+    cajas = sorted(_cajas_plausibles(_mascara(frame)))
+    if len(cajas) != 2:
+        print(f"Se esperaban 2 cifras y se encontraron {len(cajas)}: {cajas}")
+        return False
+    numeros = agrupar_numeros([Deteccion(d, 1.0, caja) for d, caja in zip((1, 2), cajas)])
+    if [n for n, _, _ in numeros] != [12]:
+        print(f"Se esperaba el número 12 y se compuso {[n for n, _, _ in numeros]}")
+        return False
+    print("Correcto: el 1 y el 2 se detectan y se componen en 12.")
+    return True
 
 # --- Sesión interactiva solicitando número y evaluando en 15s ---
-def interactive_session(rounds=5, timeout_sec=15, accept_conf=0.6):
+def interactive_session(rounds=5, timeout_sec=15, accept_conf=0.6, max_objetivo=9):
+    # Cargar el modelo pre-entrenado
+    try:
+        recursos.adquirir("modelo_digitos")
+    except Exception as e:
+        print(f"Error al cargar el modelo: {e}")
+        print("Asegúrate de haber entrenado y guardado el modelo 'mnist_cnn_model.h5' o de que esté en la ruta correcta.")
+        return
+    try:
+        # la cámara se pide sólo durante la sesión para que el módulo se pueda importar sin efectos
+        try:
+            cap = recursos.adquirir("camara")
+        except RuntimeError:
+            print("Error: No se pudo abrir la cámara.")
+            return
+        print("Presiona 'q' para salir.")
+        try:
+            _sesion(cap, rounds, timeout_sec, accept_conf, max_objetivo)
+        finally:
+            recursos.soltar("camara")
+            cv2.destroyAllWindows()
+    finally:
+        recursos.soltar("modelo_digitos")
+
+def _sesion(cap, rounds, timeout_sec, accept_conf, max_objetivo):
+    # con una cifra bastan los 10 objetivos; los 100 sólo si se juega con dos
+    dos_cifras = max_objetivo > 9
+    preparar(RONDA_DOS_CIFRAS if dos_cifras else RONDA)
     hablar("Vamos a jugar. Te diré un número y tendrás quince segundos para mostrarlo en color verde.")
     time.sleep(0.8)
+    plan = Planificador(hz_deteccion=8, hz_candidato=20)
+    # votos de varios frames: un frame con ruido no acepta ni uno perdido reinicia
+    decisor = Decisor.perfil(confianza_minima=accept_conf)
     for r in range(rounds):
-        objetivo = random.randint(0,9)
-        hablar(f"Ronda número {r+1}. Muéstrame el número {objetivo}. Tienes {timeout_sec} segundos. ¡Adelante!")
-        start = time.time()
-        best_pred = None
-        best_conf = 0.0
-        while time.time() - start < timeout_sec:
-            ret, frame = cap.read()
+        # con max_objetivo=99 se piden números de dos cifras (dos tarjetas juntas)
+        objetivo = random.randint(0, max_objetivo)
+        valores = dict(n=r+1, objetivo=objetivo, segundos=timeout_sec)
+        aviso = decir(RONDA_DOS_CIFRAS(**valores) if dos_cifras else RONDA(**valores))
+        # el tiempo de la ronda corre desde que el robot termina de pedirlo, pero los
+        # frames se procesan desde ya: si el niño se adelanta se le corta la pregunta
+        start = None
+        decisor.reiniciar()
+        numeros, mask = [], None
+        while start is None or time.time() - start < timeout_sec:
+            if start is None and aviso.done():
+                start = time.time()
+            # espejo leído directamente del frame de la cámara (sin copiarlo antes)
+            ret, frame = cap.leer_transformado(lambda f: cv2.flip(f, 1))
             if not ret:
                 continue
-            frame = cv2.flip(frame, 1)
-            pred, conf, vis, mask = detect_digit_from_frame(frame)
-            if pred is not None and conf > best_conf:
-                best_conf = conf
-                best_pred = pred
+            # la imagen se redibuja a hz_pantalla; la detección, sólo cuando toca
+            if plan.debe_detectar():
+                with plan.medir():
+                    pred, conf, numeros, mask = detectar_numeros(frame)
+                estado = decisor.actualizar(pred, conf)
+                plan.candidato(estado.candidata is not None)
+                if estado.aceptada == objetivo:
+                    decir("¡Bien hecho! Reconocí correctamente tu número.", interrumpir=True)
+                    break
+            vis = dibujar_numeros(frame, numeros)
             # mostrar cuenta regresiva
-            secs_left = int(timeout_sec - (time.time() - start))
+            secs_left = timeout_sec if start is None else int(timeout_sec - (time.time() - start))
             cv2.putText(vis, f"Objetivo: {objetivo}  Tiempo: {secs_left}s", (10,30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255,255,0), 2)
-            cv2.imshow('Mask', mask)
+            if mask is not None:
+                cv2.imshow('Mask', mask)
             cv2.imshow('Detector interactivo', vis)
-            if pred == objetivo and conf >= accept_conf:
-                hablar("¡Bien hecho! Reconocí correctamente tu número.")
-                break
-            if cv2.waitKey(1) & 0xFF == ord('q'):
+            if plan.esperar_tecla() == ord('q'):
+                callar()
                 hablar("Saliendo.")
                 return
         else:
             # Se ejecuta si no se hizo break (tiempo agotado)
-            if best_pred == objetivo and best_conf >= accept_conf:
-                hablar("¡Bien hecho! Reconocí correctamente tu número.")
+            # lider() da la proporción de votos, no la confianza del clasificador
+            best_pred, best_share = decisor.lider()
+            if best_pred == objetivo and best_share >= decisor.umbral:
+                decir("¡Bien hecho! Reconocí correctamente tu número.")
             else:
                 if best_pred is not None:
-                    hablar(f"No lo reconocí bien. Vi un {best_pred} con {int(best_conf*100)}% de confianza. Sigue intentando.")
+                    decir(f"No lo reconocí bien. Lo que más vi fue un {best_pred}. Sigue intentando.")
                 else:
-                    hablar("No pude ver un número. Intenta acercarlo o mejora la iluminación.")
+                    decir("No pude ver un número. Intenta acercarlo o mejora la iluminación.")
         time.sleep(1.0)
+    print(decisor.resumen())
     hablar("Hemos terminado las rondas. ¡Buen trabajo!")
- 
-# ejecutar la sesión interactiva (puedes cambiar a un bucle con varias rondas si quieres)
-try:
-    interactive_session(rounds=5, timeout_sec=15, accept_conf=0.6)
-except KeyboardInterrupt:
-    hablar("Adiós")
-finally:
-    cap.release()
-    cv2.destroyAllWindows()
+
+def _argumentos(argv=None):
+    parser = argparse.ArgumentParser(description="Juego de mostrar números a la cámara")
+    parser.add_argument("--modelo", choices=list(VARIANTES),
+                        help="variante de la red de dígitos (generadas con numeros/comprimir.py)")
+    parser.add_argument("--dos-cifras", action="store_true", help="pide números del 0 al 99")
+    parser.add_argument("--benchmark", action="store_true", help="coste por frame según las cifras en pantalla")
+    parser.add_argument("--comprobar", action="store_true", help="comprueba que un 1 y un 2 se leen como 12")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = _argumentos()
+    if args.modelo:
+        # variante de la red por nombre; el registro de recursos la lee al cargarla
+        os.environ[VARIABLE_VARIANTE] = args.modelo
+    if args.comprobar:
+        sys.exit(0 if comprobar_dos_cifras() else 1)
+    # ejecutar la sesión interactiva (puedes cambiar a un bucle con varias rondas si quieres)
+    if args.benchmark:
+        try:
+            benchmark_candidatos()
+        finally:
+            recursos.cerrar_todo()
+        sys.exit(0)
     try:
-        if pygame.mixer.get_init():
-            pygame.mixer.quit()
-    except Exception:
-        pass
\ No newline at end of file
+        interactive_session(rounds=5, timeout_sec=15, accept_conf=0.6,
+                            max_objetivo=99 if args.dos_cifras else 9)
+    except KeyboardInterrupt:
+        hablar("Adiós")
+    finally:
+        cv2.destroyAllWindows()
+        recursos.cerrar_todo()
@@ -1,36 +1,301 @@
 # train_mnist_model.py
+#
+# python entrenador.py                       # 5 epochs, batch 32, MNIST turned into mask ROIs
+# python entrenador.py --sin-aumento         # plain MNIST, as the original training did
+# python entrenador.py --rapido --semilla 0  # large batches, reproducible run
+# python entrenador.py --reanudar            # continue an interrupted run from its checkpoint
+# python entrenador.py --shards sinteticos    # mix in game-style digits from sinteticos.py
 import tensorflow as tf
 from tensorflow.keras.datasets import mnist
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import Conv2D, MaxPooling2D, Flatten, Dense
 import numpy as np
+import argparse
+import json
+import os
+import sys
+import time
 
-# Load MNIST dataset
-(x_train, y_train), (x_test, y_test) = mnist.load_data()
-
-# Normalize and reshape
-x_train = x_train.reshape(-1, 28, 28, 1).astype('float32') / 255.0
-x_test = x_test.reshape(-1, 28, 28, 1).astype('float32') / 255.0
-
-# Build the CNN model
-model = Sequential([
-    Conv2D(32, (3, 3), activation='relu', input_shape=(28, 28, 1)),
-    MaxPooling2D((2, 2)),
-    Conv2D(64, (3, 3), activation='relu'),
-    MaxPooling2D((2, 2)),
-    Flatten(),
-    Dense(128, activation='relu'),
-    Dense(10, activation='softmax')
-])
-
-# Compile the model
-model.compile(optimizer='adam',
-              loss='sparse_categorical_crossentropy',
-              metrics=['accuracy'])
-
-# Train the model
-model.fit(x_train, y_train, epochs=5, batch_size=32, validation_split=0.1)
-
-# Save the model
-model.save('mnist_cnn_model.h5')
-print("Model 'mnist_cnn_model.h5' trained and saved.")
\ No newline at end of file
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+from comun.red_digitos import exportar
+
+# Same geometry as _preparar_roi in detectarNumeros.py: the digit's longest
+# side fits in 28 - 2 * 4 pixels and the result is thresholded at 127
+TARGET_SIZE = 28
+PADDING = 4
+
+# fixed seed of the mask-ROI validation and test sets, the same in every run
+ROI_EVAL_SEED = 1234
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train the digit CNN used by the number games")
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=None, help="32 by default, 256 with --rapido")
+    parser.add_argument("--rapido", action="store_true",
+                        help="large batches (256) for multi-core CPUs; combine with --semilla to reproduce runs")
+    parser.add_argument("--semilla", type=int, default=None, help="seed for weights, shuffling and augmentation")
+    parser.add_argument("--determinista", action="store_true",
+                        help="deterministic TensorFlow ops (identical runs with --semilla, somewhat slower)")
+    parser.add_argument("--sin-aumento", action="store_true", help="train on the plain MNIST images")
+    parser.add_argument("--hilos-datos", type=int, default=None, help="threads of the input pipeline (auto)")
+    parser.add_argument("--hilos-intra", type=int, default=None, help="threads inside each op (auto)")
+    parser.add_argument("--hilos-inter", type=int, default=None, help="ops run in parallel (auto)")
+    parser.add_argument("--shuffle-buffer", type=int, default=20000)
+    parser.add_argument("--checkpoints", default="checkpoints_entrenador",
+                        help="directory for the per-epoch checkpoint")
+    parser.add_argument("--reanudar", action="store_true", help="resume from the checkpoint if there is one")
+    parser.add_argument("--shards", metavar="DIR", help="synthetic digits written by sinteticos.py")
+    parser.add_argument("--peso-sinteticos", type=float, default=0.5,
+                        help="fraction of each batch taken from --shards")
+    parser.add_argument("--salida", default="mnist_cnn_model.h5")
+    args = parser.parse_args(argv)
+    if args.batch_size is None:
+        args.batch_size = 256 if args.rapido else 32
+    return args
+
+
+def configure(args):
+    """Thread pools and seeds; must run before any op is created."""
+    if args.hilos_intra:
+        tf.config.threading.set_intra_op_parallelism_threads(args.hilos_intra)
+    if args.hilos_inter:
+        tf.config.threading.set_inter_op_parallelism_threads(args.hilos_inter)
+    if args.semilla is not None:
+        tf.keras.utils.set_random_seed(args.semilla)  # python, numpy and tensorflow
+    if args.determinista:
+        tf.config.experimental.enable_op_determinism()
+
+
+# --- augmentation that mimics the game's mask ROIs ---
+
+def _crop_to_strokes(image):
+    """Crop a (28, 28, 1) image to the bounding box of its strokes, like the contour rectangle."""
+    ink = image[..., 0] > 0
+    rows = tf.where(tf.reduce_any(ink, axis=1))[:, 0]
+    cols = tf.where(tf.reduce_any(ink, axis=0))[:, 0]
+    top, bottom = tf.reduce_min(rows), tf.reduce_max(rows) + 1
+    left, right = tf.reduce_min(cols), tf.reduce_max(cols) + 1
+    return image[top:bottom, left:right]
+
+
+def mask_roi(image, seed):
+    """
+    Random version of an MNIST digit as the game sees it: binary strokes
+    thresholded at a random level, sometimes thickened or thinned, cropped
+    to the strokes and fitted with a jittered scale and position into 28x28,
+    then thresholded again like _preparar_roi.
+    """
+    seeds = tf.random.experimental.stateless_split(seed, 5)
+    level = tf.random.stateless_uniform([], seeds[0], 0.25, 0.65)
+    strokes = tf.cast(image > level, tf.float32)
+    # thickness: the mask of a card is often bolder (or thinner) than a pen stroke
+    thickness = tf.random.stateless_uniform([], seeds[1], 0, 3, dtype=tf.int32)
+    strokes = tf.switch_case(thickness, [
+        lambda: strokes,
+        lambda: tf.nn.max_pool2d(strokes[None], 2, 1, "SAME")[0],
+        lambda: -tf.nn.max_pool2d(-strokes[None], 2, 1, "SAME")[0],
+    ])
+    # a very faint digit can vanish at a high threshold: fall back to 0.5
+    strokes = tf.cond(tf.reduce_max(strokes) == 0, lambda: tf.cast(image > 0.5, tf.float32), lambda: strokes)
+    roi = _crop_to_strokes(strokes)
+
+    # scale jitter around the 20 px the game uses for the longest side
+    longest = tf.cast(tf.reduce_max(tf.shape(roi)[:2]), tf.float32)
+    side = tf.random.stateless_uniform([], seeds[2], 14.0, TARGET_SIZE - 2 * PADDING + 2.0)
+    scale = tf.minimum(side / longest, (TARGET_SIZE - 2.0) / longest)
+    size = tf.maximum(tf.cast(tf.cast(tf.shape(roi)[:2], tf.float32) * scale, tf.int32), 1)
+    roi = tf.image.resize(roi, size, method="area")
+
+    # centred like _preparar_roi, with up to 2 px of jitter
+    free = TARGET_SIZE - size
+    shift = tf.random.stateless_uniform([2], seeds[3], -2, 3, dtype=tf.int32)
+    offset = tf.clip_by_value(free // 2 + shift, 0, free)
+    roi = tf.image.pad_to_bounding_box(roi, offset[0], offset[1], TARGET_SIZE, TARGET_SIZE)
+    return tf.cast(roi > 0.5, tf.float32)
+
+
+# --- input pipeline ---
+
+def _read_shard(x_path, y_path, chunk=1024):
+    """Yield a shard in chunks; thanks to the memory map only the current chunk is in RAM."""
+    x = np.load(x_path.decode(), mmap_mode='r')
+    y = np.load(y_path.decode(), mmap_mode='r')
+    for start in range(0, len(x), chunk):
+        yield np.array(x[start:start + chunk]), np.array(y[start:start + chunk])
+
+
+def shard_dataset(directory, shuffle_buffer=20000, seed=None):
+    """Endless stream of the shards listed in sinteticos.py's indice.json, read from several shards at once."""
+    with open(os.path.join(directory, "indice.json"), encoding="utf-8") as f:
+        shards = json.load(f)["fragmentos"]
+    x_paths = [os.path.join(directory, s["x"]) for s in shards]
+    y_paths = [os.path.join(directory, s["y"]) for s in shards]
+    signature = (tf.TensorSpec((None, 28, 28), tf.uint8), tf.TensorSpec((None,), tf.uint8))
+    ds = tf.data.Dataset.from_tensor_slices((x_paths, y_paths))
+    ds = ds.shuffle(len(shards), seed=seed, reshuffle_each_iteration=True)
+    ds = ds.interleave(
+        lambda x_path, y_path: tf.data.Dataset.from_generator(
+            _read_shard, args=(x_path, y_path), output_signature=signature),
+        cycle_length=min(4, len(shards)), num_parallel_calls=tf.data.AUTOTUNE, deterministic=seed is not None)
+    ds = ds.unbatch().map(lambda image, label: (tf.cast(image, tf.float32)[..., None] / 255.0, label),
+                          num_parallel_calls=tf.data.AUTOTUNE)
+    return ds.shuffle(shuffle_buffer, seed=seed).repeat()
+
+
+def make_dataset(x, y, batch_size, training, augment, threads=None, shuffle_buffer=20000, seed=None,
+                 extra=None, extra_weight=0.5):
+    """
+    uint8 arrays -> normalised and cached -> shuffled -> augmented in
+    parallel -> mixed with ``extra`` -> batched -> prefetched while the
+    model trains on the previous batch.
+    """
+    ds = tf.data.Dataset.from_tensor_slices((x, y))
+    ds = ds.map(lambda image, label: (tf.cast(image, tf.float32)[..., None] / 255.0, label),
+                num_parallel_calls=tf.data.AUTOTUNE)
+    ds = ds.cache()
+    if training:
+        ds = ds.shuffle(shuffle_buffer, seed=seed, reshuffle_each_iteration=True)
+    if augment:
+        # one random seed per sample so augmentation is reproducible with --semilla
+        seeds = tf.data.Dataset.random(seed=seed).batch(2)
+        ds = tf.data.Dataset.zip((ds, seeds)).map(
+            lambda sample, s: (mask_roi(sample[0], s), sample[1]),
+            num_parallel_calls=threads or tf.data.AUTOTUNE, deterministic=seed is not None)
+    if extra is not None:
+        # synthetic digits are already mask ROIs, so they skip the augmentation;
+        # the epoch ends when the MNIST images run out
+        ds = tf.data.Dataset.sample_from_datasets([ds, extra], [1 - extra_weight, extra_weight],
+                                                  seed=seed, stop_on_empty_dataset=True)
+    ds = ds.batch(batch_size)
+    ds = ds.prefetch(tf.data.AUTOTUNE)
+    options = tf.data.Options()
+    if threads:
+        options.threading.private_threadpool_size = threads
+    options.deterministic = seed is not None
+    return ds.with_options(options)
+
+
+def mask_roi_dataset(x, y, batch_size=256, threads=None):
+    """
+    ``x`` turned into mask ROIs with ``ROI_EVAL_SEED``, so every epoch and
+    every run evaluates on the same images: the distribution the model
+    trains on when augmentation is on.
+    """
+    return make_dataset(x, y, batch_size, training=False, augment=True, threads=threads,
+                        seed=ROI_EVAL_SEED).cache()
+
+
+class ExtraValidation(tf.keras.callbacks.Callback):
+    """Evaluate more validation sets after each epoch and add ``val_<name>_accuracy`` to the logs."""
+
+    def __init__(self, datasets):
+        super().__init__()
+        self.datasets = datasets
+
+    def on_epoch_end(self, epoch, logs=None):
+        for name, ds in self.datasets.items():
+            loss, accuracy = self.model.evaluate(ds, verbose=0)
+            if logs is not None:
+                logs[f"val_{name}_loss"] = loss
+                logs[f"val_{name}_accuracy"] = accuracy
+            print(f"Epoch {epoch + 1}: val_{name}_accuracy {accuracy:.4f}")
+
+
+class Throughput(tf.keras.callbacks.Callback):
+    """Training samples per second of each epoch (validation time excluded)."""
+
+    def __init__(self, batch_size):
+        super().__init__()
+        self.batch_size = batch_size
+        self.history = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._start = time.perf_counter()
+        self._train_end = None
+        self._batches = 0
+
+    def on_train_batch_end(self, batch, logs=None):
+        self._batches += 1
+
+    def on_test_begin(self, logs=None):
+        if self._train_end is None:
+            self._train_end = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        seconds = (self._train_end or time.perf_counter()) - self._start
+        self.history.append(self._batches * self.batch_size / seconds)
+        print(f"Epoch {epoch + 1}: {self.history[-1]:,.0f} samples/s ({seconds:.1f} s)")
+
+
+def build_model():
+    return Sequential([
+        Conv2D(32, (3, 3), activation='relu', input_shape=(28, 28, 1)),
+        MaxPooling2D((2, 2)),
+        Conv2D(64, (3, 3), activation='relu'),
+        MaxPooling2D((2, 2)),
+        Flatten(),
+        Dense(128, activation='relu'),
+        Dense(10, activation='softmax')
+    ])
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure(args)
+
+    # Load MNIST dataset; the last 10% of the training set is kept for validation
+    (x_train, y_train), (x_test, y_test) = mnist.load_data()
+    split = int(len(x_train) * 0.9)
+    extra = None
+    if args.shards:
+        extra = shard_dataset(args.shards, shuffle_buffer=args.shuffle_buffer, seed=args.semilla)
+    train = make_dataset(x_train[:split], y_train[:split], args.batch_size, training=True,
+                         augment=not args.sin_aumento, threads=args.hilos_datos,
+                         shuffle_buffer=args.shuffle_buffer, seed=args.semilla,
+                         extra=extra, extra_weight=args.peso_sinteticos)
+    # plain MNIST and the same images as fixed mask ROIs: the second one
+    # measures the distribution the augmented model trains on
+    val = make_dataset(x_train[split:], y_train[split:], 256, training=False, augment=False,
+                       threads=args.hilos_datos)
+    val_roi = mask_roi_dataset(x_train[split:], y_train[split:], threads=args.hilos_datos)
+    test = make_dataset(x_test, y_test, 256, training=False, augment=False, threads=args.hilos_datos)
+    test_roi = mask_roi_dataset(x_test, y_test, threads=args.hilos_datos)
+
+    # Build and compile the CNN model
+    model = build_model()
+    model.compile(optimizer='adam',
+                  loss='sparse_categorical_crossentropy',
+                  metrics=['accuracy'])
+
+    if not args.reanudar and os.path.isdir(args.checkpoints):
+        print(f"Ignoring the previous checkpoint in '{args.checkpoints}' (use --reanudar to continue it).")
+        tf.io.gfile.rmtree(args.checkpoints)
+    # saves model, optimizer and epoch after every epoch; deleted when training finishes
+    backup = tf.keras.callbacks.BackupAndRestore(backup_dir=args.checkpoints)
+    throughput = Throughput(args.batch_size)
+
+    # Train the model
+    model.fit(train, epochs=args.epochs, validation_data=val,
+              callbacks=[ExtraValidation({"roi": val_roi}), backup, throughput])
+    if throughput.history:
+        print(f"Mean throughput: {np.mean(throughput.history):,.0f} samples/s "
+              f"(batch {args.batch_size}, {'augmented' if not args.sin_aumento else 'plain'} images)")
+    _, accuracy = model.evaluate(test, verbose=0)
+    _, roi_accuracy = model.evaluate(test_roi, verbose=0)
+    print(f"Test accuracy: {accuracy:.4f} on MNIST, {roi_accuracy:.4f} on mask ROIs")
+
+    # Save the model
+    model.save(args.salida)
+    print(f"Model '{args.salida}' trained and saved.")
+
+    # Export the weights for the TensorFlow-free inference used by the games
+    npz = os.path.splitext(args.salida)[0] + '.npz'
+    exportar(model, npz)
+    print(f"Weights exported to '{npz}'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""Dígitos sintéticos con el aspecto de las tarjetas del juego, en fragmentos ``.npy``.
+
+La red se entrena con la escritura a mano de MNIST, pero en el juego
+clasifica cifras recortadas en cartulina verde, vistas por la cámara. Aquí
+cada muestra se dibuja como un frame de cámara:
+
+- la cifra, con una fuente al azar (las Hershey de OpenCV, normales o en
+  cursiva, o las ``.ttf`` de ``--fuentes`` si está Pillow), tamaño y grosor
+  variables;
+- girada, con una deformación de perspectiva (la tarjeta inclinada),
+  pintada de un verde dentro del rango del juego sobre un fondo que no lo
+  es, con desenfoque, cambio de brillo y ruido;
+
+y pasa por el mismo camino que en ``detect_digit_from_frame``: ``_mascara``
+(HSV y morfología), ``_cajas_plausibles`` (área y proporción de una cifra),
+la mayor de esas cajas y ``_preparar_roi``. Si el juego no vería ninguna
+cifra en el frame, la muestra se descarta y se dibuja otra.
+
+Varios procesos escriben a la vez, cada uno en su fragmento
+(``x_0000.npy`` uint8 de (N, 28, 28) y ``y_0000.npy``), abiertos como
+memoria mapeada para no tener todo en RAM; ``indice.json`` los enumera.
+``entrenador.py --shards DIR`` los lee por trozos mientras entrena::
+
+    python numeros/sinteticos.py --muestras 100000
+    python numeros/entrenador.py --shards numeros/sinteticos
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+import numpy as np
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+from detectarNumeros import _cajas_plausibles, _mascara, _preparar_roi, lower_green_lemon, upper_green_lemon
+
+DIRECTORIO = os.path.join(RAIZ, "numeros", "sinteticos")
+LADO = 160  # tamaño del "frame" en el que se dibuja cada cifra
+
+FUENTES_HERSHEY = [
+    cv2.FONT_HERSHEY_SIMPLEX, cv2.FONT_HERSHEY_PLAIN, cv2.FONT_HERSHEY_DUPLEX,
+    cv2.FONT_HERSHEY_COMPLEX, cv2.FONT_HERSHEY_TRIPLEX, cv2.FONT_HERSHEY_COMPLEX_SMALL,
+    cv2.FONT_HERSHEY_SCRIPT_SIMPLEX, cv2.FONT_HERSHEY_SCRIPT_COMPLEX,
+]
+
+
+def _tinta_hershey(digito, rng):
+    """Máscara (LADO, LADO) con la cifra dibujada con ``cv2.putText``."""
+    tinta = np.zeros((LADO, LADO), np.uint8)
+    fuente = int(rng.choice(FUENTES_HERSHEY))
+    if rng.random() < 0.3:
+        fuente |= cv2.FONT_ITALIC
+    grosor = int(rng.integers(3, 16))
+    # escala para que la cifra ocupe entre un tercio y dos tercios del frame
+    (_, alto), _ = cv2.getTextSize(str(digito), fuente, 1.0, grosor)
+    escala = rng.uniform(LADO / 3, LADO * 2 / 3) / max(alto, 1)
+    (ancho, alto), _ = cv2.getTextSize(str(digito), fuente, escala, grosor)
+    origen = ((LADO - ancho) // 2, (LADO + alto) // 2)
+    cv2.putText(tinta, str(digito), origen, fuente, escala, 255, grosor, cv2.LINE_AA)
+    return tinta
+
+
+def _tinta_ttf(digito, rng, fuentes):
+    """Como ``_tinta_hershey`` pero con una fuente TrueType (necesita Pillow)."""
+    from PIL import Image, ImageDraw, ImageFont
+    fuente = ImageFont.truetype(str(rng.choice(fuentes)), int(rng.uniform(LADO / 3, LADO * 2 / 3)))
+    imagen = Image.new("L", (LADO, LADO), 0)
+    dibujo = ImageDraw.Draw(imagen)
+    izquierda, arriba, derecha, abajo = dibujo.textbbox((0, 0), str(digito), font=fuente)
+    origen = ((LADO - (derecha - izquierda)) // 2 - izquierda, (LADO - (abajo - arriba)) // 2 - arriba)
+    # trazo extra para variar el grosor también con estas fuentes
+    dibujo.text(origen, str(digito), fill=255, font=fuente, stroke_width=int(rng.integers(0, 5)), stroke_fill=255)
+    return np.array(imagen)
+
+
+def _deformar(tinta, rng):
+    """Giro de hasta ±20° y perspectiva de una tarjeta inclinada hacia la cámara."""
+    giro = cv2.getRotationMatrix2D((LADO / 2, LADO / 2), rng.uniform(-20, 20), rng.uniform(0.85, 1.1))
+    tinta = cv2.warpAffine(tinta, giro, (LADO, LADO))
+    esquinas = np.float32([[0, 0], [LADO, 0], [LADO, LADO], [0, LADO]])
+    movidas = esquinas + rng.uniform(-0.12, 0.12, size=(4, 2)).astype(np.float32) * LADO
+    perspectiva = cv2.getPerspectiveTransform(esquinas, movidas.astype(np.float32))
+    return cv2.warpPerspective(tinta, perspectiva, (LADO, LADO))
+
+
+def _color_hsv(rng, verde):
+    """Un color BGR dentro del rango verde del juego o claramente fuera de él."""
+    if verde:
+        h = rng.integers(lower_green_lemon[0] + 3, upper_green_lemon[0] - 2)
+        s = rng.integers(lower_green_lemon[1] + 30, 256)
+        v = rng.integers(lower_green_lemon[2] + 40, 256)
+    else:
+        # fondo: tono fuera del verde o poco saturado (mesa, pared, ropa)
+        h = rng.choice([rng.integers(0, 25), rng.integers(95, 180)])
+        s, v = rng.integers(0, 256), rng.integers(30, 256)
+        if rng.random() < 0.5:
+            s = rng.integers(0, 80)
+    pixel = np.uint8([[[h, s, v]]])
+    return cv2.cvtColor(pixel, cv2.COLOR_HSV2BGR)[0, 0].astype(np.float32)
+
+
+def dibujar_frame(digito, rng, fuentes=()):
+    """Frame BGR con la cifra en verde sobre un fondo, como lo capta la cámara."""
+    if fuentes and rng.random() < 0.5:
+        tinta = _tinta_ttf(digito, rng, fuentes)
+    else:
+        tinta = _tinta_hershey(digito, rng)
+    alfa = (_deformar(tinta, rng).astype(np.float32) / 255.0)[..., None]
+    # fondo con un degradado de iluminación
+    fondo = np.empty((LADO, LADO, 3), np.float32)
+    fondo[:] = _color_hsv(rng, verde=False)
+    fondo *= np.linspace(rng.uniform(0.6, 1.0), rng.uniform(0.6, 1.0), LADO, dtype=np.float32)[:, None, None]
+    frame = fondo * (1 - alfa) + _color_hsv(rng, verde=True) * alfa
+    if rng.random() < 0.5:
+        k = int(rng.choice([3, 5]))
+        frame = cv2.GaussianBlur(frame, (k, k), 0)
+    frame = frame * rng.uniform(0.75, 1.15) + rng.normal(0, rng.uniform(2, 12), frame.shape)
+    return np.clip(frame, 0, 255).astype(np.uint8)
+
+
+def roi_del_frame(frame):
+    """
+    La ROI de 28x28 que clasificaría ``detect_digit_from_frame``: las cajas
+    de ``_cajas_plausibles`` y, de ellas, la mayor. None si el juego no
+    vería ninguna cifra en el frame.
+    """
+    mask = _mascara(frame)
+    cajas = _cajas_plausibles(mask)
+    if not cajas:
+        return None
+    x, y, w, h = max(cajas, key=lambda c: c[2] * c[3])
+    return _preparar_roi(mask[y:y+h, x:x+w])
+
+
+def generar_fragmento(directorio, indice, n, semilla, fuentes=()):
+    """Escribe ``n`` muestras en ``x_{indice}.npy``/``y_{indice}.npy``; devuelve su entrada del índice."""
+    inicio = time.perf_counter()
+    rng = np.random.default_rng([semilla, indice])
+    nombre_x, nombre_y = f"x_{indice:04d}.npy", f"y_{indice:04d}.npy"
+    x = np.lib.format.open_memmap(os.path.join(directorio, nombre_x), mode="w+", dtype=np.uint8, shape=(n, 28, 28))
+    y = np.lib.format.open_memmap(os.path.join(directorio, nombre_y), mode="w+", dtype=np.uint8, shape=(n,))
+    # las diez cifras por igual, en orden aleatorio
+    y[:] = rng.permutation(np.arange(n) % 10)
+    descartadas = 0
+    for i in range(n):
+        roi = None
+        while roi is None:
+            roi = roi_del_frame(dibujar_frame(int(y[i]), rng, fuentes))
+            descartadas += roi is None
+        x[i] = roi
+    x.flush()
+    y.flush()
+    del x, y
+    return {"x": nombre_x, "y": nombre_y, "n": n, "descartadas": descartadas,
+            "segundos": time.perf_counter() - inicio}
+
+
+def generar(directorio=DIRECTORIO, muestras=50000, por_fragmento=5000, procesos=None, semilla=0, fuentes=()):
+    """Reparte los fragmentos entre ``procesos`` y escribe ``indice.json`` al terminar."""
+    os.makedirs(directorio, exist_ok=True)
+    tamanos = [min(por_fragmento, muestras - inicio) for inicio in range(0, muestras, por_fragmento)]
+    fragmentos = [None] * len(tamanos)
+    inicio = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=procesos) as grupo:
+        futuros = {grupo.submit(generar_fragmento, directorio, i, n, semilla, tuple(fuentes)): i
+                   for i, n in enumerate(tamanos)}
+        for futuro in as_completed(futuros):
+            fragmentos[futuros[futuro]] = entrada = futuro.result()
+            print(f"{entrada['x']}: {entrada['n']} muestras en {entrada['segundos']:.1f} s "
+                  f"({entrada['descartadas']} descartadas)")
+    segundos = time.perf_counter() - inicio
+    with open(os.path.join(directorio, "indice.json"), "w", encoding="utf-8") as fichero:
+        json.dump({"muestras": muestras, "semilla": semilla, "fragmentos": fragmentos}, fichero, indent=2)
+    return muestras / segundos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera dígitos sintéticos con el aspecto de las tarjetas del juego")
+    parser.add_argument("--salida", default=DIRECTORIO)
+    parser.add_argument("--muestras", type=int, default=50000)
+    parser.add_argument("--por-fragmento", type=int, default=5000)
+    parser.add_argument("--procesos", type=int, default=None, help="uno por núcleo si no se indica")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--fuentes", metavar="DIR", help="carpeta con fuentes .ttf/.otf (necesita Pillow)")
+    args = parser.parse_args(argv)
+    fuentes = []
+    if args.fuentes:
+        fuentes = sorted(os.path.join(args.fuentes, f) for f in os.listdir(args.fuentes)
+                         if f.lower().endswith((".ttf", ".otf")))
+        if not fuentes:
+            print(f"No hay fuentes .ttf u .otf en {args.fuentes}; se usan sólo las de OpenCV.")
+    ritmo = generar(args.salida, args.muestras, args.por_fragmento, args.procesos, args.semilla, fuentes)
+    print(f"{args.muestras} muestras en {args.salida} ({ritmo:.0f} muestras/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())